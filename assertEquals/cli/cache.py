@@ -0,0 +1,121 @@
+"""An on-disk store of TestCase results, keyed by content.
+
+Each entry is a small file named for a hash of the TestCase's dotted name, the
+contents of the source files it depends on (see dependencies), and the
+interpreter version. Since the key doesn't involve any paths, several checkouts
+can share a cache directory. When there are more than limit entries, we remove
+the ones that were used least recently.
+
+"""
+import hashlib
+import marshal
+import os
+import sys
+
+
+LIMIT = 10000
+
+
+def default_path():
+    """Return the default cache directory, per the XDG base directory spec.
+    """
+    base = os.environ.get('XDG_CACHE_HOME')
+    if not base:
+        base = os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'assertEquals')
+
+
+class Cache:
+    """Represent a directory of cached results.
+
+    Problems reading or writing the cache are ignored; the worst that happens
+    is that we run tests that we didn't need to.
+
+    """
+
+    def __init__(self, path=None, limit=LIMIT):
+        """Takes a directory path and a maximum number of entries.
+        """
+        if path is None:
+            path = default_path()
+        self.path = path
+        self.limit = limit
+        self.dirty = False
+
+
+    def key(self, name, deps):
+        """Given a dotted name and a {filename: digest} dict, return a key.
+
+        If any of the files could not be read, we return None.
+
+        """
+        digests = sorted(deps.values())
+        if None in digests:
+            return None
+        return hashlib.md5('\0'.join([sys.version, name] + digests)).hexdigest()
+
+
+    def get(self, key):
+        """Given a key, return a (fail, err, all) tuple, or None.
+        """
+        if key is None:
+            return None
+        filename = os.path.join(self.path, key)
+        try:
+            fp = open(filename, 'rb')
+            try:
+                result = marshal.load(fp)
+            finally:
+                fp.close()
+            os.utime(filename, None) # for eviction
+        except (IOError, OSError, EOFError, ValueError, TypeError):
+            return None
+        return tuple(result)[:3] # some entries have durations after these
+
+
+    def put(self, key, result):
+        """Given a key and a (fail, err, all) tuple, store the tuple.
+        """
+        if key is None:
+            return
+        filename = os.path.join(self.path, key)
+        tmp = '%s.%d.tmp' % (filename, os.getpid())
+        try:
+            if not os.path.isdir(self.path):
+                os.makedirs(self.path)
+            fp = open(tmp, 'wb')
+            try:
+                marshal.dump(tuple(result), fp)
+            finally:
+                fp.close()
+            os.rename(tmp, filename) # atomic, for other checkouts
+        except (IOError, OSError):
+            return
+        self.dirty = True
+
+
+    def prune(self):
+        """Remove the least recently used entries beyond our limit.
+        """
+        if not self.dirty:
+            return
+        self.dirty = False
+        try:
+            names = os.listdir(self.path)
+        except OSError:
+            return
+        if len(names) <= self.limit:
+            return
+        entries = []
+        for name in names:
+            filename = os.path.join(self.path, name)
+            try:
+                entries.append((os.stat(filename).st_mtime, filename))
+            except OSError:
+                continue
+        entries.sort()
+        for mtime, filename in entries[:len(entries) - self.limit]:
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
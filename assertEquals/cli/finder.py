@@ -0,0 +1,399 @@
+"""Find TestCases by reading source files rather than importing them.
+
+This is what find-only summaries use, since importing an application just to
+count its tests can be slow, and can have side effects. We walk the package
+directory for modules (see submodules). In each of those, we look for classes
+that subclass unittest.TestCase, following base classes through the modules
+where they are defined, and count the test* methods on each.
+
+Where we can't work out statically whether a class is a TestCase, or what
+tests it has (a base class from a third-party library, a test method that is
+assigned rather than defined, a syntax error), we raise Unresolved, and the
+caller falls back to importing that one module.
+
+Parsed modules are cached in memory by filename, mtime and size.
+
+"""
+import __builtin__
+import ast
+import imp
+import os
+import pkgutil
+
+
+class Unresolved(StandardError):
+    """We can't tell what's in a module without importing it.
+    """
+
+
+NOT_A_CLASS = (None, None)  # what a name resolves to if it isn't a class
+NOT_A_TESTCASE = (None, ()) # ... if it's a class, but not a TestCase
+
+_cache = {} # {filename: ((mtime, size), Module)}
+
+
+def locate(name):
+    """Given a dotted module name, return (filename, is_package), or None.
+
+    We find the module the way import would, but without importing anything.
+    Only Python source is of interest.
+
+    """
+    path = None
+    parts = name.split('.')
+    for i, part in enumerate(parts):
+        try:
+            fp, filename, description = imp.find_module(part, path)
+        except ImportError:
+            return None
+        if fp is not None:
+            fp.close()
+        if description[2] == imp.PKG_DIRECTORY:
+            path = [filename]
+            filename = os.path.join(filename, '__init__.py')
+            is_package = True
+        elif (description[2] == imp.PY_SOURCE) and (i == len(parts)-1):
+            is_package = False
+        else:
+            return None
+    return (filename, is_package)
+
+
+def submodules(name, stopwords=()):
+    """Given a dotted module name, return the names of it and its submodules.
+
+    The named module is first, and the rest are in sorted order. We walk the
+    filesystem, so nothing is imported. Modules (and so packages) whose names
+    contain one of stopwords are left out, as are __main__ modules, since
+    importing those runs them.
+
+    """
+    names = []
+    found = locate(name)
+    if (found is not None) and found[1]:
+        todo = [(os.path.dirname(found[0]), name)]
+        while todo:
+            path, prefix = todo.pop()
+            for importer, dotted, ispkg in pkgutil.iter_modules( [path]
+                                                               , prefix + '.'
+                                                                ):
+                stop = dotted.endswith('.__main__')
+                for word in stopwords:
+                    if word and word in dotted:
+                        stop = True
+                if stop:
+                    continue
+                names.append(dotted)
+                if ispkg:
+                    basename = dotted.rsplit('.', 1)[1]
+                    todo.append((os.path.join(path, basename), dotted))
+    return [name] + sorted(names)
+
+
+def parse(name):
+    """Given a dotted module name, return a Module, or None if not found.
+    """
+    found = locate(name)
+    if found is None:
+        return None
+    filename, is_package = found
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    key = (stat.st_mtime, stat.st_size)
+    cached = _cache.get(filename)
+    if (cached is None) or (cached[0] != key):
+        cached = (key, Module(name, filename, is_package))
+        _cache[filename] = cached
+    return cached[1]
+
+
+class Module:
+    """Represent what we can tell about a module from its source.
+
+        names       a {name: binding} dict of the module's globals, where a
+                    binding is one of:
+                        ('class', classname, bases, tests)
+                        ('module', dotted name)
+                        ('ref', dotted module name, attribute name)
+                        ('alias', ast expression)
+                        ('other',)
+        stars       a list of dotted names of modules imported with *
+        all         the module's __all__, if given as a literal
+        error       a string, if the module couldn't be parsed
+
+    We only look at module-level statements, and those nested in if and try
+    statements, taking either branch.
+
+    """
+
+    def __init__(self, name, filename, is_package):
+        self.name = name
+        self.filename = filename
+        self.package = name
+        if not is_package:
+            self.package = name.rpartition('.')[0]
+        self.names = {}
+        self.stars = []
+        self.all = None
+        self.error = None
+        self.absolute = False # from __future__ import absolute_import
+
+        try:
+            source = open(filename, 'rU').read()
+            tree = ast.parse(source, filename)
+        except (IOError, SyntaxError, TypeError), err:
+            self.error = str(err)
+            return
+        self.visit(tree.body)
+
+
+    def visit(self, body):
+        """Given a list of statements, record bindings.
+        """
+        for node in body:
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    name = self.resolve_import(alias.name)
+                    if alias.asname:
+                        self.names[alias.asname] = ('module', name)
+                    else:
+                        prefix = name[:len(name)-len(alias.name)]
+                        top = alias.name.split('.')[0]
+                        self.names[top] = ('module', prefix + top)
+
+            elif isinstance(node, ast.ImportFrom):
+                module = self.resolve_from(node.module, node.level)
+                if module == '__future__':
+                    for alias in node.names:
+                        if alias.name == 'absolute_import':
+                            self.absolute = True
+                    continue
+                for alias in node.names:
+                    if alias.name == '*':
+                        self.stars.append(module)
+                        continue
+                    submodule = module + '.' + alias.name
+                    bound = alias.asname or alias.name
+                    if locate(submodule) is not None:
+                        self.names[bound] = ('module', submodule)
+                    else:
+                        self.names[bound] = ('ref', module, alias.name)
+
+            elif isinstance(node, ast.ClassDef):
+                tests = set()
+                for item in node.body:
+                    if isinstance(item, ast.FunctionDef):
+                        if item.name.startswith('test'):
+                            tests.add(item.name)
+                    elif isinstance(item, ast.Assign):
+                        for target in item.targets:
+                            if not isinstance(target, ast.Name):
+                                continue
+                            if target.id.startswith('test'):
+                                tests = None # can't tell if it's callable
+                    if tests is None:
+                        break
+                binding = ('class', node.name, node.bases, tests)
+                self.names[node.name] = binding
+
+            elif isinstance(node, ast.Assign):
+                value = node.value
+                for target in node.targets:
+                    if not isinstance(target, ast.Name):
+                        continue
+                    if target.id == '__all__':
+                        self.all = literal_names(value)
+                    if isinstance(value, (ast.Name, ast.Attribute)):
+                        self.names[target.id] = ('alias', value)
+                    else:
+                        self.names[target.id] = ('other',)
+
+            elif isinstance(node, ast.FunctionDef):
+                self.names[node.name] = ('other',)
+
+            elif isinstance(node, ast.If):
+                self.visit(node.body)
+                self.visit(node.orelse)
+            elif isinstance(node, ast.TryExcept):
+                self.visit(node.body)
+                for handler in node.handlers:
+                    self.visit(handler.body)
+                self.visit(node.orelse)
+            elif isinstance(node, ast.TryFinally):
+                self.visit(node.body)
+                self.visit(node.finalbody)
+
+
+    def resolve_import(self, name):
+        """Given the name in an import statement, return the absolute name.
+
+        Without absolute_import, Python 2 looks in the current package first.
+
+        """
+        if self.package and not self.absolute:
+            relative = self.package + '.' + name
+            if locate(relative) is not None:
+                return relative
+        return name
+
+    def resolve_from(self, module, level):
+        """Given the module and level of a from-import, return an absolute name.
+        """
+        if level == 0:
+            return self.resolve_import(module)
+        parts = self.package.split('.')
+        if level > 1:
+            parts = parts[:-(level-1)]
+        if module:
+            parts.append(module)
+        return '.'.join(parts)
+
+    def exports(self):
+        """Return a list of the names that a star import would give us.
+        """
+        if self.all is not None:
+            return self.all
+        return [name for name in self.names if not name.startswith('_')]
+
+
+def literal_names(node):
+    """Given an ast node, return a list of strings if it is a literal list or
+    tuple of them, otherwise None.
+    """
+    if not isinstance(node, (ast.List, ast.Tuple)):
+        return None
+    out = []
+    for elt in node.elts:
+        if not isinstance(elt, ast.Str):
+            return None
+        out.append(elt.s)
+    return out
+
+
+class Finder:
+    """Find TestCases in modules without importing anything.
+
+    Use testcases() to get (dotted name, count) tuples for a module. It also
+    notes in defined where each of those classes is defined.
+
+    """
+
+    def __init__(self):
+        self.classes = {}   # {(module name, class name): resolved}
+        self.defined = {}   # {dotted name: dotted name where it is defined}
+
+
+    def testcases(self, name):
+        """Given a dotted module name, return a list of (name, count) tuples.
+
+        These are in the same order as load_testcases would give them. Raise
+        Unresolved if we can't work it out statically.
+
+        """
+        module = parse(name)
+        if (module is None) or (module.error is not None):
+            raise Unresolved(name)
+        bindings = set(module.names)
+        for star in module.stars:
+            bindings.update(self.parse(star).exports())
+        out = []
+        for bound in sorted(bindings):
+            defined, tests = self.resolve_name(module, bound)
+            if defined is not None and tests:
+                dotted = name + '.' + defined.rsplit('.', 1)[1]
+                self.defined[dotted] = defined
+                out.append((dotted, len(tests)))
+        return out
+
+
+    # Resolution
+    # ==========
+    # These return a (defined, tests) tuple, where defined is the dotted name
+    # of the class where it is defined, or None if it's not a TestCase, and
+    # tests is a set of test method names.
+
+    def parse(self, name):
+        module = parse(name)
+        if (module is None) or (module.error is not None):
+            raise Unresolved(name)
+        return module
+
+    def resolve_name(self, module, name, depth=0):
+        """Given a Module and a global name, resolve it.
+        """
+        if depth > 100:
+            raise Unresolved(module.name)
+        binding = module.names.get(name)
+
+        if binding is None:
+            for star in module.stars:
+                if name in self.parse(star).exports():
+                    return self.resolve_attr(star, name, depth+1)
+            if hasattr(__builtin__, name):
+                if isinstance(getattr(__builtin__, name), type):
+                    return NOT_A_TESTCASE
+                return NOT_A_CLASS
+            raise Unresolved(module.name)
+
+        kind = binding[0]
+        if kind == 'class':
+            key = (module.name, name)
+            if key not in self.classes:
+                self.classes[key] = NOT_A_CLASS # in case of cycles
+                self.classes[key] = self.resolve_class(module, binding, depth)
+            return self.classes[key]
+        elif kind == 'ref':
+            return self.resolve_attr(binding[1], binding[2], depth+1)
+        elif kind == 'alias':
+            return self.resolve_expr(module, binding[1], depth+1)
+        return NOT_A_CLASS
+
+    def resolve_class(self, module, binding, depth):
+        """Given a Module and a class binding, resolve it.
+        """
+        kind, classname, bases, tests = binding
+        testcase = False
+        base_tests = set()
+        for base in bases:
+            basename, _tests = self.resolve_expr(module, base, depth+1)
+            if _tests is None:
+                raise Unresolved(module.name) # a base that isn't a class?
+            if basename is not None:
+                testcase = True
+                base_tests.update(_tests)
+        if not testcase:
+            return NOT_A_TESTCASE
+        if tests is None:
+            raise Unresolved(module.name)
+        return (module.name + '.' + classname, base_tests | tests)
+
+    def resolve_expr(self, module, expr, depth):
+        """Given a Module and a Name or Attribute expression, resolve it.
+        """
+        if isinstance(expr, ast.Name):
+            return self.resolve_name(module, expr.id, depth)
+        if not isinstance(expr, ast.Attribute):
+            raise Unresolved(module.name)
+        attrs = []
+        node = expr
+        while isinstance(node, ast.Attribute):
+            attrs.insert(0, node.attr)
+            node = node.value
+        if not isinstance(node, ast.Name):
+            raise Unresolved(module.name)
+        binding = module.names.get(node.id)
+        if (binding is None) or (binding[0] != 'module'):
+            raise Unresolved(module.name)
+        modname = '.'.join([binding[1]] + attrs[:-1])
+        return self.resolve_attr(modname, attrs[-1], depth+1)
+
+    def resolve_attr(self, modname, attr, depth):
+        """Given a dotted module name and an attribute name, resolve it.
+        """
+        if (modname in ('unittest', 'unittest.case')) and (attr == 'TestCase'):
+            return ('unittest.TestCase', set())
+        if locate(modname + '.' + attr) is not None:
+            return NOT_A_CLASS # a submodule
+        return self.resolve_name(self.parse(modname), attr, depth)
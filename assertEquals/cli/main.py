@@ -4,9 +4,13 @@
 
 """
 import getopt
+import os
 import sys
 
+from assertEquals.cli.cache import Cache
 from assertEquals.cli.reporters import detail, summarize
+from assertEquals.cli.watch import find_path, loop
+from assertEquals.cli.worker import serve
 
 
 WINDOWS = sys.platform.find('win') == 0
@@ -22,49 +26,110 @@ def main(argv=None):
         argv = sys.argv
     try:
         try:
-            short = "fst:x:"
-            long_ = [ "find-only"
+            short = "fj:st:x:"
+            long_ = [ "cache-dir="
+                    , "channel="
+                    , "find-only"
+                    , "jobs="
+                    , "no-cache"
                     , "scripted"
+                    , "skip="
                     , "testcase=","TestCase="
                     , "stopwords="
+                    , "watch"
+                    , "worker"
                      ]
             opts, args = getopt.getopt(argv[1:], short, long_)
         except getopt.error, msg:
             raise Usage(msg)
 
+        cache = True        # --no-cache
+        cache_dir = None    # --cache-dir
+        channel = None      # --channel
         find_only = False   # -f
+        jobs = 1            # -j
         scripted = False    # -s
+        skip = []           # --skip
         stopwords = []      # -x
         testcase = None     # -t
+        watch = False       # --watch
+        worker = False      # --worker
 
         for opt, value in opts:
-            if opt in ('-f', '--find-only'):
+            if opt == '--cache-dir':
+                cache_dir = value
+            elif opt == '--channel':
+                channel = int(value)
+            elif opt in ('-f', '--find-only'):
                 find_only = True
+            elif opt in ('-j', '--jobs'):
+                try:
+                    jobs = int(value)
+                except ValueError:
+                    raise Usage("Jobs must be an integer: %s." % value)
+            elif opt == '--no-cache':
+                cache = False
             elif opt in ('-s', '--scripted'):
                 scripted = True
+            elif opt == '--skip':
+                skip = value.split(',')
             elif opt in ('-x', '--stopwords'):
                 stopwords = value.split(',')
             elif opt in ('-t', '--testcase', '--TestCase'):
                 testcase = value
+            elif opt == '--watch':
+                watch = True
+            elif opt == '--worker':
+                worker = True
+
+        if worker:
+            return serve(main, channel)
 
         if len(args) == 1:
             module = args[0]
         else:
             raise Usage("Please specify a module.")
 
+        if watch and (WINDOWS or scripted):
+            try:
+                path = find_path(module)
+            except ImportError: # report it below, as we would without --watch
+                path = None
+            if path is not None:
+                return loop([a for a in argv[1:] if a != '--watch'], path)
+
         if WINDOWS or scripted:
-            if testcase is None:
-                report = summarize(module, find_only, stopwords)
+
+            # If we have a channel, results go there rather than to stdout, and
+            # stdout is left to program output.
+            if channel is not None:
+                channel = os.fdopen(os.dup(channel), 'wb')
+            if cache:
+                cache = Cache(cache_dir)
             else:
-                report = detail(module, testcase)
-            sys.stdout.write(report)
-            
+                cache = None
+
+            try:
+                if testcase is not None:
+                    report = detail(module, testcase, channel)
+                else:
+                    report = summarize( module, find_only, stopwords, jobs
+                                      , channel, skip, cache
+                                       )
+            finally:
+                if channel is not None:
+                    channel.close()
+            if channel is None:
+                sys.stdout.write(report)
+            if testcase is not None:
+                return 0
+
             tfail, terr, tall = summarize._Summarize__totals
             if tfail > 0 or terr > 0: return 2 # non-zero exit-code on errors
             else: return 0
         else:
             from assertEquals.interactive import CursesInterface
-            CursesInterface(module, stopwords)
+            CursesInterface(module, stopwords, jobs, watch)
 
     except Usage, err:
         print >> sys.stderr, err.msg
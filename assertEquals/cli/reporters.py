@@ -1,14 +1,53 @@
+import itertools
 import os
 import sys
+import traceback
 import types
 import unittest
 from StringIO import StringIO
 
+from assertEquals.cli.finder import Finder, Unresolved, locate, submodules
 from assertEquals.cli.utils import *
 
 
-def detail(module_name, testcase_name):
+class TimedResult(unittest._TextTestResult):
+    """A test result that also times each test.
+
+        timings     {test id: (wall, cpu)}, in seconds per clock
+
+    """
+
+    def __init__(self, *args, **kwargs):
+        unittest._TextTestResult.__init__(self, *args, **kwargs)
+        self.timings = {}
+
+    def startTest(self, test):
+        self.__start = clock()
+        unittest._TextTestResult.startTest(self, test)
+
+    def stopTest(self, test):
+        unittest._TextTestResult.stopTest(self, test)
+        wall, cpu = clock()
+        start_wall, start_cpu = self.__start
+        self.timings[test.id()] = (wall - start_wall, cpu - start_cpu)
+
+
+class TimedRunner(unittest.TextTestRunner):
+    """A test runner whose results are TimedResults.
+    """
+
+    def _makeResult(self):
+        return TimedResult(self.stream, self.descriptions, self.verbosity)
+
+
+def detail(module_name, testcase_name, channel=None):
     """Given a module name and a TestCase name, return a detail report.
+
+    If channel is given, it is a file object, and we also write structured
+    records to it (see write_record): one 'test' record for each non-passing
+    test, and then a 'totals' record. Each carries wall and cpu, the seconds
+    of wall clock and CPU time that the test, or the whole TestCase, took.
+
     """
 
     # Get a TestSuite for a single TestCase.
@@ -35,8 +74,33 @@ def detail(module_name, testcase_name):
 
     report = StringIO()
     print >> report, BANNER
-    runner = unittest.TextTestRunner(report)
-    runner.run(suite)
+    runner = TimedRunner(report)
+    start_wall, start_cpu = clock()
+    result = runner.run(suite)
+    wall, cpu = clock()
+
+    if channel is not None:
+        flubs = [('error', f) for f in result.errors]
+        flubs += [('failure', f) for f in result.failures]
+        for flop, (test, traceback_) in flubs:
+            _wall, _cpu = result.timings.get(test.id(), (None, None))
+            record = { 'kind': 'test'
+                     , 'name': test.id().rsplit('.', 1)[1]
+                     , 'flop': flop
+                     , 'traceback': traceback_.strip()
+                     , 'wall': _wall
+                     , 'cpu': _cpu
+                      }
+            write_record(channel, record)
+        record = { 'kind': 'totals'
+                 , 'fail': len(result.failures)
+                 , 'err': len(result.errors)
+                 , 'all': result.testsRun
+                 , 'wall': wall - start_wall
+                 , 'cpu': cpu - start_cpu
+                  }
+        write_record(channel, record)
+
     return report.getvalue()
 
 
@@ -45,65 +109,134 @@ class _Summarize:
 
     The format of the report is:
 
-        -------------<| assertEquals |>-------------
+        ------------------<| assertEquals |>------------------
         <header row>
-        --------------------------------------------
-        <name> <passing> <failures> <errors> <total>
-        --------------------------------------------
-        TOTALS <passing> <failures> <errors> <total>
+        ------------------------------------------------------
+        <name> <passing> <failures> <errors> <total> <duration>
+        ------------------------------------------------------
+        TOTALS <passing> <failures> <errors> <total> <duration>
 
     Boilerplate rows are actually 80 characters long, though. <passing> is given
-    as a percentage (with a terminating percent sign); the other three are given
-    in absolute terms. Data rows will be longer than 80 characters iff the field
-    values exceed the following character lengths:
+    as a percentage (with a terminating percent sign); the next three are given
+    in absolute terms. <duration> is how long the TestCase took to run, or, for
+    the totals, the whole run, in seconds of wall clock time (see clock and
+    format_duration). Data rows are 89 characters long, and will be longer iff
+    the field values exceed the following character lengths:
 
         name        60
         failures     4
         errors       4
         total        4
 
-    If run is False, then no statistics on passes, failures, and errors will be
-    available, and the output for each will be a dash character ('-'). run
-    defaults to True. All submodules will also be included in the output, unless
-    their name contains a stopword.
+    If run is False, then no statistics on passes, failures, errors, and
+    durations will be available, and the output for each will be a dash
+    character ('-'). run defaults to True. All submodules will also be included
+    in the output, unless their name contains a stopword. A submodule that
+    fails to import is left out, with a note on stderr.
 
     The report is delivered after it is fully complete. We do this rather than
     delivering data in real time in order to avoid program output and pdb
     sessions from cluttering up our report.
 
+    If jobs is greater than one, TestCases are run in that many worker
+    processes. The report is the same as for a serial run.
+
+    If channel is given, it is a file object, and we also write structured
+    records to it (see write_record): one 'testcase' record per row, and then a
+    'totals' record. fail and err are None if find_only is True. Otherwise,
+    testcase records also carry deps, a {filename: digest} dictionary of the
+    source files that the TestCase depends on. All records carry wall and cpu,
+    the seconds of wall clock and CPU time that the TestCase took, or None if
+    it wasn't run. For the totals, wall is for the whole run, and cpu is summed
+    over the TestCases, so that it takes in worker processes.
+
+    A TestCase that is found in more than one module (because it is imported
+    into another one, say) is only run once. We give it the name of the module
+    that defines it, where we can, and list the other names as aliases after
+    the totals. Its testcase record carries these as aliases.
+
+    TestCases named in skip are left out of the report entirely. The caller
+    uses this when it already has results for them, so it can name most of the
+    tree; we keep it as a set.
+
+    If cache is given, it is a Cache. We look up each TestCase there before
+    running it, and store the results of TestCases that pass. Results from the
+    cache have no durations, since they weren't run this time.
+
+    Time is measured with self.clock, which is clock unless you stop it for
+    testing.
+
     This callable is implemented as a class to make testing easier. It should be
     used via the singleton named summarize.
 
     """
 
+    jobs = 1
+    channel = None
+    clock = None
+    skip = ()
+    cache = None
+    deps = None
+    digests = None
+    keys = None
+    aliases = None
+    __duration = (None, None) # (wall, cpu) for the whole run; see print_body
+
     def __init__(self):
         """
         """
         self.report = StringIO()
         self.runner = unittest.TextTestRunner(dev_null())
         self.make_suite = unittest.defaultTestLoader.loadTestsFromTestCase
+        self.clock = clock
 
 
-    def __call__(self, module, find_only=False, stopwords=()):
+    def __call__( self, module, find_only=False, stopwords=(), jobs=1
+                , channel=None, skip=(), cache=None
+                 ):
         """
         """
         self.module = module
         self.find_only = find_only
         self.stopwords = stopwords
+        self.jobs = jobs
+        self.channel = channel
+        self.skip = set(skip)
+        self.cache = cache
+        self.report = StringIO() # we may be called more than once (--worker)
+        self.deps = {}
+        self.digests = {}
 
         self.find_testcases()
 
         self.print_header()
         self.print_body()
         self.print_footer()
+        self.print_aliases()
+
+        tfail, terr, tall = self.__totals
+        twall, tcpu = self.__duration
+        if self.find_only:
+            tfail = terr = None
+        self.send( kind='totals', fail=tfail, err=terr, all=tall
+                 , wall=twall, cpu=tcpu
+                  )
 
         return self.report.getvalue()
 
 
-    def load_testcases(self, module):
+    def send(self, **record):
+        """Write a record to our channel, if we have one.
+        """
+        if self.channel is not None:
+            write_record(self.channel, record)
+
+
+    def load_testcases(self, module, attrs=False):
         """Given a module, return a list of TestCases defined there.
 
-        We only keep the TestCase if it has tests.
+        We only keep the TestCase if it has tests. If attrs is True, each item
+        is paired with the name of the module attribute where we found it.
 
         """
         testcases = []
@@ -114,40 +247,191 @@ class _Summarize:
                     for _name in dir(obj):
                         if _name.startswith('test'):
                             name_dotted = module.__name__+'.'+obj.__name__
-                            testcases.append((name_dotted, obj))
+                            if attrs:
+                                testcases.append((name, (name_dotted, obj)))
+                            else:
+                                testcases.append((name_dotted, obj))
                             break
         return testcases
 
 
     def find_testcases(self):
         """Store a list of TestCases below the currently named module.
+
+        This is a list of (name, TestCase) tuples. For find-only runs we read
+        source files rather than importing them (see finder), and in place of
+        a TestCase we may have the number of tests it has. Where we discovered
+        TestCases in worker processes, we have a (module name, attribute name)
+        tuple instead (see resolve).
+
         """
+        self.keys = {}
+        self.aliases = {}
+        if self.find_only:
+            testcases = self.find_statically()
+        else:
+            testcases = self.find_by_import()
+        testcases = self.dedupe(testcases)
+        if self.skip:
+            testcases = [t for t in testcases if t[0] not in self.skip]
+        self.__testcases = testcases
+
+
+    def find_by_import(self):
+        """Return a list of TestCases below the currently named module.
+
+        We walk the filesystem for submodules (see submodules), and import each
+        one to look for TestCases. If self.jobs is greater than one, we do the
+        importing in that many worker processes, and get back (module name,
+        attribute name) tuples in place of TestCases (see discover). Otherwise
+        we import everything here. Submodules that fail to import are skipped
+        (see try_load).
+
+        """
+        names = submodules(self.module, self.stopwords)
+        if self.jobs < 2 or len(names) < 2 or not hasattr(os, 'fork'):
+            testcases = []
+            for name in names:
+                module, error = self.try_load(name)
+                if module is None:
+                    self.skipped(name, error)
+                    continue
+                testcases.extend(self.load_testcases(module))
+            for name, testcase in testcases:
+                self.keys[name] = self.identify(name, testcase)
+            return testcases
+
+        found = [None] * len(names)
+        for i, result in fork_map(self.discover, names, self.jobs):
+            found[i] = result
+        testcases = []
+        for name, (error, result) in zip(names, found):
+            if error is not None:
+                self.skipped(name, error)
+            for name, testcase, key, deps in result:
+                self.keys[name] = key
+                if deps is not None:
+                    self.deps[name] = deps
+                testcases.append((name, tuple(testcase)))
+        return testcases
+
 
-        basemod = load(self.module)
-        testcases = self.load_testcases(basemod)
+    def discover(self, name):
+        """Given a dotted module name, return a 2-tuple: (error, a list of
+        (name, id, key, deps) tuples).
 
-        path = os.path.dirname(basemod.__file__)
-        for name in sorted(sys.modules):
-            if name == basemod.__name__:
-               continue
+        This runs in a worker process, so we only return what marshal can
+        handle: error is as for try_load, id is a (module name, attribute name)
+        tuple, key is as for identify, and deps is as for get_deps, or None if
+        we don't need it.
+
+        """
+        module, error = self.try_load(name)
+        if module is None:
+            return error, []
+        out = []
+        for attr, (name_dotted, testcase) in self.load_testcases(module, True):
+            deps = None
+            if (self.channel is not None) or (self.cache is not None):
+                deps = self.get_deps(name_dotted, testcase)
+            key = self.identify(name_dotted, testcase)
+            out.append((name_dotted, (module.__name__, attr), key, deps))
+        return None, out
+
+
+    def try_load(self, name):
+        """Given a dotted module name, return a 2-tuple: (module, error).
+
+        The module we were asked for has to import, but one below it that
+        doesn't shouldn't stop the report, so for that we return None and a
+        line describing the exception instead.
+
+        """
+        if name == self.module:
+            return load(name), None
+        try:
+            return load(name), None
+        except StandardError:
+            error = traceback.format_exception_only(*sys.exc_info()[:2])
+            return None, error[-1].strip()
+
+
+    def skipped(self, name, error):
+        """Given a dotted module name and an error per try_load, say that we
+        are leaving the module out.
+
+        This goes to stderr, before the report starts.
+
+        """
+        print >> sys.stderr, "assertEquals: skipping %s: %s" % (name, error)
+
+
+    def find_statically(self):
+        """Return a list of TestCases below the currently named module, without
+        importing it if we can help it.
+        """
+
+        if locate(self.module) is None: # not Python source; import it after all
+            return self.find_by_import()
+
+        finder = Finder()
+        testcases = []
+        for name in submodules(self.module, self.stopwords):
             try:
-                for word in self.stopwords:
-                    if word and word in name:
-                        stop = True
-                        raise StopWord
-            except StopWord:
-                continue
-            if not name.startswith(self.module):
-                continue
-            module = sys.modules[name]
-            if module is None:
-                continue
-            if not module.__file__.startswith(path):
-                # Skip external modules that ended up in our namespace.
-                continue
-            testcases.extend(self.load_testcases(module))
+                testcases.extend(finder.testcases(name))
+            except Unresolved:
+                module, error = self.try_load(name)
+                if module is None:
+                    self.skipped(name, error)
+                    continue
+                for name, testcase in self.load_testcases(module):
+                    self.keys[name] = self.identify(name, testcase)
+                    testcases.append((name, testcase))
+        self.keys.update(finder.defined)
 
-        self.__testcases = testcases
+        return testcases
+
+
+    def identify(self, name, testcase):
+        """Given a dotted name and a TestCase, return a key for the TestCase.
+
+        This is the dotted name where the TestCase is defined, if it can be
+        found there, so it is the same in every process. Otherwise (a class
+        made by a factory function, say) it is the name we found it under.
+
+        """
+        module = sys.modules.get(testcase.__module__)
+        if getattr(module, testcase.__name__, None) is testcase:
+            return testcase.__module__ + '.' + testcase.__name__
+        return name
+
+
+    def dedupe(self, testcases):
+        """Given a list of (name, TestCase) tuples, return it without aliases.
+
+        Where a TestCase was found under more than one name, we keep the name
+        where it is defined, if we found it there, and otherwise the first
+        name. We store the others in self.aliases, a {name: [aliases]} dict.
+
+        """
+        keep = {} # {key: name}
+        for name, testcase in testcases:
+            key = self.keys.get(name, name)
+            if (key not in keep) or (name == key):
+                keep[key] = name
+        out = []
+        done = set()
+        for name, testcase in testcases:
+            canonical = keep[self.keys.get(name, name)]
+            if name == canonical:
+                if name not in done:
+                    done.add(name)
+                    out.append((name, testcase))
+            else:
+                aliases = self.aliases.setdefault(canonical, [])
+                if name not in aliases:
+                    aliases.append(name)
+        return out
 
 
     def print_header(self):
@@ -159,27 +443,24 @@ class _Summarize:
 
 
     def print_body(self):
-        """Print the report body; set three members on self for print_footer.
+        """Print the report body; set totals and durations for print_footer.
         """
 
         tfail = terr = tall = 0
+        tcpu = None
 
-        for name, testcase in self.__testcases:
-
-            pass5 = fail = err = 0 # FWIW: pass -> pass% -> pass5
-            suite = self.make_suite(testcase)
-            all = suite.countTestCases()
+        start = self.clock()[0]
+        results = self.run_testcases()
+        twall = self.clock()[0] - start
+        for (name, testcase), result in zip(self.__testcases, results):
+            fail, err, all, wall, cpu = result
 
-
-            # Run tests if requested.
-            # =======================
+            if cpu is not None:
+                tcpu = (tcpu or 0) + cpu
 
             if not self.find_only:
-                pass5 = fail = err = 0
+                pass5 = 0 # FWIW: pass -> pass% -> pass5
                 if all != 0:
-                    result = self.runner.run(suite)
-                    fail = len(result.failures)
-                    err = len(result.errors)
                     pass5 = (all - fail - err) / float(all)
                     pass5 =  int(round(pass5*100))
 
@@ -201,17 +482,147 @@ class _Summarize:
                 pass5 = '  - '
             else: # int
                 pass5 = str(pass5).rjust(3)+'%'
-            print >> self.report, name, pass5, sfail, serr, sall
+            duration = format_duration(wall).rjust(8)
+            print >> self.report, name, pass5, sfail, serr, sall, duration
 
 
         self.__totals = tfail, terr, tall
+        if self.find_only:
+            twall = None
+        self.__duration = twall, tcpu
+
+
+    def run_testcases(self):
+        """Return a list of (fail, err, all, wall, cpu) tuples, one per
+        TestCase, in order.
+
+        If self.jobs is greater than one, the TestCases are spread across that
+        many worker processes. We fall back to running serially where we can't
+        fork. Either way, we send a record for each TestCase as soon as it is
+        done, so that the other end of our channel can show progress.
+
+        """
+        testcases = [testcase for name, testcase in self.__testcases]
+        out = [None] * len(testcases)
+        todo = range(len(testcases))
+
+
+        # Look for results in the cache.
+        # ==============================
+
+        cached = []     # [(index, result)]
+        keys = {}       # {index: key} for TestCases that we need to run
+        if self.cache is not None and not self.find_only:
+            todo = []
+            for i, (name, testcase) in enumerate(self.__testcases):
+                key = self.cache.key(name, self.get_deps(name, testcase))
+                result = self.cache.get(key)
+                if result is None:
+                    keys[i] = key
+                    todo.append(i)
+                else:
+                    cached.append((i, result + (None, None))) # not timed
+
+
+        # Run the rest.
+        # =============
+
+        tasks = [testcases[i] for i in todo]
+        if self.find_only or self.jobs < 2 or not hasattr(os, 'fork'):
+            results = ((j, self.run_testcase(t)) for j, t in enumerate(tasks))
+        else:
+            results = fork_map(self.run_testcase, tasks, self.jobs)
+        results = ((todo[j], result) for j, result in results)
+
+        for i, result in itertools.chain(cached, results):
+            fail, err, all, wall, cpu = out[i] = tuple(result)
+            name = self.__testcases[i][0]
+            extra = {}
+            if name in self.aliases:
+                extra['aliases'] = self.aliases[name]
+            if self.find_only:
+                self.send( kind='testcase', name=name, fail=None, err=None
+                         , all=all, wall=None, cpu=None, **extra
+                          )
+                continue
+            if (i in keys) and (fail == err == 0):
+                self.cache.put(keys[i], out[i][:3])
+            if self.channel is not None:
+                deps = self.get_deps(name, testcases[i])
+                self.send( kind='testcase', name=name, fail=fail, err=err
+                         , all=all, wall=wall, cpu=cpu, deps=deps, **extra
+                          )
+
+        if self.cache is not None:
+            self.cache.prune()
+        return out
+
+
+    def get_deps(self, name, testcase):
+        """Given a dotted name and a TestCase, return a {filename: digest} dict.
+
+        We include the module where we found the TestCase as well as the one
+        that defines it.
+
+        """
+        if name in self.deps:
+            return self.deps[name]
+        testcase = self.resolve(testcase)
+        deps = {}
+        modules = [name.rsplit('.', 1)[0], testcase.__module__]
+        for module in modules:
+            module = sys.modules.get(module)
+            if module is None:
+                continue
+            for filename in dependencies(module):
+                if filename not in self.digests:
+                    self.digests[filename] = digest(filename)
+                deps[filename] = self.digests[filename]
+        self.deps[name] = deps
+        return deps
+
+
+    def run_testcase(self, testcase):
+        """Given a TestCase, return a (fail, err, all, wall, cpu) tuple.
+
+        We only run the tests if find_only is False; otherwise wall and cpu are
+        None.
+
+        """
+        if isinstance(testcase, int): # found statically; see find_testcases
+            return (0, 0, testcase, None, None)
+        testcase = self.resolve(testcase)
+        suite = self.make_suite(testcase)
+        all = suite.countTestCases()
+        fail = err = 0
+        wall = cpu = None
+        if all != 0 and not self.find_only:
+            start_wall, start_cpu = self.clock()
+            result = self.runner.run(suite)
+            wall, cpu = self.clock()
+            wall, cpu = wall - start_wall, cpu - start_cpu
+            fail = len(result.failures)
+            err = len(result.errors)
+        return (fail, err, all, wall, cpu)
+
+
+    def resolve(self, testcase):
+        """Given a TestCase or a (module name, attribute name) tuple, return a
+        TestCase, importing it if need be.
+        """
+        if isinstance(testcase, tuple):
+            modname, attr = testcase
+            testcase = getattr(load(modname), attr)
+        return testcase
 
 
     def print_footer(self, *totals):
-        """Print the report footer; uses the 3 integers set by print_body.
+        """Print the report footer; uses the totals and durations set by
+        print_body.
         """
 
         tfail, terr, tall = self.__totals
+        twall, tcpu = self.__duration
 
         if not self.find_only:
             tpass5 = 0
@@ -227,8 +638,28 @@ class _Summarize:
         raw = (tpass5, tfail, terr, tall)
         tpass5, tfail, terr, tall = [str(s).rjust(4) for s in raw]
 
+        duration = format_duration(twall).rjust(8)
+
+        print >> self.report, BORDER
+        row = ("TOTALS".ljust(60), tpass5, tfail, terr, tall, duration)
+        print >> self.report, ' '.join(row)
+
+
+    def print_aliases(self):
+        """Print the other names of TestCases found under more than one name.
+        """
+        aliases = []
+        for name, _aliases in self.aliases.iteritems():
+            if name in self.skip:
+                continue
+            aliases.extend([(alias, name) for alias in _aliases])
+        if not aliases:
+            return
+        print >> self.report
+        print >> self.report, "ALIASES"
         print >> self.report, BORDER
-        print >> self.report, "TOTALS".ljust(60), tpass5, tfail, terr, tall
+        for alias, name in sorted(aliases):
+            print >> self.report, alias.ljust(60), '=', name
 
 
 summarize = _Summarize()
@@ -1,19 +1,42 @@
+import hashlib
+import marshal
+import os
+import select
+import signal
+import struct
+import sys
+import time
+import traceback
+import types
 import unittest
 
-__all__ = ( 'BANNER', 'BORDER', 'HEADERS', 'StopWord', 'dev_null', 'flatten'
-          , 'load')
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+__all__ = ( 'BANNER', 'BORDER', 'HEADERS', 'WorkerError', 'clock'
+          , 'dependencies', 'dev_null', 'digest', 'flatten', 'fork_map'
+          , 'format_duration', 'load', 'read_record', 'source_file'
+          , 'write_record')
 
 
 
 C = '-'
 BANNER = C*31 + "<| assertEquals |>" + C*31
 BORDER = C * 80
-HEADERS = ' '.join(["MODULE".ljust(60), "PASS", "FAIL", " ERR", " ALL"])
+HEADERS = ' '.join([ "MODULE".ljust(60), "PASS", "FAIL", " ERR", " ALL"
+                   , "DURATION"
+                    ])
+STDLIB = os.path.dirname(os.__file__) + os.sep
 
 
-class StopWord(StandardError):
-    """Signals a stop word within a dotted module name.
+class WorkerError(StandardError):
+    """An error in a worker process; carries the remote traceback.
     """
+    def __init__(self, traceback):
+        StandardError.__init__(self, traceback)
+        self.traceback = traceback
 
 
 class dev_null:
@@ -25,6 +48,29 @@ class dev_null:
         pass
 
 
+def clock():
+    """Return a 2-tuple of floats: (wall, cpu) seconds, for timing tests.
+
+    CPU time is user plus system time for this process, per getrusage, where we
+    have it.
+
+    """
+    if resource is None:
+        return (time.time(), time.clock())
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return (time.time(), usage.ru_utime + usage.ru_stime)
+
+
+def format_duration(seconds):
+    """Given a number of seconds, or None, return a string of up to 8 chars.
+    """
+    if seconds is None:
+        return '-'
+    elif seconds < 1000:
+        return '%.3fs' % seconds
+    return '%ds' % round(seconds)
+
+
 def flatten(_suite):
     """Given a TestSuite, return a flattened TestSuite.
     """
@@ -47,3 +93,193 @@ def load(name):
     for _name in name.split('.')[1:]:
         module = getattr(module, _name)
     return module
+
+
+def source_file(module):
+    """Given a module, return the filename of its source, or None.
+    """
+    filename = getattr(module, '__file__', None)
+    if not filename:
+        return None
+    if filename.endswith(('.pyc', '.pyo')):
+        filename = filename[:-1]
+    return filename
+
+
+def in_stdlib(filename):
+    """Given a filename, return a boolean: is it part of the standard library?
+    """
+    if not filename.startswith(STDLIB):
+        return False
+    top = filename[len(STDLIB):].split(os.sep)[0]
+    return top not in ('site-packages', 'dist-packages')
+
+
+def dependencies(module):
+    """Given a module, return a sorted list of the source files it depends on.
+
+    We follow the module's globals, both modules and objects defined in other
+    modules. The packages above each module that we reach are included, but we
+    don't follow their globals, which would take in all of their submodules. We
+    do not follow into the standard library. Imports that only happen at run
+    time are not seen.
+
+    """
+    seen = set()
+    todo = [module]
+    files = set()
+
+    while todo:
+        module = todo.pop()
+        if module.__name__ in seen:
+            continue
+        seen.add(module.__name__)
+        filename = source_file(module)
+        if filename is None or in_stdlib(filename):
+            continue
+        files.add(filename)
+
+        parts = module.__name__.split('.')
+        for i in range(1, len(parts)):
+            filename = source_file(sys.modules.get('.'.join(parts[:i])))
+            if filename is not None:
+                files.add(filename)
+
+        for value in vars(module).values():
+            if isinstance(value, types.ModuleType):
+                todo.append(value)
+                continue
+            try:
+                name = getattr(value, '__module__', None)
+            except:
+                continue
+            if isinstance(name, basestring):
+                if sys.modules.get(name) is not None:
+                    todo.append(sys.modules[name])
+
+    return sorted(files)
+
+
+def digest(filename):
+    """Given a filename, return a hash of its contents, or None if unreadable.
+    """
+    try:
+        fp = open(filename, 'rb')
+    except IOError:
+        return None
+    try:
+        return hashlib.md5(fp.read()).hexdigest()
+    finally:
+        fp.close()
+
+
+def write_record(fp, record):
+    """Given a file object and a marshallable object, write a length-prefixed
+    record.
+    """
+    data = marshal.dumps(record)
+    fp.write(struct.pack('!I', len(data)) + data)
+    fp.flush()
+
+
+def read_record(fp):
+    """Given a file object, read and return one record; None at EOF.
+    """
+    header = fp.read(4)
+    if len(header) < 4:
+        return None
+    size, = struct.unpack('!I', header)
+    return marshal.loads(fp.read(size))
+
+
+def fork_map(func, items, jobs):
+    """Given a callable, a list, and an int, yield (index, result) pairs.
+
+    Items are handed out one at a time to up to jobs worker processes forked
+    from this one, so the workers see everything we have already imported.
+    Results are yielded as they come in, which is not necessarily in order.
+    func must return something that marshal can handle.
+
+    """
+
+    workers = {}    # {result file: (pid, task file)}
+    fds = []        # parent ends of all pipes, for children to close
+    todo = range(len(items))
+    todo.reverse()
+    pending = len(items)
+
+    sys.stdout.flush()
+    try:
+
+        # Start workers.
+        # ==============
+
+        for n in range(min(jobs, len(items))):
+            task_r, task_w = os.pipe()
+            result_r, result_w = os.pipe()
+            pid = os.fork()
+            if pid == 0: # child
+                try:
+                    for fd in fds + [task_w, result_r]:
+                        os.close(fd)
+                    _serve( func
+                          , items
+                          , os.fdopen(task_r, 'r')
+                          , os.fdopen(result_w, 'wb')
+                           )
+                finally:
+                    os._exit(0)
+            os.close(task_r)
+            os.close(result_w)
+            fds.extend([task_w, result_r])
+            tasks = os.fdopen(task_w, 'w')
+            results = os.fdopen(result_r, 'rb')
+            workers[results] = (pid, tasks)
+            print >> tasks, todo.pop()
+            tasks.flush()
+
+
+        # Collect results, handing out work as workers become idle.
+        # ==========================================================
+
+        while pending:
+            ready = select.select(workers.keys(), [], [])[0]
+            for results in ready:
+                record = read_record(results)
+                if record is None:
+                    raise WorkerError("A worker process died unexpectedly.")
+                i, ok, result = record
+                if not ok:
+                    raise WorkerError(result)
+                pending -= 1
+                tasks = workers[results][1]
+                if todo:
+                    print >> tasks, todo.pop()
+                    tasks.flush()
+                yield i, result
+
+    finally:
+        for results, (pid, tasks) in workers.items():
+            if pending: # we are bailing early; don't wait for running tests
+                os.kill(pid, signal.SIGKILL)
+            tasks.close()
+            results.close()
+            os.waitpid(pid, 0)
+
+
+def _serve(func, items, tasks, results):
+    """Worker loop for fork_map; reads indices, writes results.
+    """
+    try:
+        while 1:
+            line = tasks.readline()
+            if not line:
+                break
+            i = int(line)
+            try:
+                record = (i, True, func(items[i]))
+            except:
+                record = (i, False, traceback.format_exc())
+            write_record(results, record)
+    finally:
+        sys.stdout.flush()
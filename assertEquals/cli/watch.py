@@ -0,0 +1,240 @@
+"""Watch a directory tree for changes to Python source files.
+
+On Linux we use inotify(7), through ctypes. Elsewhere, or if that doesn't
+work, we fall back to polling the tree for changes in mtime and size. Either
+way, changes are debounced: an editor saving a file can produce a burst of
+events, and we only report once things have been quiet for a moment.
+
+"""
+import ctypes
+import ctypes.util
+import errno
+import imp
+import os
+import select
+import struct
+import subprocess
+import sys
+import time
+
+
+# inotify constants, from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 00004000
+IN_CLOEXEC = 02000000
+MASK = ( IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+       | IN_DELETE
+        )
+EVENT = struct.Struct('iIII') # wd, mask, cookie, len
+
+
+def find_path(name):
+    """Given a dotted module name, return the directory of its top package.
+
+    We don't import anything, since that is the child's job. We watch the top
+    package rather than the named module, so as to see changes to the code
+    under test as well as to the tests.
+
+    """
+    top = name.split('.')[0]
+    fp, path, description = imp.find_module(top)
+    if fp is not None:
+        fp.close()
+    if description[2] != imp.PKG_DIRECTORY:
+        path = os.path.dirname(path)
+    return os.path.abspath(path)
+
+
+def walk(path):
+    """Given a directory, return a {filename: (mtime, size)} dict for sources.
+    """
+    out = {}
+    for root, dirs, files in os.walk(path):
+        for name in files:
+            if name.endswith('.py'):
+                filename = os.path.join(root, name)
+                try:
+                    stat = os.stat(filename)
+                except OSError:
+                    continue
+                out[filename] = (stat.st_mtime, stat.st_size)
+    return out
+
+
+class Watcher:
+    """Represent a directory tree that we are watching.
+
+    Call poll() to get a sorted list of source files that have changed; it
+    never blocks. Call wait() to block until there are some.
+
+    """
+
+    delay = 0.2     # seconds of quiet before we report a burst of changes
+    interval = 0.5  # seconds between walks of the tree, when polling
+
+    def __init__(self, path):
+        """Takes the path to a directory.
+        """
+        self.path = path
+        self.changed = set()
+        self.last = 0           # when we last saw a change
+        self.fd = None          # the inotify file descriptor, if any
+        self.wds = {}           # {watch descriptor: directory}
+        try:
+            self.start_inotify()
+        except (AttributeError, OSError):
+            self.fd = None
+            self.mtimes = walk(path)
+            self.walked = time.time()
+
+
+    def fileno(self):
+        """Return our inotify file descriptor, or None if we are polling.
+        """
+        return self.fd
+
+
+    def poll(self):
+        """Return a sorted list of changed source files, or an empty list.
+        """
+        if self.fd is not None:
+            self.read_inotify()
+        elif time.time() - self.walked >= self.interval:
+            self.read_walk()
+        if self.changed and (time.time() - self.last >= self.delay):
+            changed = sorted(self.changed)
+            self.changed = set()
+            return changed
+        return []
+
+
+    def wait(self, timeout=None):
+        """Block until there are changes, and return them; [] on timeout.
+        """
+        end = None
+        if timeout is not None:
+            end = time.time() + timeout
+        while 1:
+            changed = self.poll()
+            if changed:
+                return changed
+            now = time.time()
+            if (end is not None) and (now >= end):
+                return []
+            pause = self.interval
+            if self.changed:
+                pause = self.delay
+            if end is not None:
+                pause = min(pause, end - now)
+            if self.fd is not None:
+                select.select([self.fd], [], [], pause)
+            else:
+                time.sleep(pause)
+
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+    # inotify
+    # =======
+
+    def start_inotify(self):
+        """Set up inotify watches on our tree; raise OSError if we can't.
+        """
+        if not sys.platform.startswith('linux'):
+            raise OSError("inotify is only available on Linux.")
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.fd = fd
+        try:
+            for root, dirs, files in os.walk(self.path):
+                self.add_watch(root)
+        except OSError: # out of watches, say; we'll poll instead
+            self.close()
+            self.wds = {}
+            raise
+
+    def add_watch(self, path):
+        wd = self.libc.inotify_add_watch(self.fd, path, MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+        self.wds[wd] = path
+
+    def read_inotify(self):
+        """Read all pending events, noting changes to source files.
+        """
+        while 1:
+            try:
+                data = os.read(self.fd, 65536)
+            except OSError, err:
+                if err.errno in (errno.EAGAIN, errno.EINTR):
+                    return
+                raise
+            i = 0
+            while i < len(data):
+                wd, mask, cookie, size = EVENT.unpack_from(data, i)
+                i += EVENT.size
+                name = data[i:i+size].rstrip('\0')
+                i += size
+                if wd not in self.wds:
+                    continue
+                filename = os.path.join(self.wds[wd], name)
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        try:
+                            self.add_watch(filename)
+                        except OSError:
+                            pass
+                elif name.endswith('.py'):
+                    self.changed.add(filename)
+                    self.last = time.time()
+
+
+    # polling
+    # =======
+
+    def read_walk(self):
+        """Walk our tree, noting changes to source files.
+        """
+        mtimes = walk(self.path)
+        for filename in set(mtimes) | set(self.mtimes):
+            if mtimes.get(filename) != self.mtimes.get(filename):
+                self.changed.add(filename)
+                self.last = time.time()
+        self.mtimes = mtimes
+        self.walked = time.time()
+
+
+def loop(argv, path):
+    """Given an argument list for a scripted child and a directory, run the
+    child, and again whenever source files under the directory change.
+
+    Each run is a fresh process, so it sees the new code. TestCases that still
+    pass are found in the cache rather than being run again.
+
+    """
+    watcher = Watcher(path)
+    args = [sys.executable, '-u', sys.argv[0]] + argv
+    try:
+        try:
+            while 1:
+                subprocess.call(args)
+                print >> sys.stderr, "Watching %s for changes ..." % path
+                changed = watcher.wait()
+                for filename in changed:
+                    print >> sys.stderr, "  changed: %s" % filename
+        except KeyboardInterrupt:
+            pass
+    finally:
+        watcher.close()
+    return 0
@@ -0,0 +1,152 @@
+"""A long-lived process that runs reports on request.
+
+The interactive interface starts one of these (assertEquals --worker) and
+keeps it around, so that imports stay warm between refreshes. Requests come in
+on stdin, one per line, as tab-delimited command-line arguments, the last of
+which is a dotted module name. We are also given the file descriptor of a
+structured result channel, which we hand on to main() for each request.
+
+We are a "zygote": for each request we import the named module tree into
+ourselves (unless it's find-only, which reads source rather than importing),
+and then fork a fresh child to handle the request with main(). The child
+inherits our imports copy-on-write, so it pays no import cost, and whatever
+the tests do to module state dies with it. The report goes to stdout as usual,
+and once the child has exited we follow it with SENTINEL, and with a 'done'
+record on the channel. stdin and stdout are left alone otherwise, so that Pdb
+sessions work the same as they do in a one-off child process. Where we can't
+fork, we handle requests ourselves.
+
+If any of the source files we have imported has changed since the last
+request, we exit with RESTART rather than serving the request with stale code.
+
+"""
+import os
+import sys
+import traceback
+
+from assertEquals.cli.finder import submodules
+from assertEquals.cli.utils import load, source_file, write_record
+
+
+SENTINEL = '\0<| assertEquals: done |>\0\n'
+RESTART = 3
+
+
+def serve(main, channel=None):
+    """Given the main() callable and a file descriptor, serve requests until
+    stdin is closed.
+    """
+    if channel is not None:
+        done = os.fdopen(os.dup(channel), 'wb')
+    mtimes = snapshot()
+    while 1:
+        line = sys.stdin.readline()
+        if not line:
+            return 0
+        if stale(mtimes):
+            return RESTART
+
+        argv = ['assertEquals'] + line.rstrip('\n').split('\t')
+        if channel is not None:
+            argv.insert(1, '--channel=%d' % channel)
+        if '--find-only' not in argv: # that doesn't import anything
+            preload(argv)
+            mtimes = snapshot()
+
+        if hasattr(os, 'fork'):
+            sys.stdout.flush()
+            pid = os.fork()
+            if pid == 0: # child
+                try:
+                    handle(main, argv)
+                finally:
+                    os._exit(0)
+            os.waitpid(pid, 0)
+        else:
+            handle(main, argv)
+            mtimes = snapshot()
+
+        if channel is not None:
+            write_record(done, {'kind': 'done'})
+        sys.stdout.write(SENTINEL)
+        sys.stdout.flush()
+
+
+def handle(main, argv):
+    """Given the main() callable and an argument list, handle one request.
+    """
+    try:
+        main(argv)
+    except:
+        traceback.print_exc(file=sys.stdout)
+    sys.stdout.flush()
+
+
+def preload(argv):
+    """Given the argument list of a request, do its imports, swallowing errors.
+
+    These are the same imports that _Summarize and detail() do, so the child
+    finds everything already loaded: for a summary, the module and the
+    submodules that _Summarize walks to (see finder.submodules), leaving out
+    those with stopwords; for a detail request, just the module. Requests come
+    from the interactive interface, which spells out its options in full.
+
+    """
+    name = argv[-1]
+    stopwords = ()
+    detail = False
+    for arg in argv[1:-1]:
+        if arg.startswith('--stopwords='):
+            stopwords = arg.split('=', 1)[1].split(',')
+        elif arg.startswith(('--testcase=', '--TestCase=')):
+            detail = True
+    if not try_load(name) or detail:
+        return
+    for name in submodules(name, stopwords)[1:]:
+        try_load(name)
+
+
+def try_load(name):
+    """Given a dotted module name, import it; return a boolean: did it work?
+
+    If there is an error, we forget any modules we half-imported, so that the
+    child will run into it again and report it.
+
+    """
+    before = set(sys.modules)
+    try:
+        load(name)
+    except:
+        for name in set(sys.modules) - before:
+            del sys.modules[name]
+        return False
+    return True
+
+
+def snapshot():
+    """Return a dictionary of {filename: (mtime, size)} for imported modules.
+    """
+    out = {}
+    for module in sys.modules.values():
+        filename = source_file(module)
+        if filename is None:
+            continue
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            continue
+        out[filename] = (stat.st_mtime, stat.st_size)
+    return out
+
+
+def stale(mtimes):
+    """Given a snapshot, return a boolean: has any of these files changed?
+    """
+    for filename, mtime in mtimes.iteritems():
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return True
+        if (stat.st_mtime, stat.st_size) != mtime:
+            return True
+    return False
@@ -5,15 +5,24 @@ import os
 
 from assertEquals.interactive.screens.summary import SummaryScreen
 from assertEquals.interactive.screens.detail import DetailScreen
-from assertEquals.interactive.utils import Bucket
+from assertEquals.interactive.utils import Bucket, Runner, Worker
 
 
 class CursesInterface:
 
-    def __init__(self, module, stopwords):
+    def __init__(self, module, stopwords, jobs=1, watch=False):
         self.module = module
         self.stopwords = stopwords
-        curses.wrapper(self.wrapme)
+        self.jobs = jobs
+        self.watch = watch
+        self.worker = Worker()
+        self.runner = Runner()
+        try:
+            curses.wrapper(self.wrapme)
+        finally:
+            self.worker.cancel()
+            self.runner.stop()
+            self.worker.stop()
         os.system('clear')
 
     def wrapme(self, win):
@@ -1,21 +1,9 @@
 import logging
-import os
-import re
-import subprocess
-import sys
 
-from assertEquals.cli.utils import BANNER, BORDER, HEADERS
-from assertEquals.interactive.utils import RefreshError, Process
+from assertEquals.interactive.records import Rows, Test
+from assertEquals.interactive.utils import RefreshError, run_scripted
 
 
-BREAK1 = ("=" * 70) + '\n'
-BREAK2 = ("-" * 70) + '\n'
-
-ALL_RE = re.compile('Ran (\d*) test')
-OBJ_RE = re.compile('\((\S)\)')
-FAIL_RE = re.compile('failures=(\d*)')
-ERR_RE = re.compile('errors=(\d*)')
-
 logger = logging.getLogger('assertEquals.tests')
 
 
@@ -24,26 +12,26 @@ class Detail:
 
     This is designed to be a persistent object. Repeated calls to refresh will
     update the dataset. Unlike Summary, there are no partial updates here. The
-    assumption is that you will always want to re-run all tests at once. There
-    is a show flag for each record; only items for which this are true are
-    included in the name, index and __len__ calls.
+    assumption is that you will always want to re-run all tests at once.
+    Indexing gives a Test (see records).
 
     """
 
     module = ''     # the current module dotted module name
-    data = None     # a dictionary, {name:<2-list>}:
-                    #   0 'error' or 'failure'
-                    #   1 full report
-    names = None    # a sorted list of names for which show is True
+    data = None     # a Rows of Test, one per non-passing test
+    names = None    # a sorted view of names; data.names
     totals = ()     # a 4-tuple: (pass5, fail, err, all)
+    timing = (None, None) # seconds the TestCase took: (wall, cpu)
+    worker = None   # a Worker, or None to start a new child for each refresh
 
 
-    def __init__(self, module):
-        """
+    def __init__(self, module, worker=None):
+        """Takes a dotted TestCase name and a Worker.
         """
         self.module = module
-        self.data = {}
-        self.names = []
+        self.worker = worker
+        self.data = Rows()
+        self.names = self.data.names
 
     def __repr__(self):
         return "<Detail (%d tests)>" % len(self.names)
@@ -54,10 +42,9 @@ class Detail:
     # ===================
 
     def __getitem__(self, i):
-        """Takes an int index into self.names
+        """Takes an int index into self.names, and returns a Test.
         """
-        name = self.names[i]
-        return [name] + self.data[name]
+        return self.data[i]
 
     def __len__(self):
         return len(self.names)
@@ -72,7 +59,18 @@ class Detail:
     def refresh(self):
         """Re-run our tests.
         """
+        self.fetch()
+        self.poll()
+
+    def fetch(self):
+        """Run the child, and hold on to its output for poll(); this is the
+        part of refresh() that can run on another thread.
+        """
         self._call()
+
+    def poll(self):
+        """Apply the output from fetch().
+        """
         self._set_data()
 
 
@@ -80,83 +78,46 @@ class Detail:
     # =======
 
     def _call(self):
-        """Invoke a child process and return its output.
-
-        We hand on our environment and any sys.path manipulations to the child,
-        and we capture stderr as well as stdout so we can handle errors.
-
+        """Invoke a child process and store its output.
         """
         module, testcase = self.module.rsplit('.', 1)
-        args = ( sys.executable
-               , '-u' # unbuffered, so we can interact with it
-               , sys.argv[0]
-               , '--scripted'
+        args = [ '--scripted'
                , '--testcase=%s' % testcase
                , module
-                )
-        environ = os.environ.copy()
-        environ['PYTHONPATH'] = ':'.join(sys.path)
+                ]
 
-        proc = Process(args=args, env=environ)
-
-        raw = proc.communicate()
-        if BANNER not in raw:
+        raw, records = run_scripted(args, self.worker)
+        if (not records) or (records[-1]['kind'] != 'totals'):
             raise RefreshError(raw)
-        self.__raw = raw
+        self.__records = records
 
 
     def _set_data(self):
-        """Extract and store data from __raw.
+        """Extract and store data from __records.
         """
 
-        garbage, report = self.__raw.split(BANNER,1)
-        items, result = report.rsplit(BREAK2,1)
-        details = items.split(BREAK1)[1:]
-
-
-        # Totals
-        # ======
-
-        m = ALL_RE.search(result)
-        try:
-            all = m.group(1)
-        except:
-            logger.debug(self.__raw)
-            raise
-        fail = err = '0'
-        if 'FAILED' in result:
-            m = FAIL_RE.search(result)
-            if m is not None:
-                fail = str(m.group(1))
-            m = ERR_RE.search(result)
-            if m is not None:
-                err = str(m.group(1))
-        pass5 = '0'
-        if all != '0':
-            pass5 = int(100 * (int(all) - int(fail) - int(err)) / float(all))
-        pass5 = str(pass5) + '%'
-        totals = (pass5, fail, err, all)
-
-
-        # Data
-        # ====
-
-        data = {}
-        for detail in details:
-            flop, name, module, break2, traceback_ = detail.split(None, 4)
-            if flop == 'FAIL:':
-                flop = 'failure'
-            elif flop == 'ERROR:':
-                flop = 'error'
-            name = '.'.join((module[1:-1], name))[len(self.module)+1:]
-            traceback_ = traceback_.strip()
-            data[name] = [flop, traceback_]
+        tests = []
+
+        for record in self.__records:
+            if record['kind'] == 'test':
+                test = Test( record['name'], record['flop'], record['traceback']
+                           , record.get('wall'), record.get('cpu')
+                            )
+                tests.append(test)
+            elif record['kind'] == 'totals':
+                fail, err, all = record['fail'], record['err'], record['all']
+                pass5 = 0
+                if all != 0:
+                    pass5 = int(100 * (all - fail - err) / float(all))
+                totals = (str(pass5) + '%', str(fail), str(err), str(all))
+                timing = (record.get('wall'), record.get('cpu'))
 
 
         # Update self.
         # ============
 
         self.totals = totals
-        self.data = data
-        self.names = sorted(data)
-        del self.__raw
+        self.timing = timing
+        self.data.clear()
+        self.data.add(tests)
+        del self.__records
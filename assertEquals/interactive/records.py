@@ -0,0 +1,565 @@
+"""Compact storage for the rows behind the summary and detail screens.
+
+A summary can have a row for every TestCase in a large tree, so we keep rows
+small: each is an object with __slots__, stats are ints rather than formatted
+strings, and names are interned, so that the many dictionaries keyed by name
+share one copy of each. Indexing gives you the row itself, so drawing a
+screenful of rows doesn't build anything new.
+
+Rows are kept sorted by name in an indexable skip list, so that adding or
+removing a row, finding a row by name, finding the index of a name, and
+finding the row at an index are all O(log n). A batch of rows is added by
+merging it in and linking everything up again in one pass. Rather than marking
+every row stale at the start of a refresh, we bump a generation counter; a row
+is fresh if it was run in the current generation.
+
+Each row links to the row of the module it is in, and module rows keep
+counts rolled up from the TestCases below them, durations included. When a
+TestCase's results change, roll() passes the difference up through its
+ancestors, so the counts stay current in O(depth).
+
+A Ranking is a skip list like Rows, sorted by one of the sort keys below, and
+then by name. Each row is filed under the key it had when it was added, so
+that when its results change we can take it out and put it back in its new
+place in O(log n), rather than sorting everything again.
+
+"""
+import random
+
+from assertEquals.cli.utils import format_duration
+
+
+class Row(object):
+    """Represent one row of a summary: a module, or a TestCase.
+
+        name    the full dotted name
+        short   the last part of name
+        depth   the number of dots in name
+        fail    an int, or None if the tests weren't run
+        err     an int, or None if the tests weren't run
+        all     an int, or None for a module
+        run     the generation in which the tests were run, or None
+        wall    the seconds of wall clock time the tests took, or None
+        cpu     the seconds of CPU time they took, or None
+        parent  the Row of the module this is in, or None
+        sums    for a module with rows below it, a list of counts for the
+                TestCases below: [fail, err, ran, all, wall, cpu], where ran
+                counts the tests in TestCases that have been run, and wall and
+                cpu are summed over those; otherwise None
+
+    """
+
+    __slots__ = ( 'name', 'short', 'depth', 'fail', 'err', 'all', 'run'
+                , 'wall', 'cpu', 'parent', 'sums'
+                 )
+
+    def __init__( self, name, fail=None, err=None, all=None, run=None
+                , wall=None, cpu=None
+                 ):
+        self.name = intern(name)
+        self.short = intern(name.rsplit('.', 1)[-1])
+        self.depth = name.count('.')
+        self.fail = fail
+        self.err = err
+        self.all = all
+        self.run = run
+        self.wall = wall
+        self.cpu = cpu
+        self.parent = None
+        self.sums = None
+
+    def __repr__(self):
+        return "<Row %s>" % self.name
+
+    def stats(self):
+        """Return a 4-tuple of strings per format_stats, or None for a module.
+        """
+        if self.all is None:
+            return None
+        return format_stats(self.fail, self.err, self.all)
+
+    def rollup(self):
+        """Return a 4-tuple of strings per format_rollup, or None.
+        """
+        if self.sums is None:
+            return None
+        return format_rollup(*self.sums[:4])
+
+    def duration(self):
+        """Return our wall clock time per format_duration, or for a module, that
+        of the TestCases below it that have been run.
+        """
+        if self.sums is not None:
+            if not self.sums[2]:
+                return format_duration(None)
+            return format_duration(max(self.sums[4], 0.0)) # rounding errors
+        elif self.fail is None:
+            return format_duration(None)
+        return format_duration(self.wall)
+
+    def adopt(self, row):
+        """Given a Row in this module, link it to us.
+        """
+        row.parent = self
+        if self.sums is None:
+            self.sums = [0, 0, 0, 0, 0.0, 0.0]
+
+    def counts(self):
+        """Return what this TestCase adds to its modules, per sums.
+        """
+        if self.all is None:
+            return [0, 0, 0, 0, 0.0, 0.0]
+        elif self.fail is None:
+            return [0, 0, 0, self.all, 0.0, 0.0]
+        return [ self.fail, self.err, self.all, self.all
+               , self.wall or 0.0, self.cpu or 0.0
+                ]
+
+    def roll(self, before):
+        """Given our counts() from before a change, update our ancestors.
+        """
+        after = self.counts()
+        if after == before:
+            return
+        delta = [a - b for a, b in zip(after, before)]
+        module = self.parent
+        while module is not None:
+            sums = module.sums
+            for i in range(6):
+                sums[i] += delta[i]
+            module = module.parent
+
+
+class Test(object):
+    """Represent one row of a detail report: a non-passing test.
+
+        name        the name of the test method
+        flop        'error' or 'failure'
+        traceback   the full report
+        wall        the seconds of wall clock time the test took, or None
+        cpu         the seconds of CPU time it took, or None
+
+    """
+
+    __slots__ = ('name', 'flop', 'traceback', 'wall', 'cpu')
+
+    def __init__(self, name, flop, traceback, wall=None, cpu=None):
+        self.name = intern(name)
+        self.flop = flop
+        self.traceback = traceback
+        self.wall = wall
+        self.cpu = cpu
+
+    def __repr__(self):
+        return "<Test %s>" % self.name
+
+
+MAXLEVEL = 32 # enough for 2**32 rows
+
+
+def randomlevel():
+    """Return how many levels a new Node should have: n with odds 1 in 2**n.
+    """
+    level = 1
+    while (level < MAXLEVEL) and (random.random() < 0.5):
+        level += 1
+    return level
+
+
+class Node(object):
+    """Represent one row in a skip list, with its links at each level.
+
+        key     what the row is sorted by
+        next    a list of the next Node at each level, or None at the end
+        width   a list of how many rows each of those links skips over
+
+    """
+
+    __slots__ = ('row', 'key', 'next', 'width')
+
+    def __init__(self, row, key, level):
+        self.row = row
+        self.key = key
+        self.next = [None] * level
+        self.width = [1] * level
+
+
+class Rows:
+    """Represent a collection of rows sorted by name.
+
+    Rows are looked up by name with get(), and by index with []. names is a
+    read-only, list-like view of the names, in order. We also keep the rows in
+    a dictionary by name, so that get() needn't walk the list.
+
+    """
+
+    generation = 0      # bumped by stale()
+
+    def __init__(self):
+        self.head = Node(None, None, MAXLEVEL)
+        self.level = 1      # the number of levels in use
+        self.size = 0
+        self.byname = {}    # {name: row}
+        self.names = Names(self)
+
+
+    # Container emulation
+    # ===================
+
+    def __getitem__(self, i):
+        """Given an int index, return a row.
+        """
+        if i < 0:
+            i += self.size
+        if not (0 <= i < self.size):
+            raise IndexError(i)
+        node = self.head
+        i += 1 # the head counts as position 0
+        for level in xrange(self.level-1, -1, -1):
+            while (node.next[level] is not None) and (node.width[level] <= i):
+                i -= node.width[level]
+                node = node.next[level]
+        return node.row
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        node = self.head.next[0]
+        while node is not None:
+            yield node.row
+            node = node.next[0]
+
+    def __contains__(self, name):
+        return name in self.byname
+
+
+    # Lookups
+    # =======
+
+    def sortkey(self, row):
+        """Given a row, return what to sort it by: its name.
+        """
+        return row.name
+
+    def keyof(self, name):
+        """Given a name, return the key its row is sorted by, or None.
+        """
+        return name
+
+    def find(self, key):
+        """Given a key, return a list of the last Node before it at each level,
+        and a list of their positions.
+        """
+        before = [self.head] * MAXLEVEL
+        positions = [0] * MAXLEVEL
+        node = self.head
+        position = 0
+        for level in xrange(self.level-1, -1, -1):
+            while (node.next[level] is not None) and \
+                  (node.next[level].key < key):
+                position += node.width[level]
+                node = node.next[level]
+            before[level] = node
+            positions[level] = position
+        return before, positions
+
+    def index(self, name):
+        """Given a name, return the index of its row, or None.
+        """
+        if name not in self.byname:
+            return None
+        key = self.keyof(name)
+        before, positions = self.find(key)
+        node = before[0].next[0]
+        if (node is None) or (node.row.name != name):
+            return None
+        return positions[0] # the head is at 0, so this is one less than ours
+
+    def get(self, name, default=None):
+        """Given a name, return its row, or default.
+        """
+        return self.byname.get(name, default)
+
+    def under(self, name):
+        """Given a dotted name, yield the rows for the names below it, in order.
+        """
+        prefix = name + '.'
+        before, positions = self.find(prefix)
+        node = before[0].next[0]
+        while (node is not None) and node.row.name.startswith(prefix):
+            yield node.row
+            node = node.next[0]
+
+    def fresh(self, row):
+        """Given a row, return None if it hasn't been run, else a boolean: was
+        it run in the current generation?
+        """
+        if row.run is None:
+            return None
+        return row.run == self.generation
+
+
+    # Changes
+    # =======
+
+    def add(self, rows):
+        """Given a sequence of rows with names that we don't have yet, add them.
+
+        A few rows are inserted one at a time. Rather than insert more than
+        that, we sort them, merge them with ours, and link everything up again
+        from first to last, which is much quicker for a batch, such as a whole
+        refresh at once.
+
+        """
+        rows = list(rows)
+        if len(rows) * 16 < self.size:
+            for row in rows:
+                self.insert(row)
+            return
+        filed = [(node.key, node) for node in self.nodes()]
+        for row in rows:
+            key = self.sortkey(row)
+            filed.append((key, Node(row, key, randomlevel())))
+        filed.sort() # two sorted runs; keys are unique, so no Nodes compared
+        self.link([node for key, node in filed])
+        for row in rows:
+            self.byname[row.name] = row
+
+    def insert(self, row):
+        """Given a row with a name that we don't have yet, add it.
+        """
+        key = self.sortkey(row)
+        before, positions = self.find(key)
+        level = randomlevel()
+        if level > self.level:
+            for i in range(self.level, level):
+                self.head.width[i] = self.size + 1
+            self.level = level
+
+        node = Node(row, key, level)
+        position = positions[0] + 1
+        for i in range(level):
+            prev = before[i]
+            node.next[i] = prev.next[i]
+            prev.next[i] = node
+            skipped = position - positions[i] # from prev to us
+            node.width[i] = prev.width[i] - skipped + 1
+            prev.width[i] = skipped
+        for i in range(level, self.level):
+            before[i].width[i] += 1
+        self.size += 1
+        self.byname[row.name] = row
+
+    def remove(self, name):
+        """Given a name, remove its row; raise KeyError if we don't have it.
+        """
+        del self.byname[name]
+        before, positions = self.find(self.keyof(name))
+        node = before[0].next[0]
+        for i in range(self.level):
+            prev = before[i]
+            if prev.next[i] is node:
+                prev.width[i] += node.width[i] - 1
+                prev.next[i] = node.next[i]
+            else:
+                prev.width[i] -= 1
+        self.size -= 1
+
+    def clear(self):
+        self.head = Node(None, None, MAXLEVEL)
+        self.level = 1
+        self.size = 0
+        self.byname = {}
+
+    def nodes(self):
+        """Yield our Nodes, in order.
+        """
+        node = self.head.next[0]
+        while node is not None:
+            yield node
+            node = node.next[0]
+
+    def link(self, nodes):
+        """Given a sequence of Nodes in order, make them all of ours, linking
+        them up from first to last in one pass.
+        """
+        self.head = Node(None, None, MAXLEVEL)
+        self.level = 1
+        last = [self.head] * MAXLEVEL   # the last Node at each level,
+        positions = [0] * MAXLEVEL      #   and its position
+        position = 0
+        for node in nodes:
+            position += 1
+            level = len(node.next)
+            if level > self.level:
+                self.level = level
+            for i in range(level):
+                last[i].next[i] = node
+                last[i].width[i] = position - positions[i]
+                last[i] = node
+                positions[i] = position
+        for i in range(self.level):
+            last[i].next[i] = None
+            last[i].width[i] = position + 1 - positions[i]
+        self.size = position
+
+    def stale(self):
+        """Mark all rows stale, in constant time.
+        """
+        self.generation += 1
+
+
+class Ranking(Rows):
+    """Represent a collection of rows sorted by a sort key, and then by name.
+
+    Rows that the sort key gives None for come after the rest. Call refile()
+    when a row's results change, and discard() to drop a row we may not have.
+
+    """
+
+    def __init__(self, key):
+        """Takes a sort key function, such as by_duration.
+        """
+        Rows.__init__(self)
+        self.key = key
+        self.keys = {}      # {name: the key its row is filed under}
+
+    def sortkey(self, row):
+        """Given a row, return what to sort it by, and remember it.
+        """
+        rank = self.key(row)
+        key = self.keys[row.name] = (rank is None, rank, row.name)
+        return key
+
+    def keyof(self, name):
+        return self.keys.get(name)
+
+    def remove(self, name):
+        Rows.remove(self, name)
+        del self.keys[name]
+
+    def clear(self):
+        Rows.clear(self)
+        self.keys = {}
+
+    def discard(self, name):
+        """Given a name, remove its row if we have it.
+        """
+        if name in self.keys:
+            self.remove(name)
+
+    def refile(self, row):
+        """Given a row, add it, or move it to where its results now put it.
+        """
+        key = self.keys.get(row.name)
+        if key is not None:
+            rank = self.key(row)
+            if key == (rank is None, rank, row.name):
+                return
+            self.remove(row.name)
+        self.insert(row)
+
+    def fill(self, rows):
+        """Given a sequence of rows, replace ours with them, in one batch.
+        """
+        self.clear()
+        self.add(rows)
+
+
+class Names:
+    """Represent the names of a Rows, in order, as a read-only sequence.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __getitem__(self, i):
+        return self.rows[i].name
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        for row in self.rows:
+            yield row.name
+
+    def __contains__(self, name):
+        return name in self.rows
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def index(self, name):
+        i = self.rows.index(name)
+        if i is None:
+            raise ValueError(name)
+        return i
+
+
+def format_stats(fail, err, all):
+    """Given three ints, return a 4-tuple of strings: (pass5, fail, err, all).
+
+    This is how summary reports format them. If the tests weren't run, fail and
+    err are None, and all but the last string are dashes.
+
+    """
+    if fail is None:
+        return ('-', '-', '-', str(all))
+    pass5 = 0
+    if all:
+        pass5 = int(round((all - fail - err) / float(all) * 100))
+    return (str(pass5) + '%', str(fail), str(err), str(all))
+
+
+def format_rollup(fail, err, ran, all):
+    """Given four ints per Row.sums, return a 4-tuple of strings.
+
+    This is like format_stats, but the pass rate is out of the tests that have
+    been run. If none have, all but the last string are dashes.
+
+    """
+    if not ran:
+        return ('-', '-', '-', str(all))
+    pass5 = int(round((ran - fail - err) / float(ran) * 100))
+    return (str(pass5) + '%', str(fail), str(err), str(all))
+
+
+# Sort keys
+# =========
+# Given a TestCase's row, each of these returns what to rank it by, lowest
+# first, or None if it has no results to rank it by.
+
+def by_duration(row):
+    """Slowest first.
+    """
+    if (row.fail is None) or (row.wall is None):
+        return None
+    return -row.wall
+
+def by_failures(row):
+    """Most failures first.
+    """
+    if row.fail is None:
+        return None
+    return -row.fail
+
+def by_errors(row):
+    """Most errors first.
+    """
+    if row.err is None:
+        return None
+    return -row.err
+
+def by_pass_rate(row):
+    """Lowest pass rate first.
+    """
+    if (row.fail is None) or not row.all:
+        return None
+    return (row.all - row.fail - row.err) / float(row.all)
@@ -1,24 +1,74 @@
+import curses
+import errno
+import fcntl
 import logging
+import os
+import select
+import signal
+import struct
+import sys
+import termios
 import traceback
 
-from assertEquals.interactive.utils import CommunicationProblem
+from assertEquals.interactive.utils import CommunicationProblem, drain
 
 
 logger = logging.getLogger('assertEquals.base')
 
 
+# Resizes
+# =======
+# We catch SIGWINCH ourselves, and pass it on to the main loop through a pipe,
+# so that the loop can sleep in select() until there is something to do.
+
+_resizes = None # the reading end of the pipe, once we are listening
+
+def listen_for_resizes():
+    """Start catching SIGWINCH, if we haven't yet; return a file descriptor.
+
+    It becomes readable when the terminal is resized. We return None if we
+    can't catch resizes on this platform.
+
+    """
+    global _resizes
+    if (_resizes is None) and hasattr(signal, 'SIGWINCH'):
+        r, w = os.pipe()
+        for fd in (r, w):
+            flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+            fcntl.fcntl(fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+        def handler(signum, frame):
+            try:
+                os.write(w, 'x')
+            except OSError: # the pipe is full; we'll hear about it anyway
+                pass
+        signal.signal(signal.SIGWINCH, handler)
+        _resizes = r
+    return _resizes
+
+
+def terminal_size():
+    """Return the (rows, columns) of our terminal, per the kernel.
+    """
+    raw = fcntl.ioctl(sys.stdout.fileno(), termios.TIOCGWINSZ, '\0'*8)
+    rows, cols = struct.unpack('hhhh', raw)[:2]
+    return rows, cols
+
+
 class BaseScreen:
     """This is a mixin for objects representing curses screens.
 
     Provides:
 
         H, W -- the height and width of the screen, 0-indexed
-        __loop() -- main event loop; calls react()
+        __loop() -- main event loop; calls react() and tick()
         go() -- called by CursesInterface; returns another BaseScreen
                 error handling happens here
         getsize() -- returns the (H, W) tuple
         inited -- a boolean indicating whether init() has been run
         console_mode -- a boolean indicating whether to use getch() or getstr()
+        timeout -- milliseconds to wait for a key press before calling tick();
+                   -1 (the default) to wait forever
+        resize_delay -- seconds of quiet before we act on a burst of resizes
 
 
     Expects:
@@ -30,17 +80,32 @@ class BaseScreen:
         resize() -- called before init(), and again every time the terminal is
                     resized.
         ui_chars -- sequence of keys to trap
+        tick() -- called when timeout passes without a key press, or when one
+                  of fds() is readable; returns None or another BaseScreen
+        fds() -- returns a list of file descriptors to wait on besides the
+                 keyboard, such as those of background work
+
+    The loop sleeps in select() on the keyboard, on terminal resizes, and on
+    fds(), so that it uses no CPU while there is nothing to do.
+
+    Subclasses that redraw often can use damaged() to skip rows that look the
+    same as when they last drew them, and commit() to send all of their writes
+    to the terminal at once.
 
     """
 
     inited = False
     console_mode = False
+    timeout = -1
+    resize_delay = 0.05
+    painted = None      # {row key: what we last drew there}
 
     def go(self):
         """Interact with the user, return the next screen.
         """
         try:
             self.H = self.W = 0 # triggers a call to resize, redrawing screen
+            self.painted = {}
             return self.__loop()
         except KeyboardInterrupt, SystemExit:
             raise
@@ -70,20 +135,23 @@ class BaseScreen:
 
             if (H <= 10) or (W <= 40): # terminal is too small
                 self.win.clear()
-                self.win.refresh()
+                self.H = self.W = 0 # redraw everything when it grows again
                 msg = "Terminal too small."
-                if (H == 0) or (W < len(msg)):
-                    continue
-                self.win.addstr(H/2,(W-len(msg))/2,msg)
+                if (H > 0) and (W >= len(msg)):
+                    self.win.addstr(H/2,(W-len(msg))/2,msg)
                 self.win.refresh()
-                c = self.win.getch()
-                if c == ord('q'):
-                    raise KeyboardInterrupt
+                keys = self.wait(-1)
+                if keys is None:
+                    continue # resized; check the size again
+                for c in keys:
+                    if c == ord('q'):
+                        raise KeyboardInterrupt
                 continue
 
             elif (self.H, self.W) != (H, W): # terminal has been resized
                 self.win.clear()
                 self.win.refresh()
+                self.painted = {}
                 self.H, self.W = (H, W)
                 self.resize()
 
@@ -92,18 +160,121 @@ class BaseScreen:
                     self.init()
                 self.inited = True
 
-            else: # react to key presses
+            elif self.console_mode:
+                self.win.timeout(-1)
+                screen = self.react(self.win.getstr())
+                if screen is not None:
+                    return screen
+
+            else: # react to key presses and other events
+                keys = self.wait(self.timeout)
+                if keys is None:
+                    continue # resized
                 screen = None
-                if self.console_mode:
-                    screen = self.react(self.win.getstr())
-                else:
-                    c = self.win.getch()
+                if not keys:
+                    screen = self.tick()
+                for c in keys:
                     if c in self.ui_chars:
                         screen = self.react(c)
+                    if screen is not None:
+                        break
                 if screen is not None:
                     return screen
 
 
+    def wait(self, timeout):
+        """Given a timeout in milliseconds (-1 for none), sleep until something
+        happens.
+
+        Return a list of keys pressed, which is empty if we timed out or one of
+        fds() is readable, or None if the terminal was resized.
+
+        """
+        keys = self.keys() # curses may have read ahead of select
+        if keys:
+            return keys
+
+        stdin = sys.stdin.fileno()
+        resizes = listen_for_resizes()
+        fds = [stdin] + self.fds()
+        if resizes is not None:
+            fds.append(resizes)
+        if timeout < 0:
+            timeout = None
+        else:
+            timeout = timeout / 1000.0
+
+        try:
+            ready = select.select(fds, [], [], timeout)[0]
+        except select.error, err:
+            if err.args[0] != errno.EINTR:
+                raise
+            ready = [] # a signal; the resize pipe will be readable next time
+
+        if (resizes is not None) and (resizes in ready):
+            quiet = False
+            while not quiet: # wait for the burst to end
+                drain(resizes)
+                try:
+                    quiet = not select.select( [resizes], [], []
+                                             , self.resize_delay
+                                              )[0]
+                except select.error, err:
+                    if err.args[0] != errno.EINTR:
+                        raise
+            rows, cols = terminal_size()
+            curses.resizeterm(rows, cols)
+            return None
+        if stdin in ready:
+            return self.keys()
+        return []
+
+
+    def keys(self):
+        """Return a list of the keys pressed so far, without blocking.
+        """
+        out = []
+        self.win.nodelay(1)
+        try:
+            while 1:
+                c = self.win.getch()
+                if c == -1:
+                    break
+                out.append(c)
+        finally:
+            self.win.nodelay(0)
+        return out
+
+
+    def damaged(self, key, look):
+        """Given a hashable key for part of the screen and a value describing
+        how it should look, return a boolean: does it need to be redrawn?
+
+        We assume that it will be, so the next call with the same look will
+        return False, until the screen is cleared.
+
+        """
+        if self.painted.get(key) == look:
+            return False
+        self.painted[key] = look
+        return True
+
+
+    def commit(self):
+        """Send our writes to the terminal.
+        """
+        self.win.noutrefresh()
+        curses.doupdate()
+
+
+    def tick(self):
+        pass
+
+
+    def fds(self):
+        return []
+
+
     def getsize(self):
         """getmaxyx is 1-indexed, but just about everything else is 0-indexed.
         """
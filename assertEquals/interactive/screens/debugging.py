@@ -46,7 +46,7 @@ class DebuggingScreen(BaseScreen):
         """
         if not self.proc.stdin.closed:
             output = self.proc.communicate(s)
-        if self.proc.poll() is None:    # not done yet, write to screen
+        if not self.proc.finished():    # not done yet, write to screen
             self.win.addstr(output)
             self.win.refresh()
         else:                           # all done, exit cleanly
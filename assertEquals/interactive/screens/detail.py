@@ -1,11 +1,10 @@
-import Queue
 import curses
 import logging
+import time
 import traceback
 from curses import ascii
 
-from assertEquals.interactive.detail import Detail
-from assertEquals.interactive.utils import Spinner, ScrollArea, format_tb
+from assertEquals.interactive.utils import Cancelled, ScrollArea, format_tb
 from assertEquals.interactive.screens.base import BaseScreen
 from assertEquals.interactive.screens.error import ErrorScreen
 
@@ -20,6 +19,10 @@ class DetailScreen(BaseScreen):
     """Represent a detail report for a specific module.
 
         F5/space -- rerun the tests for this module
+        c -- cancel the tests that are running, and any that are queued
+
+    Reruns go on the SummaryScreen's Runner, so you can read tracebacks while
+    they run.
 
 
     """
@@ -32,20 +35,23 @@ class DetailScreen(BaseScreen):
     result = None   # the right ScrollArea
     detail = None   # a Detail instance
     curresult = ()  # list of lines in the currently displayed result text
+    formatted = None# {name: (width, traceback, lines)}; see populate_result()
     selected = ''   # the name of the currently selected test
 
 
-    def __init__(self, summary):
-        """Takes a dotted module name.
+    def __init__(self, summary, detail):
+        """Takes a SummaryScreen and a Detail that has been refreshed.
         """
         self.summary = summary
         self.win = summary.win
-        self.base = summary.selected
+        self.base = detail.module
         self.colors = summary.colors
         self.blocks = summary.blocks
-        self.spinner = Spinner(self.spin)
-        self.detail = Detail(self.base)
-        self.refresh()
+        self.runner = summary.runner
+        self.detail = detail
+        self.formatted = {}
+        if self.detail.names:
+            self.selected = self.detail.names[0]
 
 
     # BaseScreen contracts
@@ -64,6 +70,7 @@ class DetailScreen(BaseScreen):
                , curses.KEY_NPAGE
                , curses.KEY_HOME
                , curses.KEY_END
+               , ord('c')
                , ascii.BS
                , ascii.TAB
                , ascii.LF
@@ -71,10 +78,9 @@ class DetailScreen(BaseScreen):
                 )
 
     def init(self):
-        if self.detail.names:
-            self.selected = self.detail.names[0]
         self.populate()
         self.draw_content()
+        self.pace()
 
     def resize(self):
         c1h = c2h = self.H - self.toprows - self.bottomrows
@@ -86,6 +92,7 @@ class DetailScreen(BaseScreen):
         if self.inited:
             self.populate()
             self.draw_content()
+        self.pace()
 
     def react(self, c):
 
@@ -106,16 +113,14 @@ class DetailScreen(BaseScreen):
             if self.selected == '':
                 return StandardError("No test selected.")
             else:
-                traceback_ = self.detail.data[self.selected][1]
+                traceback_ = self.detail.data.get(self.selected).traceback
                 return ErrorScreen(self, traceback_)
 
         elif c in (ord(' '), curses.KEY_F5):    # stay put and refresh
-            self.spinner(self.refresh)
-            if self.detail.totals[0] == '100%': # all tests passed!
-                return self.summary
-            if self.selected not in self.detail.names:
-                self.selected = self.detail.names[0]
-            self.populate()
+            self.refresh()
+
+        elif c == ord('c'):                     # stop running tests
+            self.summary.cancel()
 
 
         # Focus/paging commands
@@ -150,29 +155,39 @@ class DetailScreen(BaseScreen):
                 self.result.page_down()
 
         self.draw_content()
+        self.pace()
 
 
-    # Helpers
-    # =======
+    def tick(self):
+        """Take in results.
 
-    def spin(self):
-        """Put a 'working' indicator in the banner.
+        Callbacks for jobs that the SummaryScreen queued run here too, but we
+        stay put rather than go to a screen they return.
+
+        """
+        screen = self.runner.finish()
+        if screen is self.summary:
+            return screen
+        self.draw_content()
+        self.pace()
 
-        This is called by our Spinner instance.
 
+    def fds(self):
+        """Wake up when jobs finish.
         """
-        l = (self.W - len(self.banner)) / 2
-        stop = False
-        while not stop:
-            for i in range(4):
-                spun = "  working%s  " % ('.'*i).ljust(3)
-                self.win.addstr(0,l,spun,self.colors.BLUE)
-                self.win.refresh()
-                try:
-                    stop = self.spinner.flag.get(timeout=0.25)
-                except Queue.Empty:
-                    pass
-        self.draw_banner()
+        return [self.runner.fd]
+
+
+    # Helpers
+    # =======
+
+    def pace(self):
+        """Wake up often while tests are running, to keep the banner moving.
+        """
+        if self.runner.busy():
+            self.timeout = 100
+        else:
+            self.timeout = -1
 
     def populate(self):
         """[Re]create both ScrollAreas.
@@ -199,33 +214,67 @@ class DetailScreen(BaseScreen):
 
     def populate_result(self):
         """[Re]create just the result ScrollArea.
+
+        Formatted tracebacks are cached, per width.
+
         """
         if self.selected == '':
-            curresult = ()
+            self.curresult = ()
         else:
-            traceback_ = self.detail.data[self.selected][1]
-            self.curresult = format_tb(self.c2[1], traceback_)
+            width = self.c2[1]
+            traceback_ = self.detail.data.get(self.selected).traceback
+            cached = self.formatted.get(self.selected)
+            if (cached is None) or (cached[:2] != (width, traceback_)):
+                lines = format_tb(width, traceback_)
+                cached = (width, traceback_, lines)
+                self.formatted[self.selected] = cached
+            self.curresult = cached[2]
         self.result = ScrollArea( self.c1[0]+1
                                 , len(self.curresult)
                                 , self.toprows
                                  )
 
     def refresh(self):
-        """Refresh our results and update the summary too.
+        """Queue up a rerun of our tests.
         """
-        self.detail.refresh()
-        if not self.selected:
-            if self.detail.names:
-                self.selected = self.detail.names[0]
-        self.summary.summary.update(self.base, *self.detail.totals)
+        def start():
+            return self.detail.fetch
+        self.runner.put(start, self.refreshed, ('rerun', self.base))
+
+    def refreshed(self, result, error):
+        """Take in our results and update the summary too; return the summary
+        if all tests passed.
+        """
+        if isinstance(error, Cancelled):
+            return
+        elif error is not None:
+            raise error
+        self.detail.poll()
+        totals = self.detail.totals + self.detail.timing
+        self.summary.summary.update(self.base, *totals)
+        if self.detail.totals[0] == '100%': # all tests passed!
+            return self.summary
+        if self.selected not in self.detail.names:
+            self.selected = self.detail.names[0]
+        self.populate()
 
 
     # Writers
     # =======
 
     def draw_banner(self):
-        l = (self.W - len(self.banner)) / 2
-        self.win.addstr(0,l,self.banner,self.colors.BLUE_DIM)
+        """Show our banner, or a 'working' indicator while tests run, as on
+        the SummaryScreen.
+        """
+        text, color = self.banner, self.colors.BLUE_DIM
+        if self.runner.busy():
+            text = "  working%s  " % ('.'*int(time.time()*4 % 4)).ljust(3)
+            if self.runner.queue:
+                text = "  working +%d" % len(self.runner.queue)
+            text, color = text.ljust(len(self.banner)), self.colors.BLUE
+        if self.damaged('banner', (text, color)):
+            l = (self.W - len(self.banner)) / 2
+            self.win.addstr(0,l,text,color)
 
 
     def draw_frame(self):
@@ -293,7 +342,7 @@ class DetailScreen(BaseScreen):
 
 
     def draw_content(self):
-        """Erase the current listing and redraw.
+        """Redraw whatever has changed in the listing.
         """
 
         W = self.W
@@ -301,8 +350,8 @@ class DetailScreen(BaseScreen):
         c2h, c2w = self.c2
 
 
-        # Clear both panes and draw scrollbar(s).
-        # =======================================
+        # Work out how both panes and their scrollbars should look.
+        # =========================================================
 
         if self.focus == TESTS:
             tests_scrollbg_color = self.colors.BLUE
@@ -317,45 +366,44 @@ class DetailScreen(BaseScreen):
 
         bg = curses.ACS_CKBOARD
 
-        for i in range(self.toprows, self.toprows+self.c1[0]+1):
-            self.win.addstr(i,1,' '*(c1w+4))
-            self.win.addstr(i,c1w+6,' '*(c2w+2))
-
-            if self.tests.bar is None:
-                self.win.addch(i,0,curses.ACS_VLINE,self.colors.WHITE)
-            elif i in self.tests.bar:
-                self.win.addstr(i,0,' ',tests_scrollbar_color)
-            else:
-                self.win.addch(i,0,bg,tests_scrollbg_color)
-
-            if self.result.bar is None:
-                self.win.addch(i,W,curses.ACS_VLINE,self.colors.WHITE)
-            elif i in self.result.bar:
-                self.win.addstr(i,W,' ',result_scrollbar_color)
-            else:
-                self.win.addch(i,W,bg,result_scrollbg_color)
-
-
-        # tests
-        # =====
-
+        tests = {}
         if self.tests.numitems != 0:
             for index, rownum  in self.tests:
-                self.draw_row(index, rownum)
-            selected = ''
+                tests[rownum] = self.render_row(index)
             if self.focus == TESTS:
                 self.selected = self.detail.names[self.tests.curitem]
                 self.populate_result()
 
-
-        # result
-        # ======
-
+        result = {}
         color = self.colors.GRAY
         if self.focus == RESULT:
             color = self.colors.WHITE
         for index, rownum in self.result:
-            self.win.addstr(rownum,c1w+7,self.curresult[index],color)
+            result[rownum] = (self.curresult[index], color)
+
+
+        # Draw the rows that have changed.
+        # ================================
+
+        for i in range(self.toprows, self.toprows+self.c1[0]+1):
+
+            if self.tests.bar is None:
+                tests_bar = (curses.ACS_VLINE, self.colors.WHITE)
+            elif i in self.tests.bar:
+                tests_bar = (' ', tests_scrollbar_color)
+            else:
+                tests_bar = (bg, tests_scrollbg_color)
+
+            if self.result.bar is None:
+                result_bar = (curses.ACS_VLINE, self.colors.WHITE)
+            elif i in self.result.bar:
+                result_bar = (' ', result_scrollbar_color)
+            else:
+                result_bar = (bg, result_scrollbg_color)
+
+            look = (tests.get(i), result.get(i), tests_bar, result_bar)
+            if self.damaged(i, look):
+                self.draw_row(i, *look)
 
 
         # Totals
@@ -376,37 +424,37 @@ class DetailScreen(BaseScreen):
 
         h = self.H-1
         w = self.W-21
-        self.win.addstr(h,w,pass5.rjust(4),color)
-        self.win.addstr(h,w+5,fail.rjust(4),color)
-        self.win.addstr(h,w+10,err.rjust(4),color)
-        self.win.addstr(h,w+15,all.rjust(4),color)
-
         base = self.base
-        w = w-4
-        if len(base) > w:
-            base = base[:w-3] + '...'
-        base = base.ljust(w)
-        self.win.addstr(self.H-1,3,base,color)
+        if len(base) > w-4:
+            base = base[:w-7] + '...'
+        base = base.ljust(w-4)
 
+        if self.damaged('totals', (pass5, fail, err, all, base, color)):
+            self.win.addstr(h,w,pass5.rjust(4),color)
+            self.win.addstr(h,w+5,fail.rjust(4),color)
+            self.win.addstr(h,w+10,err.rjust(4),color)
+            self.win.addstr(h,w+15,all.rjust(4),color)
+            self.win.addstr(h,3,base,color)
 
-        # Commit changes.
-        # ===============
+        self.draw_banner()
 
-        self.win.refresh()
 
+        # Commit changes.
+        # ===============
 
-    def draw_row(self, index, rownum):
-        """Given two ints, write a row to the screen.
+        self.commit()
 
-        The first int is the index into self.names. The second is the number of
-        the row on the screen to write to. Both are 0-indexed.
 
+    def render_row(self, index):
+        """Given an int index into self.names, return a tuple for draw_row:
+        (l, r, bullet color, name, color).
         """
 
         c1h, c1w = self.c1
         c2h, c2w = self.c2
 
-        name, flub, result = self.detail[index]
+        test = self.detail[index]
+        name, flub = test.name, test.flop
 
 
         # Determine highlighting for this row.
@@ -436,13 +484,36 @@ class DetailScreen(BaseScreen):
         if len(name) > c1w:
             name = name[:c1w-3] + '...'
         name = name.ljust(c1w)
-        self.win.addstr(rownum,3,name,color)
 
         l = ' '
         r = ' '
         if index == self.tests.curitem:
             l = curses.ACS_RARROW
             r = curses.ACS_LARROW
-        self.win.addch(rownum,1,l,bullet_color)
-        self.win.addch(rownum,c1w+4,r,bullet_color)
 
+        return (l, r, bullet_color, name, color)
+
+
+    def draw_row(self, rownum, test, line, tests_bar, result_bar):
+        """Given an int, a look per render_row (or None), a (line, color) tuple
+        from the result pane (or None), and (char, attr) tuples for the two
+        scrollbars, write a row to the screen.
+        """
+
+        c1h, c1w = self.c1
+        c2h, c2w = self.c2
+
+        self.win.addstr(rownum,1,' '*(c1w+4))
+        self.win.addstr(rownum,c1w+6,' '*(c2w+2))
+        self.win.addch(rownum,0,*tests_bar)
+        self.win.addch(rownum,self.W,*result_bar)
+
+        if test is not None:
+            l, r, bullet_color, name, color = test
+            self.win.addstr(rownum,3,name,color)
+            self.win.addch(rownum,1,l,bullet_color)
+            self.win.addch(rownum,c1w+4,r,bullet_color)
+
+        if line is not None:
+            text, color = line
+            self.win.addstr(rownum,c1w+7,text,color)
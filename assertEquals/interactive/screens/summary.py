@@ -1,11 +1,13 @@
-import Queue
 import curses
 import logging
+import time
 import traceback
 from curses import ascii
 
+from assertEquals.cli.watch import Watcher, find_path
+from assertEquals.interactive.detail import Detail
 from assertEquals.interactive.summary import Summary
-from assertEquals.interactive.utils import ScrollArea, Spinner
+from assertEquals.interactive.utils import Cancelled, ScrollArea
 from assertEquals.interactive.screens.base import BaseScreen
 from assertEquals.interactive.screens.detail import DetailScreen
 from assertEquals.interactive.screens.error import ErrorScreen
@@ -21,15 +23,39 @@ class SummaryScreen(BaseScreen):
 
         <ctrl>-F5 -- refresh list of modules, resetting tests to un-run
         F5/enter/space -- run selected tests, possibly going to results screen
+        c -- cancel the tests that are running, and any that are queued
+        / -- search: as you type, list only the rows whose names contain it
+        esc -- stop searching, listing everything again
+        f -- list only TestCases with failures or errors, or everything again
+        s -- sort by duration, failures, errors or pass rate, or by name again
+
+    Tests run in the background on our Runner, which the DetailScreen shares,
+    so you can keep using the screen, and queue up more runs, while they do.
+    Jobs call back with their results from tick().
+
+    Below the listing we show the TestCases that took the longest, if there is
+    room for them.
 
     """
 
     banner = " assertEquals " # shows up at the top
     bottomrows = 3          # the number of boilerplate rows at the bottom
+    footer = 0              # the number of slowest TestCases we have room for
+    labels = None           # {name: (width, alias, collapsed, flat, label)}
     listing = None          # a ScrollArea
+    orders = ( 'name'       # what 's' sorts the listing by, in turn
+             , 'duration'
+             , 'failures'
+             , 'errors'
+             , 'pass rate'
+              )
+    runner = None           # a Runner, for running tests in the background
     selected = ''           # the dotted name of the currently selected item
+    slowest = 3             # the number of slowest TestCases to show
     summary = {}            # a data dictionary per summarize()
     toprows = 3             # the number of boilerplate rows at the top
+    typing = False          # whether keys go to the search query
+    watcher = None          # a Watcher, if we rerun tests when files change
     win = None              # a curses window
 
 
@@ -41,8 +67,18 @@ class SummaryScreen(BaseScreen):
         self.colors = iface.colors
         self.blocks = iface.blocks
         self.stopwords = iface.stopwords
-        self.spinner = Spinner(self.spin)
-        self.summary = Summary(self.stopwords)
+        self.jobs = iface.jobs
+        self.worker = iface.worker
+        self.runner = iface.runner
+        self.summary = Summary(self.stopwords, self.jobs, self.worker)
+        self.labels = {}
+        if iface.watch:
+            try:
+                path = find_path(self.module)
+            except ImportError: # the refresh will report it
+                path = None
+            if path is not None:
+                self.watcher = Watcher(path)
 
 
     # BaseScreen contracts
@@ -55,23 +91,40 @@ class SummaryScreen(BaseScreen):
                , curses.KEY_UP
                , curses.KEY_DOWN
                , curses.KEY_RIGHT
+               , curses.KEY_LEFT
+               , ord('-')
+               , ord('+')
+               , ord('c')
+               , ord('f')
+               , ord('s')
                , curses.KEY_NPAGE
                , curses.KEY_PPAGE
                , curses.KEY_HOME
                , curses.KEY_END
                , ascii.LF
                , ascii.FF
-                )
+               , ord('/')
+               , ascii.ESC
+               , curses.KEY_BACKSPACE
+               , ascii.BS
+               , ascii.DEL
+                ) + tuple(range(32, 127)) # the query can have any of these
 
     def init(self):
-        self.spinner(self.summary.refresh, self.module)
+        self.refresh(self.module, find_only=self.watcher is None)
         self.update_selection()
         self.populate()
         self.draw_content()
+        self.pace()
 
     def resize(self):
         c1h = c2h = self.H - self.toprows - self.bottomrows
-        c2w = 20
+        self.footer = self.slowest
+        if c1h - (self.footer + 1) < self.footer: # no room to spare
+            self.footer = 0
+        if self.footer:
+            c1h = c2h = c1h - (self.footer + 1)
+        c2w = 29
         c1w = self.W - c2w - 7
         self.c1 = (c1h, c1w)
         self.c2 = (c2h, c2w)
@@ -79,10 +132,14 @@ class SummaryScreen(BaseScreen):
         if self.inited:
             self.populate()
             self.draw_content()
+        self.pace()
 
     def react(self, c):
 
-        if c == ord('q'):
+        if self.typing and self.type(c):
+            self.draw_content()
+            return
+        elif c == ord('q'):
             raise KeyboardInterrupt
         elif c == ord('h'):
             return # return HelpScreen(self)
@@ -107,11 +164,29 @@ class SummaryScreen(BaseScreen):
             self.listing.home()
         elif c == curses.KEY_END:       # end
             self.listing.end()
+        elif c in (ord('-'), curses.KEY_LEFT):
+            self.collapse()                 # collapse module
+        elif c == ord('+'):
+            self.expand()                   # expand module
+        elif c == ord('/'):
+            self.typing = True              # search
+        elif c == ord('f'):
+            self.summary.list_failing(not self.summary.only_failing)
+            self.select(self.selected)      # toggle failures only
+        elif c == ord('s'):
+            self.sort()                     # sort by something else
+        elif c == ascii.ESC:
+            if self.summary.query:
+                self.search('')             # stop searching
+            else:
+                self.listing.refuse()
 
 
         # Actions that do work
         # ====================
 
+        elif c == ord('c'):             # stop running tests
+            self.cancel()
         elif c == ascii.FF:             # refresh our TestCase list
             self.reload()
         elif c in ( ord(' ')            # run tests!
@@ -124,40 +199,252 @@ class SummaryScreen(BaseScreen):
             # Update the summary if we are on a module/package, or go to a
             # DetailScreen if we are on a TestCase and not all tests pass.
 
-            if self.selected:
-                isTestCase = self.summary.data[self.selected][0]
+            row = self.summary.data.get(self.selected)
+            if (row is not None) and self.listing.numitems:
+                isTestCase = row.all is not None
                 if isTestCase:          # TestCase
-                    detailscreen = self.spinner(DetailScreen, self)
-                    if c != ord(' '):
-                        if detailscreen.detail.totals[0] != '100%':
-                            return detailscreen
+                    self.detail(self.selected, c)
                 else:                   # module/package
-                    self.spinner( self.summary.refresh
-                                , self.selected
-                                , find_only=False
-                                 )
-                    self.update_selection()
+                    self.refresh(self.selected, find_only=False)
 
-            else:
-                raise StandardError("No module selected.")
+            else:                       # nothing is listed
+                self.listing.refuse()
 
 
         self.draw_content()
+        self.pace()
 
 
-    # Helpers
-    # =======
+    def tick(self):
+        """Take in results, and rerun affected TestCases if source files have
+        changed.
+        """
+        screen = self.runner.finish()
+        if (screen is not None) and (screen is not self):
+            return screen
+        if (self.watcher is not None) and self.watcher.poll():
+            self.refresh(self.module, find_only=False)
+        self.summary.poll()
+        self.update_selection()
+        self.populate()
+        self.draw_content()
+        self.pace()
+
+
+    def fds(self):
+        """Wake up when jobs finish, and for inotify events, if we are watching
+        with inotify.
+        """
+        if (self.watcher is None) or (self.watcher.fileno() is None):
+            return [self.runner.fd]
+        return [self.runner.fd, self.watcher.fileno()]
+
+
+    # Running tests
+    # =============
+    # These queue up jobs on our Runner. Summary and Detail each do the work of
+    # a refresh in steps: getting ready and taking in results on this thread,
+    # and running the child on the Runner's.
+
+    def refresh(self, module, find_only=False):
+        """Given a dotted module name, queue up a refresh of the summary.
+        """
+        def start():
+            self.summary.start(module, find_only)
+            return self.summary.fetch
+        self.runner.put(start, self.refreshed, ('refresh', module, find_only))
 
     def reload(self):
-        self.summary = Summary(self.stopwords)
-        self.spinner(self.summary.refresh, self.module)
+        """Queue up a new summary, keeping collapsed modules collapsed, and
+        keeping on with any search, failures-only listing, or sort order.
+        """
+        def start():
+            old = self.summary
+            self.summary = Summary(self.stopwords, self.jobs, self.worker)
+            self.summary.collapsed = old.collapsed
+            self.summary.only_failing = old.only_failing
+            self.summary.order = old.order
+            self.summary.search(old.query)
+            self.summary.start(self.module)
+            return self.summary.fetch
+        self.runner.put(start, self.refreshed, ('reload',))
+
+    def refreshed(self, result, error):
+        """Take in the last results of a refresh.
+        """
+        if error is not None:
+            raise error
+        self.summary.poll()
         self.update_selection()
 
+    def detail(self, name, c):
+        """Given the dotted name of a TestCase and the key pressed, queue up a
+        run of its tests.
+        """
+        detail = Detail(name, self.worker)
+        def start():
+            return detail.fetch
+        def callback(result, error):
+            return self.detailed(detail, c, error)
+        self.runner.put(start, callback, ('detail', name))
+
+    def detailed(self, detail, c, error):
+        """Given a Detail that has been fetched, the key pressed, and an
+        exception or None, update the summary.
+
+        Return a DetailScreen if not all tests passed, the key wasn't space,
+        and the TestCase is still selected.
+
+        """
+        if isinstance(error, Cancelled):
+            return
+        elif error is not None:
+            raise error
+        detail.poll()
+        self.summary.update(detail.module, *(detail.totals + detail.timing))
+        if (c != ord(' ')) and (detail.totals[0] != '100%'):
+            if detail.module == self.selected:
+                return DetailScreen(self, detail)
+
+    def cancel(self):
+        """Stop the tests that are running, and drop any that are queued.
+        """
+        self.runner.clear()
+        self.summary.cancel()
+
+
+    # Helpers
+    # =======
+
+    def pace(self):
+        """Set how many milliseconds the main loop should sleep for.
+
+        While tests are running we wake up often, to show results as they come
+        in and keep the banner moving. Otherwise we sleep for as long as our
+        watcher, if any, will let us.
+
+        """
+        if self.runner.busy():
+            self.timeout = 100
+        elif self.watcher is not None:
+            self.timeout = self.watch_timeout()
+        else:
+            self.timeout = -1
+
+    def watch_timeout(self):
+        """Return how many milliseconds the main loop should sleep for.
+
+        With inotify we sleep until there are events, except while a burst of
+        changes is settling down. Without it we have to walk the tree now and
+        then.
+
+        """
+        if self.watcher.changed:
+            return int(self.watcher.delay * 1000)
+        elif self.watcher.fileno() is None:
+            return int(self.watcher.interval * 1000)
+        return -1
+
+    def collapse(self):
+        """Collapse the selected module, or else the one it's in, and select it.
+        """
+        if self.summary.listed is not self.summary.view: # hidden or not
+            self.listing.refuse()
+            return
+        name = self.selected
+        row = self.summary.data.get(name)
+        if row is None: # nothing listed yet, or it went away on a refresh
+            self.listing.refuse()
+            return
+        if (row.all is not None) or (name in self.summary.collapsed):
+            name = name.rsplit('.', 1)[0]
+            if (name == self.selected) or (name not in self.summary.data):
+                self.listing.refuse()
+                return
+        self.summary.collapse(name)
+        self.select(name)
+
+    def expand(self):
+        """Expand the selected module.
+        """
+        if (self.summary.listed is not self.summary.view) or \
+           (self.selected not in self.summary.collapsed):
+            self.listing.refuse()
+            return
+        self.summary.expand(self.selected)
+        self.select(self.selected)
+
+    def select(self, name):
+        """Given a dotted name, lay out the listing and select it, or else the
+        nearest module above it that is listed, or else the first row.
+        """
+        self.selected = name
+        self.populate()
+        index = self.locate(name)
+        if index is not None:
+            self.selected = self.summary.names[index]
+            self.listing.jump(index)
+
+    def locate(self, name):
+        """Given a dotted name, return the index of its row, or else of the
+        nearest module above it that is listed, or else 0; or None if nothing
+        is listed.
+        """
+        listed = self.summary.listed
+        index = listed.index(name)
+        while (index is None) and ('.' in name):
+            name = name.rsplit('.', 1)[0]
+            index = listed.index(name)
+        if (index is None) and len(listed):
+            index = 0
+        return index
+
+    def search(self, query):
+        """Given a string, list only the rows whose names contain it, keeping
+        the selection if we can.
+        """
+        self.summary.search(query)
+        self.select(self.selected)
+
+    def sort(self):
+        """Sort the listing by the next of orders, keeping the selection if we
+        can.
+        """
+        i = self.orders.index(self.summary.order)
+        self.summary.sort(self.orders[(i + 1) % len(self.orders)])
+        self.select(self.selected)
+
+    def type(self, c):
+        """Given a key pressed while typing a search query, edit the query.
+
+        Return a boolean: was it one of ours? Other keys, such as the arrows,
+        do what they always do.
+
+        """
+        query = self.summary.query
+        if c in (ascii.LF, curses.KEY_ENTER):
+            self.typing = False             # done; keep the matches listed
+        elif c == ascii.ESC:
+            self.typing = False             # never mind
+            self.search('')
+        elif c in (curses.KEY_BACKSPACE, ascii.BS, ascii.DEL):
+            if query:
+                self.search(query[:-1])
+            else:
+                self.typing = False
+        elif 32 <= c < 127:
+            self.search(query + chr(c))
+        else:
+            return False
+        return True
+
     def populate(self):
         """[Re]create the scroll area if needed.
 
         In order to retain the current page and selection, we only recreate the
-        pane if its size parameters have changed.
+        pane if its size parameters have changed, and then we jump back to the
+        selected item. We also jump back to it if rows have come or gone above
+        it, as they can in the failures-only listing.
 
         """
 
@@ -166,6 +453,7 @@ class SummaryScreen(BaseScreen):
                , 'toprow': self.toprows
                 }
 
+        listing = self.listing
         if not self.listing:
             self.listing = ScrollArea(**args)
         else:
@@ -174,25 +462,14 @@ class SummaryScreen(BaseScreen):
                     self.listing = ScrollArea(**args)
                     break
 
+        if self.listing is not listing:
+            index = self.locate(self.selected)
+            if index:
+                self.listing.jump(index)
+        elif self.listing.numitems and \
+             (self.summary.names[self.listing.curitem] != self.selected):
+            self.listing.jump(self.locate(self.selected))
 
-    def spin(self):
-        """Put a 'working' indicator in the banner.
-
-        This is called by our Spinner instance.
-
-        """
-        l = (self.W - len(self.banner)) / 2
-        stop = False
-        while not stop:
-            for i in range(4):
-                spun = "  working%s  " % ('.'*i).ljust(3)
-                self.win.addstr(0,l,spun,self.colors.BLUE)
-                self.win.refresh()
-                try:
-                    stop = self.spinner.flag.get(timeout=0.25)
-                except Queue.Empty:
-                    pass
-        self.draw_banner()
 
     def update_selection(self):
         if (not self.selected) and self.summary.names:
@@ -203,8 +480,18 @@ class SummaryScreen(BaseScreen):
     # =========================================
 
     def draw_banner(self):
-        l = (self.W - len(self.banner)) / 2
-        self.win.addstr(0,l,self.banner,self.colors.BLUE_DIM)
+        """Show our banner, or a 'working' indicator while tests run, with the
+        number of runs queued up behind them.
+        """
+        text, color = self.banner, self.colors.BLUE_DIM
+        if self.runner.busy():
+            text = "  working%s  " % ('.'*int(time.time()*4 % 4)).ljust(3)
+            if self.runner.queue:
+                text = "  working +%d" % len(self.runner.queue)
+            text, color = text.ljust(len(self.banner)), self.colors.BLUE
+        if self.damaged('banner', (text, color)):
+            l = (self.W - len(self.banner)) / 2
+            self.win.addstr(0,l,text,color)
 
 
     def draw_frame(self):
@@ -246,11 +533,21 @@ class SummaryScreen(BaseScreen):
             self.win.addch(H-2,i+1,curses.ACS_HLINE,bold)
         self.win.addch(H-2,W,curses.ACS_RTEE,bold)
 
+        # slowest top border
+        if self.footer:
+            h = H-3-self.footer
+            self.win.addch(h,0,curses.ACS_LTEE,bold)
+            for i in range(0,W-1):
+                self.win.addch(h,i+1,curses.ACS_HLINE,bold)
+            self.win.addch(h,W,curses.ACS_RTEE,bold)
+
         # column border
         bw = (W-c2w-3)
         self.win.addch(0,bw,curses.ACS_TTEE,bold)
         self.win.vline(1,bw,curses.ACS_VLINE,H-1,bold)
         self.win.addch(2,bw,curses.ACS_PLUS,bold)
+        if self.footer:
+            self.win.addch(H-3-self.footer,bw,curses.ACS_PLUS,bold)
         self.win.addch(H-2,bw,curses.ACS_PLUS,bold)
         self.win.addch(H,bw,curses.ACS_BTEE,bold)
 
@@ -272,6 +569,9 @@ class SummaryScreen(BaseScreen):
         self.win.addstr(1,self.W-c2w-1+5,"FAIL",bold)
         self.win.addstr(1,self.W-c2w-1+10," ERR",bold)
         self.win.addstr(1,self.W-c2w-1+15," ALL",bold)
+        self.win.addstr(1,self.W-c2w-1+20,"DURATION",bold)
+        if self.footer:
+            self.win.addstr(H-3-self.footer,3," SLOWEST ",bold)
 
 
         # Commit writes.
@@ -282,46 +582,66 @@ class SummaryScreen(BaseScreen):
 
     def draw_content(self):
         """Draw the list of modules; called on almost every UI event.
+
+        Only rows that look different from when we last drew them are redrawn.
+
         """
 
         W = self.W
         c1h, c1w = self.c1
         c2h, c2w = self.c2
-        longname = self.selected
 
 
-        # Clear listing area and draw any scrollbar.
+        # Work out how each listing row should look.
         # ==========================================
+        # parent is a signal for the submodule bullets logic.
+
+        looks = {}
+        parent = ''
+        for index, rownum in self.listing:
+            looks[rownum], parent = self.render_row(index, parent)
+        if self.listing.numitems != 0:
+            self.selected = self.summary.names[self.listing.curitem]
+
+
+        # Draw the rows that have changed, with any scrollbar.
+        # ====================================================
 
         bg = curses.ACS_CKBOARD
 
         for i in range(self.toprows, self.toprows+self.listing.numrows):
-            self.win.addstr(i,1,' '*(c1w+3))
-            self.win.addstr(i,c1w+5,' '*(c2w+2))
-
             if self.listing.bar is None:
-                self.win.addch(i,W,curses.ACS_VLINE,self.colors.WHITE)
+                bar = (curses.ACS_VLINE, self.colors.WHITE)
             elif i in self.listing.bar:
-                self.win.addstr(i,W,' ',self.blocks.BLUE)
+                bar = (' ', self.blocks.BLUE)
             else:
-                self.win.addch(i,W,bg,self.colors.BLUE)
+                bar = (bg, self.colors.BLUE)
+            look = (looks.get(i), bar)
+            if self.damaged(i, look):
+                self.draw_row(i, *look)
 
 
-        # Write listing rows if we have any.
-        # ==================================
-        # parent is a signal for the submodule bullets logic.
+        # Draw the slowest TestCases that have changed.
+        # =============================================
 
-        if self.listing.numitems != 0:
-            parent = ''
-            for index, rownum  in self.listing:
-                parent = self.draw_row(index, rownum, parent)
-            self.selected = self.summary.names[self.listing.curitem]
+        slowest = self.summary.slowest(self.footer)
+        bar = (curses.ACS_VLINE, self.colors.WHITE)
+        for i in range(self.footer):
+            look = None
+            if i < len(slowest):
+                row = slowest[i]
+                color, stats = self.render_stats(row)
+                look = (' ', ' ', color, self.label(row, True), stats)
+            rownum = self.H-2-self.footer+i
+            if self.damaged(rownum, (look, bar)):
+                self.draw_row(rownum, look, bar)
 
 
         # Update totals.
         # ==============
 
         tpass5, tfail, terr, tall = self.summary.totals
+        tduration = self.summary.duration().rjust(8)
         if tpass5 == '-':
             tpass5 = '- '
         if len(tfail) > 4:
@@ -338,49 +658,95 @@ class SummaryScreen(BaseScreen):
         else:
             color = self.colors.GREEN
 
-        h = self.toprows + 1 + c1h + 1
-        w = self.W-c2w-1
-        self.win.addstr(h,w,tpass5.rjust(4),color)
-        self.win.addstr(h,w+5,tfail.rjust(4),color)
-        self.win.addstr(h,w+10,terr.rjust(4),color)
-        self.win.addstr(h,w+15,tall.rjust(4),color)
-
         module = self.summary.module
+        if self.typing or self.summary.query:
+            module = '/' + self.summary.query
+            if self.typing:
+                module += '_'
+            module += '  (%d found)' % len(self.summary)
+        if self.summary.only_failing:
+            module += '  (failing only)'
+        if self.summary.order != 'name':
+            module += '  (by %s)' % self.summary.order
         if len(module) > c1w:
             module = module[:c1w-3] + '...'
         module = module.ljust(c1w)
-        self.win.addstr(h,3,module,color)
+
+        look = (tpass5, tfail, terr, tall, tduration, module, color)
+        if self.damaged('totals', look):
+            h = self.H-1
+            w = self.W-c2w-1
+            self.win.addstr(h,w,tpass5.rjust(4),color)
+            self.win.addstr(h,w+5,tfail.rjust(4),color)
+            self.win.addstr(h,w+10,terr.rjust(4),color)
+            self.win.addstr(h,w+15,tall.rjust(4),color)
+            self.win.addstr(h,w+20,tduration,color)
+            self.win.addstr(h,3,module,color)
+
+        self.draw_banner()
 
 
         # Finally, commit our writes.
         # ===========================
 
-        self.win.refresh()
+        self.commit()
 
 
-    def draw_row(self, index, rownum, parent):
-        """Given two ints, write a row to the screen.
+    def render_row(self, index, parent):
+        """Given an int and a string, return a 2-tuple: (look, parent).
 
-        The first int is the index into self.names. The second is the number of
-        the row on the screen to write to. Both are 0-indexed. parent is a
-        signal to our bullet logic (we show a secondary bullet for submodules).
+        The int is the index into self.names. parent is a signal to our bullet
+        logic (we show a secondary bullet for submodules). look is a tuple
+        (l, r, color, label, stats) for draw_row, with color and stats per
+        render_stats. Sorted by anything but name, we list TestCases by their
+        names below our module, rather than indented.
 
         """
 
-        c1h, c1w = self.c1
-        c2h, c2w = self.c2
+        row = self.summary[index]
+        name = row.name
+        flat = self.summary.ranked is not None
+        color, stats = self.render_stats(row)
+
+
+        # Bullet(s)
+        # =========
+
+        l = ' '
+        r = ' '
+        if index == self.listing.curitem:
+            if not (parent or flat):
+                parent = name
+            l = curses.ACS_RARROW
+            r = curses.ACS_LARROW
+        elif parent and name.startswith(parent):
+            l = r = curses.ACS_BULLET
+
+
+        return (l, r, color, self.label(row, flat), stats), parent
+
 
-        name, stats, fresh = self.summary[index]
+    def render_stats(self, row):
+        """Given a row, return a 2-tuple: (color, stats).
+
+        stats is a 5-tuple of strings ready to draw, ending with the duration,
+        or None for a module with nothing below it.
+
+        """
+
+        stats = row.stats()
+        fresh = self.summary.data.fresh(row)
 
 
         # Pick a color, and see if we have a result to show.
         # ==================================================
+        # Modules show the counts rolled up from below them.
 
 
         if stats is None:           # module/package
 
             color = self.colors.GRAY
-            show_result = False
+            stats = row.rollup()
 
         else:                       # TestCase
 
@@ -399,13 +765,10 @@ class SummaryScreen(BaseScreen):
                 else:
                     color = self.colors.GREEN
 
-            show_result = True
+        if stats is not None:
 
+            pass5, fail, err, all = stats
 
-        # Show the result if applicable.
-        # ==============================
-
-        if show_result:
             if not int(all):
                 pass5 = fail = err = '-'
 
@@ -418,40 +781,70 @@ class SummaryScreen(BaseScreen):
             if len(all) > 4:
                 all = '9999'
 
-            w = self.W-c2w-1
-            self.win.addstr(rownum,w,pass5.rjust(4),color)
-            self.win.addstr(rownum,w+5,fail.rjust(4),color)
-            self.win.addstr(rownum,w+10,err.rjust(4),color)
-            self.win.addstr(rownum,w+15,all.rjust(4),color)
+            stats = ( pass5.rjust(4), fail.rjust(4), err.rjust(4), all.rjust(4)
+                    , row.duration().rjust(8)
+                     )
 
+        return color, stats
 
-        # Short name, with indent.
-        # ========================
 
-        i = len('.'.join(self.module.split('.')[:-1]))
-        parts = name[i:].lstrip('.').split('.')
-        shortname = ('  '*(len(parts)-1)) + parts[-1]
-        if len(shortname) > c1w:
-            shortname = shortname[:c1w-3] + '...'
-        shortname = shortname.ljust(c1w)
-        self.win.addstr(rownum,3,shortname,color)
+    def label(self, row, flat=False):
+        """Given a row and a boolean, return its short name, indented and fitted
+        to our width; or if flat, its name below our module.
 
+        These are cached, per width.
 
-        # Bullet(s)
-        # =========
+        """
+        c1w = self.c1[1]
+        alias = self.summary.aliases.get(row.name)
+        collapsed = row.name in self.summary.collapsed
+        look = (c1w, alias, collapsed, flat)
+        cached = self.labels.get(row.name)
+        if (cached is not None) and (cached[:4] == look):
+            return cached[4]
+
+        if flat:
+            label = row.name[len(self.module)+1:]
+        else:
+            label = ('  '*(row.depth-self.module.count('.'))) + row.short
+        if alias is not None: # run under another name
+            label += ' = ' + alias
+        if collapsed: # rows below are hidden
+            label += ' [+]'
+        if len(label) > c1w:
+            label = label[:c1w-3] + '...'
+        label = label.ljust(c1w)
+        self.labels[row.name] = look + (label,)
+        return label
+
+
+    def draw_row(self, rownum, look, bar):
+        """Given an int, a look per render_row (or None), and a scrollbar
+        (char, attr) tuple, write a row to the screen.
+        """
+
+        c1h, c1w = self.c1
+        c2h, c2w = self.c2
+
+        self.win.addstr(rownum,1,' '*(c1w+3))
+        self.win.addstr(rownum,c1w+5,' '*(c2w+2))
+        self.win.addch(rownum,self.W,*bar)
+        if look is None:
+            return
+
+        l, r, color, label, stats = look
+
+        if stats is not None:
+            pass5, fail, err, all, duration = stats
+            w = self.W-c2w-1
+            self.win.addstr(rownum,w,pass5,color)
+            self.win.addstr(rownum,w+5,fail,color)
+            self.win.addstr(rownum,w+10,err,color)
+            self.win.addstr(rownum,w+15,all,color)
+            self.win.addstr(rownum,w+20,duration,color)
+
+        self.win.addstr(rownum,3,label,color)
 
-        l = ' '
-        r = ' '
         a = self.colors.BLUE
-        if index == self.listing.curitem:
-            if not parent:
-                parent = name
-            l = curses.ACS_RARROW
-            r = curses.ACS_LARROW
-        elif parent and name.startswith(parent):
-            l = r = curses.ACS_BULLET
         self.win.addch(rownum,1,l,a)
         self.win.addch(rownum,self.W-1,r,a)
-
-
-        return parent
@@ -0,0 +1,239 @@
+"""Find rows in a summary by any part of their dotted names.
+
+Searching is case-insensitive, and a row matches if the query is anywhere in
+its full name, so a query that matches a module matches everything below it.
+
+To answer a query without looking at every row, we keep an index of grams:
+the substrings of one, two and three characters in each name. Every name below
+the top of the tree is the name of its module, a dot, and its short name, so
+rather than index each full name, a row only owns the grams that end in its own
+part of the name, taking in the two characters before the dot so as to catch
+grams that span it. A name contains a gram if its row or one of its modules
+owns it, and the names below a module sort together, just after it, so we can
+take them from a sorted list of all the names. That keeps the index about as
+big as the short names are, and it can be added to as rows come in.
+
+A query of up to three characters is a gram itself, so the rows that own it
+and the rows below those are exactly the ones that match, and we needn't look
+at any of them. Longer queries are answered from their rarest trigram, and
+then we check each name that might match against a lowercased copy.
+
+We work with names rather than rows throughout, so that the heavy lifting is
+done by list slicing and the bisect module.
+
+"""
+from bisect import bisect_left
+
+
+class Index:
+    """Represent the grams in the names of a Rows.
+    """
+
+    def __init__(self, rows):
+        """Takes the Rows that we index; call add() as rows are added to it.
+        """
+        self.rows = rows
+        self.testcases = {} # {gram: [the names of TestCases that own it]}
+        self.modules = {}   # {gram: [the names of modules that own it]}
+        self.unsorted = set()   # grams whose lists need sorting
+        self.names = []     # the sorted names of the rows we have indexed,
+        self.added = []     #   and of those added since we sorted them
+        self.lower = {}     # {name: name.lower()}, for checking matches
+
+
+    def add(self, rows):
+        """Given a sequence of rows, linked to their modules, index them.
+
+        Rows only become modules when they are added, with the first row below
+        them, so we can tell them from TestCases here. We take the rows in
+        order of name, so that our lists stay in sorted runs, one per call,
+        which are quick to sort.
+
+        """
+        touched = set()
+        for row in sorted(rows, key=lambda row: row.name):
+            name = row.name
+            if row.parent is None:
+                text = name
+            else:
+                text = row.parent.name[-2:] + '.' + row.short
+            text = text.lower()
+            if row.sums is None:
+                owners = self.testcases
+            else:
+                owners = self.modules
+            grams = set([ text[i:i+n] for n in (1, 2, 3)
+                                      for i in xrange(len(text)-n+1)
+                         ])
+            for gram in grams:
+                try:
+                    owners[gram].append(name)
+                except KeyError: # a gram we haven't seen
+                    self.testcases[gram] = []
+                    self.modules[gram] = []
+                    owners[gram].append(name)
+            touched.update(grams)
+            self.added.append(name)
+            self.lower[name] = name.lower()
+        self.unsorted.update(touched)
+
+
+    def search(self, query, within=None):
+        """Given a string, return a Matches of the rows whose names contain it.
+
+        We start from whichever gram in query the fewest rows have. We check
+        the TestCases that own it by themselves, and the modules along with the
+        rows below them. The empty query starts from the top.
+
+        If within is given, it is a Matches from an earlier search, for a query
+        that this one takes in. If query is longer than a gram, and within is
+        smaller than what we would otherwise look through, we look through it
+        instead.
+
+        """
+        query = query.lower()
+        if self.added:
+            self.names.extend(self.added)
+            self.names.sort()
+            self.added = []
+
+        best = cost = None
+        exact = len(query) <= 3 # whatever owns the gram matches
+        if (within is not None) and not exact:
+            cost = len(within)
+        if exact:
+            grams = set([query]) - set([''])
+        else:
+            grams = set([query[i:i+3] for i in xrange(len(query)-2)])
+        for gram in sorted(grams, key=self.owned):
+            if gram not in self.testcases:
+                return Matches([], self.rows)
+            if (cost is not None) and (self.owned(gram) >= cost):
+                break # none of the rest can do better
+            if (cost is None) and (len(grams) == 1):
+                best = gram # nothing to choose between
+                break
+            _cost = self.cost(gram, cost)
+            if (cost is None) or (_cost < cost):
+                best, cost = gram, _cost
+
+        if best is None:
+            if within is None:
+                names = self.names
+            else:
+                names = within.names
+            return Matches( collect(query, names, self.lower, 0, len(names))
+                          , self.rows
+                           )
+
+        testcases, modules = self.testcases[best], self.modules[best]
+        if best in self.unsorted:
+            testcases.sort()
+            modules.sort()
+            self.unsorted.discard(best)
+
+
+        # Modules that own it, with the rows below them ...
+        # =================================================
+
+        found = []
+        tops = [] # the modules we looked below
+        i = 0
+        while i < len(modules):
+            name = modules[i]
+            end = name + '/' # sorts just after the names below it
+            lo = bisect_left(self.names, name)
+            hi = bisect_left(self.names, end, lo)
+            if query in self.lower[name]: # so is everything below it
+                found.extend(self.names[lo:hi])
+            else:
+                found.extend(collect(query, self.names, self.lower, lo+1, hi))
+            tops.append(name)
+            i = bisect_left(modules, end, i) # we have the modules below it
+
+
+        # ... and TestCases that own it, outside of those.
+        # =================================================
+
+        lo = 0
+        for name in tops + [None]:
+            if name is None:
+                hi = len(testcases)
+            else:
+                hi = bisect_left(testcases, name, lo)
+            if exact:
+                found.extend(testcases[lo:hi])
+            else:
+                lower = self.lower
+                found.extend([n for n in testcases[lo:hi] if query in lower[n]])
+            if name is not None:
+                lo = bisect_left(testcases, name + '/', hi)
+
+        found.sort()
+        return Matches(found, self.rows)
+
+
+    def owned(self, gram):
+        """Given a gram, return the number of rows that own it.
+        """
+        if gram not in self.testcases:
+            return 0
+        return len(self.testcases[gram]) + len(self.modules[gram])
+
+
+    def cost(self, gram, limit=None):
+        """Given a gram, return about how many rows have it, or at least
+        limit if that is given.
+        """
+        names = self.names
+        cost = len(self.testcases[gram])
+        for name in self.modules[gram]:
+            lo = bisect_left(names, name)
+            cost += bisect_left(names, name + '/', lo) - lo
+            if (limit is not None) and (cost >= limit):
+                break
+        return cost
+
+
+class Matches:
+    """Represent the rows found by a search, as a read-only stand-in for Rows.
+
+    We keep a sorted list of names, and look rows up by name in the Rows they
+    came from when asked for them, which is only for the ones on the screen.
+
+    """
+
+    def __init__(self, names, rows):
+        """Takes a sorted list of names, and a Rows.
+        """
+        self.names = names
+        self.rows = rows
+
+    def __getitem__(self, i):
+        return self.rows.get(self.names[i])
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        for name in self.names:
+            yield self.rows.get(name)
+
+    def __contains__(self, name):
+        return self.index(name) is not None
+
+    def index(self, name):
+        """Given a name, return the index of its row, or None.
+        """
+        i = bisect_left(self.names, name)
+        if (i < len(self.names)) and (self.names[i] == name):
+            return i
+        return None
+
+
+def collect(query, names, lower, lo, hi):
+    """Given a lowercase query, a sorted list of names, a {name: name.lower()}
+    dict, and a slice of the list, return a list of the names in the slice that
+    contain query.
+    """
+    return [name for name in names[lo:hi] if query in lower[name]]
@@ -1,58 +1,139 @@
+import Queue
 import logging
 import os
-import subprocess
-import sys
-
-from assertEquals.cli.utils import BANNER, BORDER, HEADERS
-from assertEquals.interactive.utils import RefreshError, Process
+import threading
+from itertools import islice
+
+from assertEquals.cli.utils import digest, format_duration
+from assertEquals.interactive.records import ( Ranking
+                                             , Row
+                                             , Rows
+                                             , by_duration
+                                             , by_errors
+                                             , by_failures
+                                             , by_pass_rate
+                                             , format_stats
+                                              )
+from assertEquals.interactive.search import Index, Matches, collect
+from assertEquals.interactive.utils import ( Cancelled
+                                           , RefreshError
+                                           , run_scripted
+                                            )
 
 
 logger = logging.getLogger('assertEquals.interactive.summary')
 
 
+SORTS = { 'duration': by_duration
+        , 'failures': by_failures
+        , 'errors': by_errors
+        , 'pass rate': by_pass_rate
+         }
+
+
 class Summary:
     """Represent the data from an inter-process summarize() call.
 
     This is designed to be a persistent object. Repeated calls to refresh will
     update the dataset. On partial updates, existing data will be marked as
-    stale. There is also a show flag for each record; only items for which this
-    are true are included in the name index and __len__ calls.
+    stale. Indexing gives a Row (see records).
+
+    Results stream in from the child as each TestCase finishes. They are queued
+    up in pending, and applied by poll(), which may be called from another
+    thread while refresh() is running. To keep the child off the UI thread
+    altogether, call start() and then fetch() on another thread, and poll()
+    until fetch() returns and once more after that.
+
+    For each TestCase that we run, the child also tells us which source files
+    it depends on, with a hash of each. When we refresh a module, TestCases
+    none of whose files have changed since we last ran them are not run again;
+    we keep their results and mark them fresh.
+
+    A TestCase that the child found under more than one name is only run once.
+    We show the other names as well, with the same results. Module rows carry
+    counts rolled up from the TestCases below them (see records), leaving out
+    these other names, so that nothing is counted twice.
+
+    Modules can be collapsed, hiding the rows below them. While any are, the
+    rows that aren't hidden are kept in a Rows of their own, view, so that we
+    never lay out more than is shown; otherwise view is data itself. While we
+    are searching (see search), only the rows whose names match are listed,
+    whether or not they are hidden. Likewise, we can list only the TestCases
+    with failures or errors, and the modules they are in (see list_failing);
+    these are kept in another Rows, failing, as results come in. Indexing,
+    len() and names only cover the rows that are listed.
+
+    The listing can also be sorted by one of SORTS, rather than by name (see
+    sort). Then we list only TestCases, in a Ranking of their own, ranked, which
+    we refile them in one at a time as their results come in. Another Ranking,
+    timed, has the TestCases that have been timed, slowest first (see
+    slowest). It is only built when it is first asked for, and after that the
+    TestCases whose results have changed are refiled the next time it is.
 
     """
 
     module = ''     # the current module dotted module name
-    data = None     # a dictionary, {name:(stats, fresh)}:
-                    #   stats: None or (pass5, fail, err, all)
-                    #   fresh: None or False or True
-    names = None    # a sorted list of names for which show is True
+    data = None     # a Rows of Row, one per module and TestCase
+    view = None     # data, or a Rows of the rows in it that aren't hidden
+    failing = None  # a Rows of the rows in data with failures or errors
+    listed = None   # view, failing, ranked, or a Matches of the rows found
+    names = None    # a sorted view of names that are listed; listed.names
+    collapsed = None# a set of names of modules whose rows are hidden
+    index = None    # an Index of the names in data, once we search()
+    query = ''      # what we are searching for, or '' if we aren't
+    only_failing = False # whether we only list the rows in failing
+    order = 'name'  # what the listing is sorted by: 'name', or one of SORTS
+    ranked = None   # a Ranking of the TestCases listed, unless sorted by name
+    timed = None    # a Ranking of the TestCases that have been timed, or None
     run = True      # the current state of the run flag
+    jobs = 1        # the number of worker processes for the child to use
+    worker = None   # a Worker, or None to start a new child for each refresh
     totals = ()     # a single 4-tuple per summarize()
-    __lines = None  # for communication between _set_totals and _set_data
-    __raw = ''      # for communication between _call and _set_data
-
-
-    def __init__(self, stopwords=()):
-        """Takes a sequence.
+    pending = None  # a Queue of records from the child, not yet applied
+    deps = None     # a dictionary, {name: {filename: digest}}
+    skip = ()       # a sorted list of names not to run on this refresh
+    aliases = None  # a dictionary, {alias: name}, for TestCases run once
+    aliased = None  # the same, the other way around: {name: [aliases]}
+    __running = (0, 0, 0) # running totals for this refresh: (fail, err, all)
+    __skipped = (0, 0, 0) # totals for skip: (fail, err, all)
+    __searched = 0  # the number of rows in data when we last searched
+    __retimed = None# a set of the rows to refile in timed
+
+
+    def __init__(self, stopwords=(), jobs=1, worker=None):
+        """Takes a sequence, an int, and a Worker.
         """
         self.stopwords = stopwords
-        self.data = {}
-        self.totals = ()
-        self.names = []
+        self.jobs = jobs
+        self.worker = worker
+        self.data = Rows()
+        self.view = self.data # until something is collapsed
+        self.failing = Rows()
+        self.timed = None # until slowest()
+        self.__retimed = set()
+        self.listed = self.view
+        self.totals = format_stats(None, None, 0) # nothing found yet
+        self.names = self.listed.names
+        self.collapsed = set()
+        self.index = None # until search()
+        self.pending = Queue.Queue()
+        self.lock = threading.Lock()
+        self.deps = {}
+        self.aliases = {}
+        self.aliased = {}
+        self.__digests = {}
 
 
     # Container emulation
     # ===================
 
     def __getitem__(self, i):
-        """Takes an int index into self.names
+        """Takes an int index into self.names, and returns a Row.
         """
-        name = self.names[i]
-        return [name] + self.data[name]
+        return self.listed[i]
 
     def __len__(self):
-        """Only count items for which show is True.
-        """
-        return len(self.names)
+        return len(self.listed)
 
     def __iter__(self):
         return self.names.__iter__()
@@ -65,122 +146,528 @@ class Summary:
     def refresh(self, module, find_only=True):
         """Update our information.
         """
+        self.start(module, find_only)
+        self.fetch()
+        self._set_data()
+
+
+    # Refreshing in the background
+    # ============================
+    # refresh() in three steps, for when the child runs on another thread:
+    # start() and poll() on the main thread, and fetch() in between.
+
+    def start(self, module, find_only=True):
+        """Get ready to refresh module.
+        """
         self.module = module
         self.find_only = find_only
-
-        self._call()
+        self.pending = Queue.Queue()
 
         self._set_stale()
-        self._set_totals()
-        self._set_data()
+        self.skip = []
+        if not find_only:
+            self.skip = self._find_unchanged()
+        tfail = terr = tall = 0
+        for name in self.skip:
+            row = self.data.get(name)
+            row.run = self.data.generation
+            tfail += row.fail
+            terr += row.err
+            tall += row.all
+        skip = set(self.skip)
+        for alias, name in self.aliases.iteritems():
+            if (alias in self.data) and (name in skip):
+                self.data.get(alias).run = self.data.generation
+        self.__running = self.__skipped = (tfail, terr, tall)
+
+
+    def fetch(self):
+        """Run the child for a refresh begun with start(); results are queued
+        up in pending for poll().
+        """
+        try:
+            self._call()
+        except Cancelled:
+            pass # keep what we have; the rest stays stale
+
 
+    def cancel(self):
+        """Cancel a refresh in progress; meant to be called from another thread.
+        """
+        if self.worker is not None:
+            self.worker.cancel()
+
+
+    def poll(self):
+        """Apply any results that have come in; return a boolean: were there any?
+        """
+        return self._set_data()
 
-    def update(self, name, pass5, fail, err, all):
+
+    def update(self, name, pass5, fail, err, all, wall=None, cpu=None):
         """Given data on one testcase, update its info.
 
-        This is called from DetailScreen.
+        This is called from DetailScreen. The totals become those of the
+        current module, with the new results rolled in. wall and cpu are per
+        Row.
 
         """
         if name not in self.data:
             raise StandardError("Running detail for module not in " +
                                 "summary: %s." % name)
         self._set_stale()
-        self.data[name] = [(pass5, fail, err, all), True]
-        self.totals = [pass5, fail, err, all]
+        name = self.aliases.get(name, name)
+        for _name in [name] + self._aliases_of(name):
+            row = self.data.get(_name)
+            before = row.counts()
+            row.fail, row.err, row.all = int(fail), int(err), int(all)
+            row.wall, row.cpu = wall, cpu
+            row.run = self.data.generation
+            if _name == name:
+                row.roll(before)
+                refiled = self._refile(row)
+                self._rerank(row)
+        if self.query and self.only_failing and refiled and \
+           (self.ranked is None):
+            self.search(self.query)
+        self.deps.pop(name, None) # we don't know what it depends on now
+        module = self.data.get(self.module)
+        if (module is not None) and (module.sums is not None):
+            self.totals = module.rollup()
+        else:
+            self.totals = [pass5, fail, err, all]
+
+
+    def duration(self):
+        """Return the wall clock time of the TestCases in the current module,
+        per Row.duration.
+        """
+        row = self.data.get(self.module)
+        if row is None:
+            return format_duration(None)
+        return row.duration()
 
 
-    # Helpers
+    def slowest(self, n):
+        """Given an int, return a list of up to that many of the rows of the
+        TestCases that took the longest, slowest first.
+        """
+        retimed, self.__retimed = self.__retimed, set()
+        if (self.timed is None) or (len(retimed) * 16 > len(self.data)):
+            self.timed = Ranking(by_duration)
+            self.timed.fill([row for row in self.data if self._times(row)])
+        else:
+            for row in retimed:
+                if self._times(row):
+                    self.timed.refile(row)
+                else:
+                    self.timed.discard(row.name)
+        return list(islice(self.timed, n))
+
+
+    # Folding
     # =======
 
-    def _call(self):
-        """Invoke a child process and return its output.
+    def shown(self, name):
+        """Given a dotted name, return a boolean: is it outside collapsed modules?
+        """
+        parts = name.split('.')
+        for i in range(1, len(parts)):
+            if '.'.join(parts[:i]) in self.collapsed:
+                return False
+        return True
+
+    def collapse(self, name):
+        """Given the dotted name of a module, hide the rows below it.
+        """
+        if name in self.collapsed:
+            return
+        self.collapsed.add(name)
+        if self.view is self.data:
+            view = Rows()
+            view.add(self._unhidden(self.data))
+            self._set_view(view)
+            return
+        for row in list(self.view.under(name)):
+            self.view.remove(row.name)
+
+    def expand(self, name):
+        """Given the dotted name of a module, show the rows below it again.
+
+        Rows below modules that are themselves collapsed stay hidden.
+
+        """
+        if name not in self.collapsed:
+            return
+        self.collapsed.remove(name)
+        if not self.collapsed:
+            self._set_view(self.data)
+        elif self.shown(name):
+            self.view.add(self._unhidden(self.data.under(name)))
+
+
+    # Searching
+    # =========
+
+    def search(self, query):
+        """Given a string, list only the rows whose names contain it.
+
+        The empty string lists the rows that aren't hidden again. While the
+        user types, each query usually takes in the last one, so we look
+        through the last one's matches rather than the index, unless rows have
+        come in since. If we only list failing rows, we look through those.
+        The index is built the first time we search, and kept up to date with
+        new rows after that.
+
+        """
+        if self.order != 'name':
+            self.query = query
+            self._rank()
+        elif not query:
+            if self.only_failing:
+                self.listed = self.failing
+            else:
+                self.listed = self.view
+        elif self.only_failing:
+            names = list(self.failing.names)
+            lower = self._index().lower
+            names = collect(query.lower(), names, lower, 0, len(names))
+            self.listed = Matches(names, self.data)
+            self.__searched = None # nothing to narrow
+        else:
+            within = None
+            if (self.listed is not self.view) and \
+               (self.query.lower() in query.lower()) and \
+               (self.__searched == len(self.data)):
+                within = self.listed
+            self.listed = self._index().search(query, within)
+            self.__searched = len(self.data)
+        self.query = query
+        self.names = self.listed.names
+
+    def list_failing(self, only):
+        """Given a boolean, list only the TestCases with failures or errors,
+        and the modules they are in, or else list everything again.
+
+        Like search matches, these are listed whether or not they are hidden.
+
+        """
+        self.only_failing = only
+        self.__searched = None # the last matches may be of the wrong rows
+        self.search(self.query)
+
 
-        We hand on our environment and any sys.path manipulations to the child,
-        and we capture stderr as well as stdout so we can handle errors.
+    # Sorting
+    # =======
+
+    def sort(self, order):
+        """Given 'name' or one of SORTS, sort the listing by it.
+
+        Sorted by anything but name, we list only TestCases, leaving out other
+        names for TestCases that were run under one name, and those that have
+        no results to sort by come last. Searching and listing failing rows
+        work as ever.
+
+        """
+        self.order = order
+        self.ranked = None
+        self.__searched = None # the last matches may be of the wrong rows
+        self.search(self.query)
 
+
+    # Helpers
+    # =======
+
+    def _call(self):
+        """Invoke a child process and store its output.
         """
-        args = [ sys.executable
-               , '-u' # unbuffered, so we can interact with it
-               , sys.argv[0]
-               , '--stopwords=%s' % ','.join(self.stopwords)
+        args = [ '--stopwords=%s' % ','.join(self.stopwords)
                , '--scripted'
+               , '--no-cache' # we keep track of what needs running ourselves
                , self.module
                 ]
         if self.find_only:
-            args.insert(4, '--find-only')
-
-        environ = os.environ.copy()
-        environ['PYTHONPATH'] = ':'.join(sys.path)
-
-        proc = Process(args=args, env=environ)
-
-        raw = proc.communicate()
-        if BANNER not in raw:
+            args.insert(1, '--find-only')
+        if self.jobs > 1:
+            args.insert(1, '--jobs=%d' % self.jobs)
+        if self.skip:
+            args.insert(1, '--skip=%s' % ','.join(self.skip))
+
+        raw, records = run_scripted(args, self.worker, self.pending.put)
+        if (not records) or (records[-1]['kind'] != 'totals'):
             raise RefreshError(raw)
-        self.__raw = raw
 
 
     def _set_stale(self):
         """Mark currently fresh data as stale.
         """
-        for name, datum in self.data.iteritems():
-            if datum[1] is True:
-                datum[1] = False
+        self.data.stale()
 
 
-    def _set_totals(self):
-        """Given self.__raw, set totals and __lines on self.
+    def _aliases_of(self, name):
+        """Given a dotted name, return a list of the other names it goes by.
         """
-        lines = self.__raw.splitlines()
-        self.totals = tuple(lines[-1].split()[1:])
-        del lines[-1]
-        self.__lines = lines
+        return self.aliased.get(name, [])
 
 
-    def _set_data(self):
-        """Extract and store data from __lines.
+    def _index(self):
+        """Return our Index, building it the first time we search.
         """
+        if self.index is None:
+            self.index = Index(self.data)
+            self.index.add(self.data)
+        return self.index
 
-        data = {}
-        reading_report = False # ignore any output that precedes our report
 
-        for line in self.__lines:
+    def _unhidden(self, rows):
+        """Given rows in order of name, return a list of those that aren't
+        below a collapsed module.
+        """
+        out = []
+        hidden = None # the prefix of a collapsed module we're inside of
+        for row in rows:
+            if (hidden is not None) and row.name.startswith(hidden):
+                continue
+            hidden = None
+            out.append(row)
+            if row.name in self.collapsed:
+                hidden = row.name + '.'
+        return out
 
-            # Decide if we want this line, and if so, split it on spaces.
-            # ===========================================================
 
-            line = line.strip('\n')
-            if line == BANNER:
-                reading_report = True
-                continue
-            if (not reading_report) or (not line) or line in (HEADERS, BORDER):
+    def _set_view(self, view):
+        """Given data or a Rows, make it our view, and list it if we listed the
+        old one.
+        """
+        if self.listed is self.view:
+            self.listed = view
+            self.names = view.names
+        self.view = view
+
+
+    def _find_unchanged(self):
+        """Return a sorted list of TestCases below module that we needn't run.
+        """
+        unchanged = []
+        prefix = self.module + '.'
+        for name, deps in self.deps.iteritems():
+            if not name.startswith(prefix) or name not in self.data:
                 continue
-            tokens = line.split()
+            for filename, digest_ in deps.iteritems():
+                if self._digest(filename) != digest_:
+                    break
+            else:
+                unchanged.append(name)
+        return sorted(unchanged)
+
+
+    def _digest(self, filename):
+        """Given a filename, return a hash of its contents, or None.
+
+        We only read the file again if its mtime or size has changed.
+
+        """
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return None
+        key = (stat.st_mtime, stat.st_size)
+        cached = self.__digests.get(filename)
+        if (cached is None) or (cached[0] != key):
+            cached = (key, digest(filename))
+            self.__digests[filename] = cached
+        return cached[1]
+
+
+    def _get_row(self, name, new):
+        """Given a dotted name and a {name: Row} dict of rows that we don't
+        have yet, return the Row for name, adding it to new if need be.
 
+        A new row is linked to the row of its module, if we have one.
 
-            # Convert the row to our record format.
-            # =====================================
-            # The raw report lists TestCases by full dotted name, but we want to
-            # only show short names, and indent under a module tree. So we add
-            # all parent modules to data, and set their value to (None, None)
+        """
+        row = self.data.get(name)
+        if row is None:
+            row = new.get(name)
+            if row is None:
+                row = new[name] = Row(name)
+                if '.' in name:
+                    parent = name.rsplit('.', 1)[0]
+                    parent = self.data.get(parent) or new.get(parent)
+                    if parent is not None:
+                        parent.adopt(row)
+        return row
+
+
+    def _refile(self, row):
+        """Given a TestCase whose counts have been rolled up, add it and its
+        modules to failing, or remove them, as they have failures or errors or
+        not. Return a boolean: did failing change?
+
+        If a module's standing doesn't change, neither does any above it.
 
-            name = tokens[0]
-            stats = tuple(tokens[1:])
+        """
+        refiled = False
+        while row is not None:
+            if row.sums is None:
+                bad = bool(row.fail or row.err)
+            else:
+                bad = bool(row.sums[0] or row.sums[1])
+            if bad == (row.name in self.failing):
+                break
+            if bad:
+                self.failing.insert(row)
+            else:
+                self.failing.remove(row.name)
+            refiled = True
+            row = row.parent
+        return refiled
+
+
+    def _ranks(self, row):
+        """Given a row, return a boolean: does it belong in ranked?
+        """
+        if (row.all is None) or (row.name in self.aliases):
+            return False
+        if self.only_failing and not (row.fail or row.err):
+            return False
+        if self.query and (self.query.lower() not in row.name.lower()):
+            return False
+        return True
 
-            module_dotted, testcase = name.rsplit('.',1)
 
-            parts = module_dotted.split('.')
-            for i in range(len(parts),self.module.count('.'),-1):
-                ancestor = '.'.join(parts[:i])
-                data[ancestor] = [None, None]
+    def _times(self, row):
+        """Given a row, return a boolean: does it belong in timed?
+        """
+        return (by_duration(row) is not None) and (row.name not in self.aliases)
 
-            fresh = None
-            if '-' not in stats:
-                fresh = True
 
-            data[name] = [stats, fresh]
+    def _rank(self):
+        """List the TestCases that belong in ranked, in a new one.
+        """
+        if self.only_failing:
+            rows = self.failing
+        elif self.query:
+            rows = self._index().search(self.query)
+        else:
+            rows = self.data
+        self.ranked = Ranking(SORTS[self.order])
+        self.ranked.fill([row for row in rows if self._ranks(row)])
+        self.listed = self.ranked
+
+
+    def _rerank(self, row):
+        """Given a TestCase whose results have changed, refile it in ranked if
+        we have one, and in timed when it is next asked for.
+        """
+        if self.timed is not None:
+            self.__retimed.add(row)
+        if self.ranked is not None:
+            if self._ranks(row):
+                self.ranked.refile(row)
+            else:
+                self.ranked.discard(row.name)
+
 
-        self.data.update(data)
-        self.names = sorted(self.data.keys())
-        del self.__lines
+    def _set_data(self):
+        """Apply records from pending; return a boolean: were there any?
+        """
 
+        self.lock.acquire()
+        try:
+
+            new = {} # {name: Row} for rows we don't have yet
+            changed = False
+            refiled = False
+            totals = None
+            tfail, terr, tall = self.__running
+
+            while 1:
+                try:
+                    record = self.pending.get_nowait()
+                except Queue.Empty:
+                    break
+
+                fail, err, all = record['fail'], record['err'], record['all']
+                if record['kind'] == 'totals':
+                    if fail is not None:
+                        sfail, serr, sall = self.__skipped
+                        fail, err, all = fail+sfail, err+serr, all+sall
+                    totals = format_stats(fail, err, all)
+                    continue
+                if fail is None:
+                    tfail = terr = None
+                else:
+                    tfail += fail
+                    terr += err
+                tall += all
+
+
+                # Convert the record to rows.
+                # ==========================
+                # The child names TestCases by full dotted name, but we want to
+                # only show short names, and indent under a module tree. So we
+                # add rows for all parent modules too, outermost first, so that
+                # each can be linked to its own parent. Their counts are rolled
+                # up from the TestCases.
+
+                name = intern(record['name'])
+                aliases = [intern(a) for a in record.get('aliases', [])]
+                for alias in aliases:
+                    was = self.aliases.get(alias)
+                    if was == name:
+                        continue
+                    if was is not None:
+                        self.aliased[was].remove(alias)
+                    self.aliases[alias] = name
+                    self.aliased.setdefault(name, []).append(alias)
+
+                for _name in [name] + aliases:
+                    module_dotted, testcase = _name.rsplit('.',1)
+
+                    parts = module_dotted.split('.')
+                    for i in range(self.module.count('.')+1, len(parts)+1):
+                        ancestor = '.'.join(parts[:i])
+                        self._get_row(ancestor, new)
+
+                run = None
+                if fail is not None:
+                    run = self.data.generation
+                    if 'deps' in record:
+                        self.deps[name] = record['deps']
+
+                for _name in [name] + aliases:
+                    row = self._get_row(_name, new)
+                    before = row.counts()
+                    row.fail, row.err, row.all = fail, err, all
+                    row.wall, row.cpu = record.get('wall'), record.get('cpu')
+                    row.run = run
+                    if _name == name:
+                        row.roll(before)
+                        refiled = self._refile(row) or refiled
+                        self._rerank(row)
+                changed = True
+
+
+            # Update self.
+            # ============
+
+            if changed:
+                self.__running = (tfail, terr, tall)
+                self.totals = format_stats(tfail, terr, tall)
+                self.data.add(new.values())
+                if self.view is not self.data:
+                    self.view.add([ row for row in new.values()
+                                    if self.shown(row.name)
+                                   ])
+                if new and (self.index is not None):
+                    self.index.add(new.values())
+                if self.query and (new or (self.only_failing and refiled)) \
+                   and (self.ranked is None): # ranked keeps up by itself
+                    self.search(self.query)
+            if totals is not None:
+                self.totals = totals
+            return changed or (totals is not None)
+
+        finally:
+            self.lock.release()
@@ -1,14 +1,24 @@
 import Queue
 import curses
+import errno
+import fcntl
 import logging
+import os
+import signal
 import subprocess
+import sys
 import textwrap
 import threading
 import traceback
 from curses import ascii
 
+from assertEquals.cli.utils import read_record
+from assertEquals.cli.worker import RESTART, SENTINEL
+
 logger = logging.getLogger('assertEquals.interactive.utils')
 
+CHUNK = 65536 # the most we read from a child at once
+
 
 class Bucket:
     """
@@ -25,6 +35,11 @@ class RefreshError(StandardError):
         self.traceback = traceback
 
 
+class Cancelled(StandardError):
+    """The user cancelled a refresh.
+    """
+
+
 class CommunicationProblem(StandardError):
     """Wrap a Process that wants to talk.
     """
@@ -40,6 +55,8 @@ class Process(subprocess.Popen):
     prompt = '(Pdb) ' # The signal that it wants to talk.
     intro = '' # If it wants to talk, this will be the first thing it said.
     interactive = False # whether or not we are interacting with the child
+    terminator = None # For long-lived children, the signal that it's done.
+    idle = False # whether a long-lived child has sent its terminator
 
     def __init__(self, *args, **kwargs):
         """Extend to capture I/O streams.
@@ -64,30 +81,48 @@ class Process(subprocess.Popen):
         interact. Otherwise, we will return the last thing it said. To see if
         the conversation is over, use self.poll().
 
+        We read whatever the child has written, in chunks, straight from the
+        file descriptor. The prompt and terminator only ever come at the end of
+        what the child has written so far (it is waiting on us after that), so
+        we only need to keep an eye on the last few bytes.
+
         """
 
         if input is not None:
             self.stdin.write(input + '\n')
 
+        fd = self.stdout.fileno()
         output = []
-        i = len(self.prompt)
+        tail = '' # the last n bytes of output
+        done = False
+        t = len(self.terminator or '')
+        n = max(len(self.prompt), t)
 
         while 1:
-            retcode = self.poll()
-            if retcode is None:
-                # Conversation not done; check to see if it's our turn to talk.
-                if len(output) >= i:
-                    latest = ''.join(output[-i:])
-                    if latest == self.prompt:
-                        self.interactive = True
-                        break
-                output.append(self.stdout.read(1))
-            else:
-                # The process is done; assume we can read to EOF.
-                output.append(self.stdout.read())
+            try:
+                chunk = os.read(fd, CHUNK)
+            except OSError, err:
+                if err.errno == errno.EINTR: # SIGWINCH, for example
+                    continue
+                raise
+            if not chunk:
+                # The process is done.
+                self.wait()
+                break
+            output.append(chunk)
+            tail = (tail + chunk)[-n:]
+            # Check to see if the conversation is over for now.
+            if t and tail.endswith(self.terminator):
+                self.idle = done = True
+                break
+            # Check to see if it's our turn to talk.
+            if tail.endswith(self.prompt):
+                self.interactive = True
                 break
 
         output = ''.join(output)
+        if done:
+            output = output[:-t]
         if self.interactive and (input is None):
             self.intro = output
             raise CommunicationProblem(self)
@@ -95,38 +130,356 @@ class Process(subprocess.Popen):
             return output
 
 
-class Spinner:
-    """Represent a random work indicator, handled in a separate thread.
+    def finished(self):
+        """Return a boolean: is the current conversation over?
+        """
+        return self.idle or (self.poll() is not None)
+
+
+class Channel:
+    """Represent the receiving end of a structured result channel.
+
+    A child writes length-prefixed records (see write_record) to the file
+    descriptor fd. We read them in a separate thread, so that the child never
+    blocks on a full pipe while we are busy with its stdout, and we queue them
+    up for collect(). If listener is set, it is also called with each record
+    as soon as it comes in (on the reading thread), so that results can be
+    shown while the child is still running.
+
     """
 
-    def __init__(self, spin):
-        """Takes a callable that actually draws/undraws the spinner.
+    fd = None       # the writing end, for the child
+    listener = None # a callable taking a record, or None
+    skip = 0        # the number of abandoned requests whose records to skip
+
+    def __init__(self):
+        r, self.fd = os.pipe()
+        self.records = Queue.Queue()
+        thread = threading.Thread(target=self.read, args=(os.fdopen(r, 'rb'),))
+        thread.setDaemon(True)
+        thread.start()
+
+    def close(self):
+        """Close our copy of the writing end; call this once the child has it.
         """
-        self.spin = spin
-        self.flag = Queue.Queue(1)
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
 
-    def start(self):
-        """Show a spinner.
+    def read(self, fp):
+        """Queue up records until EOF, which is queued as None.
         """
-        self.thread = threading.Thread(target=self.spin)
-        self.thread.start()
+        while 1:
+            record = read_record(fp)
+            listener = self.listener
+            if (listener is not None) and (record is not None):
+                if record['kind'] != 'done':
+                    listener(record)
+            self.records.put(record)
+            if record is None:
+                break
+        fp.close()
+
+    def discard(self):
+        """Throw away records from requests that we walked away from.
+
+        Call this before setting listener for a new request.
 
-    def stop(self):
-        """Stop the spinner.
         """
-        self.flag.put(True)
-        self.thread.join()
+        while self.skip:
+            self.collect()
+            self.skip -= 1
 
-    def __call__(self, call, *args, **kwargs):
-        """Convenient way to run a routine with a spinner.
+    def collect(self):
+        """Return a list of records, up to the next 'done' record or EOF.
         """
-        self.start()
+        records = []
+        while 1:
+            record = self.records.get()
+            if record is None:
+                self.records.put(None) # we stay at EOF
+                break
+            elif record['kind'] == 'done':
+                break
+            records.append(record)
+        return records
+
+
+def run_scripted(args, worker=None, listener=None):
+    """Given a list of arguments for assertEquals, return output and records.
+
+    The return value is a 2-tuple: the output of the child process, as a
+    string, and a list of the records it sent on its result channel. If
+    listener is given, it is called with each record as it comes in (see
+    Channel).
+
+    If worker is None, we invoke a new child process. We hand on our environment
+    and any sys.path manipulations to the child, and we capture stderr as well
+    as stdout so we can handle errors. Otherwise, worker is a Worker, and we
+    hand it the request. Either way, we raise CommunicationProblem if the child
+    wants to talk.
+
+    """
+    if worker is not None:
+        return worker(args, listener)
+
+    channel = Channel()
+    channel.listener = listener
+    args = [ sys.executable
+           , '-u' # unbuffered, so we can interact with it
+           , sys.argv[0]
+           , '--channel=%d' % channel.fd
+            ] + args
+    environ = os.environ.copy()
+    environ['PYTHONPATH'] = ':'.join(sys.path)
+
+    try:
+        proc = Process(args=args, env=environ)
+    finally:
+        channel.close()
+    output = proc.communicate()
+    return output, channel.collect()
+
+
+class Worker:
+    """Represent a long-lived child process that runs reports for us.
+
+    The child (assertEquals --worker) keeps its imports warm between requests.
+    It is started lazily, and restarted if it dies, if our sys.path changes, or
+    if it tells us that source files have changed.
+
+    The child leads its own process group, so that cancel() can take down the
+    child along with any processes it has forked to run tests.
+
+    """
+
+    proc = None         # a Process
+    channel = None      # a Channel for proc
+    path = ''           # the PYTHONPATH that proc was started with
+    cancelled = False   # whether cancel() was called during the current request
+
+    def __call__(self, args, listener=None):
+        """Given a list of arguments for assertEquals and an optional listener
+        (see Channel), return output and records.
+        """
+        for i in range(3):
+            proc = self.get_process()
+            proc.idle = proc.interactive = False
+            self.channel.discard()
+            self.channel.listener = listener
+            proc.stdin.write('\t'.join(args) + '\n')
+            try:
+                output = proc.communicate()
+            except CommunicationProblem:
+                self.channel.skip += 1
+                self.channel.listener = None
+                raise
+            if self.cancelled:
+                self.cancelled = False
+                self.channel.collect() # wait for the listener to catch up
+                self.channel.listener = None
+                self.stop()
+                raise Cancelled
+            if proc.poll() != RESTART:
+                break
         try:
-            return call(*args, **kwargs)
+            return output, self.channel.collect()
         finally:
+            self.channel.listener = None
+
+    def get_process(self):
+        """Return a live Process, starting one if necessary.
+        """
+        path = ':'.join(sys.path)
+        if self.proc is not None:
+            if (self.proc.poll() is None) and (self.path == path):
+                return self.proc
             self.stop()
 
+        self.channel = Channel()
+        args = ( sys.executable
+               , '-u' # unbuffered, so we can interact with it
+               , sys.argv[0]
+               , '--worker'
+               , '--channel=%d' % self.channel.fd
+                )
+        environ = os.environ.copy()
+        environ['PYTHONPATH'] = path
 
+        preexec = getattr(os, 'setsid', None)
+
+        try:
+            self.proc = Process(args=args, env=environ, preexec_fn=preexec)
+        finally:
+            self.channel.close()
+        self.proc.terminator = SENTINEL
+        self.path = path
+        return self.proc
+
+    def cancel(self):
+        """Kill the child's process group, if it is busy.
+
+        This is meant to be called from another thread while __call__ is
+        blocked; __call__ will then raise Cancelled.
+
+        """
+        proc = self.proc
+        if (proc is None) or proc.idle or (proc.poll() is not None):
+            return
+        self.cancelled = True
+        try:
+            if hasattr(os, 'killpg'):
+                os.killpg(proc.pid, signal.SIGKILL)
+            else:
+                proc.kill()
+        except OSError:
+            pass
+
+    def stop(self):
+        """Stop the child process, if any.
+        """
+        if self.proc is None:
+            return
+        if self.proc.poll() is None:
+            self.proc.stdin.close()
+            if not self.proc.idle:  # it's busy; don't wait for it to finish
+                self.proc.kill()
+            self.proc.wait()
+        self.proc = None
+
+
+def drain(fd):
+    """Read everything there is to read from a non-blocking file descriptor.
+    """
+    while 1:
+        try:
+            if not os.read(fd, 4096):
+                return
+        except OSError, err:
+            if err.errno in (errno.EAGAIN, errno.EINTR):
+                return
+            raise
+
+
+class Runner:
+    """Represent a queue of jobs, run one at a time on a background thread.
+
+    This is how the screens run tests without blocking the UI. A job is put()
+    with a start callable and a callback, both of which are called on the main
+    thread: start() just before the job runs, to get things ready and return
+    the callable to run in the background, and the callback, with the result
+    (or else the exception raised, with its traceback attached), from finish().
+
+    fd becomes readable when a job has finished, so that the main loop can
+    sleep in select() until there is something to do. The next job isn't
+    started until the callback for the last one has been called, so callbacks
+    see jobs finish in the order they were queued.
+
+    """
+
+    fd = None       # the reading end of our wake-up pipe
+    queue = None    # a list of (key, start, callback) tuples, waiting to run
+    current = None  # the (key, start, callback) tuple that is running, or None
+
+    def __init__(self):
+        self.fd, self.__wake = os.pipe()
+        for fd in (self.fd, self.__wake):
+            flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+            fcntl.fcntl(fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+        self.queue = []
+        self.inbox = Queue.Queue()
+        self.outbox = Queue.Queue()
+        thread = threading.Thread(target=self.work)
+        thread.setDaemon(True)
+        thread.start()
+
+    def busy(self):
+        """Return a boolean: are there jobs running or waiting to run?
+        """
+        return (self.current is not None) or bool(self.queue)
+
+    def put(self, start, callback, key=None):
+        """Given two callables and a hashable key, queue up a job.
+
+        callback is called with two arguments: the result, and an exception or
+        None. If a job with the same key is already waiting, we drop this one.
+
+        """
+        if key is not None:
+            for job in self.queue:
+                if job[0] == key:
+                    return
+        self.queue.append((key, start, callback))
+        self.next()
+
+    def clear(self):
+        """Drop the jobs that are waiting; the one running, if any, carries on.
+        """
+        self.queue = []
+
+    def finish(self):
+        """Call back for any jobs that have finished, and start the next one.
+
+        Return the first of the callbacks' return values that isn't None. If a
+        callback raises, we drop the jobs that are waiting, and re-raise.
+
+        """
+        drain(self.fd)
+        out = None
+        while 1:
+            try:
+                result, error = self.outbox.get_nowait()
+            except Queue.Empty:
+                break
+            key, start, callback = self.current
+            self.current = None
+            try:
+                screen = callback(result, error)
+            except:
+                self.clear()
+                raise
+            if out is None:
+                out = screen
+        self.next()
+        return out
+
+    def next(self):
+        """Start the next job, if we are idle.
+        """
+        if (self.current is not None) or not self.queue:
+            return
+        self.current = self.queue.pop(0)
+        try:
+            call = self.current[1]()
+        except:
+            self.current = None
+            raise
+        self.inbox.put(call)
+
+    def stop(self):
+        """Tell the thread to stop once its current job is done.
+        """
+        self.clear()
+        self.inbox.put(None)
+
+    def work(self):
+        """Run jobs from inbox, on our thread, until we get None.
+        """
+        while 1:
+            call = self.inbox.get()
+            if call is None:
+                break
+            try:
+                result, error = call(), None
+            except:
+                result, error = None, sys.exc_info()[1]
+                if not hasattr(error, 'traceback'):
+                    error.traceback = traceback.format_exc()
+            self.outbox.put((result, error))
+            try:
+                os.write(self.__wake, 'x')
+            except OSError: # the pipe is full; we'll hear about it anyway
+                pass
 
 
 class DoneScrolling(StandardError):
@@ -134,8 +487,43 @@ class DoneScrolling(StandardError):
     """
 
 
+class Span(object):
+    """Represents a range of ints, like xrange, but comparable to a list.
+    """
+
+    __slots__ = ('start', 'stop')
+
+    def __init__(self, start, stop):
+        self.start = start
+        self.stop = max(start, stop)
+
+    def __contains__(self, i):
+        return self.start <= i < self.stop
+
+    def __iter__(self):
+        return iter(xrange(self.start, self.stop))
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __eq__(self, other):
+        if isinstance(other, Span):
+            return (self.start, self.stop) == (other.start, other.stop)
+        return list(self) == list(other)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
 class ScrollArea:
     """Represents a scrollable portion of a screen.
+
+    Everything is constant-time arithmetic on the viewport, so the number of
+    items only matters to the caller.
+
     """
 
     numrows = 0         # number of viewable rows; len semantics
@@ -145,7 +533,7 @@ class ScrollArea:
     numitems = 0        # the total number of items in the list; len semantics
     curitem = 0         # index of the currently curitem item; 0-indexed
     start = end_ = 0    # coordinates in your list of items; slice semantics
-    bar = None          # a range() within range(numrows) for which a scrollbar
+    bar = None          # a Span within range(numrows) for which a scrollbar
                         #   should be drawn
 
     def __init__(self, numrows, numitems, toprow):
@@ -171,16 +559,13 @@ class ScrollArea:
     #   index -- an index of an item currently being displayed
     #   rownum -- a row number relative to the current window object
 
-    def __list(self):
-        def rownum(i):
-            return self.toprow + i - self.start
-        return [(i, rownum(i)) for i in range(self.start, self.end_)]
-
     def __iter__(self):
-        return iter(self.__list())
+        offset = self.toprow - self.start
+        for i in xrange(self.start, self.end_):
+            yield (i, i + offset)
 
     def __len__(self):
-        return len(self.__list())
+        return max(0, self.end_ - self.start)
 
 
     # Basic API
@@ -219,14 +604,56 @@ class ScrollArea:
 
     def scroll(self, delta):
         """Support multi-line scrolling.
+
+        This is the same as calling scroll_one() delta times, but in one step.
+
         """
-        up = delta < 0
-        delta = abs(delta)
-        try:
-            for i in range(delta):
-                self.scroll_one(up)
-        except DoneScrolling:
+        if delta == 0:
+            return
+        elif self.numitems == 0:
+            self._refuse()
+            return
+
+        if delta < 0: # scroll up
+            want = -delta
+            moved = min(want, self.cursor)
+            self.cursor -= moved
+            shift = min(want - moved, self.start)
+            if self.end_ - self.start > self.numrows:
+                self.end_ -= shift
+            else:
+                self.end_ = min(self.end_, self.start - shift + self.numrows)
+            self.start -= shift
+            moved += shift
+
+        else: # scroll down
+            want = delta
+            room = max(0, self.numitems - 1 - self.curitem)
+            moved = min(want, room)
+            ahead = min(moved, max(0, self.numrows - 1 - self.cursor))
+            self.cursor += ahead
+            self.start += moved - ahead
+            self.end_ += moved - ahead
+
+        if moved < want:
             self._refuse()
+        else:
+            self.update()
+
+
+    def jump(self, index):
+        """Select the item at index, scrolling as little as possible.
+        """
+        if not (0 <= index < self.numitems):
+            self._refuse()
+            return
+        if index < self.start:                  # above the viewport
+            self.start = index
+        elif index >= self.start + self.numrows:# below the viewport
+            self.start = index - self.numrows + 1
+        self.end_ = min(self.start + self.numrows, self.numitems)
+        self.cursor = index - self.start
+        self.update()
 
 
     # Extended API
@@ -368,7 +795,7 @@ class ScrollArea:
             end = start + size + 1
             if end > self.numrows:
                 end = self.numrows
-            bar = range(start+self.toprow, end+self.toprow)
+            bar = Span(start+self.toprow, end+self.toprow)
         self.bar = bar
         self.curitem = self.start + self.cursor
 
@@ -385,9 +812,9 @@ class ScrollArea:
     def move_cursor(self, rownum):
         """Move the cursor to a specific row, selecting the item there.
         """
-        if (self.numrows < self.numitems) and (rownum in range(self.numrows)):
+        if (self.numrows < self.numitems) and (0 <= rownum < self.numrows):
             self.cursor = rownum
-            if rownum not in [i[1] for i in self]:
+            if not (self.toprow <= rownum < self.toprow + len(self)):
                 self._refuse()
             else:
                 self.update()
@@ -1,8 +1,25 @@
+import errno
+import os
+import shutil
 import sys
+import tempfile
+import time
+import traceback
 import unittest
+from StringIO import StringIO
 
+from assertEquals.cli.cache import Cache as _Cache
+from assertEquals.cli.finder import Finder as _Finder, Unresolved, submodules
+from assertEquals.cli.main import main
 from assertEquals.cli.reporters import detail, _Summarize
-from assertEquals.tests.utils import reportersTestCase
+from assertEquals.cli.watch import Watcher, find_path
+from assertEquals.tests.utils import MODULE_2, reportersTestCase
+
+
+def stopped():
+    """A clock that stands still, so that reports are the same every time.
+    """
+    return (0.0, 0.0)
 
 
 OUTPUT_START="""\
@@ -78,63 +95,63 @@ class Detail(reportersTestCase):
 
 HEADER = """\
 -------------------------------<| assertEquals |>-------------------------------
-MODULE                                                       PASS FAIL  ERR  ALL
+MODULE                                                       PASS FAIL  ERR  ALL DURATION
 --------------------------------------------------------------------------------
 """
 
 BODY = """\
-assertEqualsTests.TestCase                                       60%    1    1    5
-assertEqualsTests.itDoesExist.TestCase                          100%    0    0    2
-assertEqualsTests.itDoesExist.TestCase2                         100%    0    0    1
-assertEqualsTests.subpkg.TestCase                               100%    0    0    2
+assertEqualsTests.TestCase                                    60%    1    1    5   0.000s
+assertEqualsTests.itDoesExist.TestCase                       100%    0    0    2   0.000s
+assertEqualsTests.itDoesExist.TestCase2                      100%    0    0    1   0.000s
+assertEqualsTests.subpkg.TestCase                            100%    0    0    2   0.000s
 """
 BODY_FIND = """\
-assertEqualsTests.TestCase                                        -     -    -    5
-assertEqualsTests.itDoesExist.TestCase                            -     -    -    2
-assertEqualsTests.itDoesExist.TestCase2                           -     -    -    1
-assertEqualsTests.subpkg.TestCase                                 -     -    -    2
+assertEqualsTests.TestCase                                     -     -    -    5        -
+assertEqualsTests.itDoesExist.TestCase                         -     -    -    2        -
+assertEqualsTests.itDoesExist.TestCase2                        -     -    -    1        -
+assertEqualsTests.subpkg.TestCase                              -     -    -    2        -
 """
 BODY_DOTTED_RUN_VERBOSE = """\
-assertEqualsTests.itDoesExist.TestCase                          100%    0    0    2
-assertEqualsTests.itDoesExist.TestCase2                         100%    0    0    1
+assertEqualsTests.itDoesExist.TestCase                       100%    0    0    2   0.000s
+assertEqualsTests.itDoesExist.TestCase2                      100%    0    0    1   0.000s
 """
 
 
 TOTALS_BASIC = """\
 --------------------------------------------------------------------------------
-TOTALS                                                        50%    4    5   18
+TOTALS                                                        50%    4    5   18        -
 """
 TOTALS_BASIC_NO_RUN = """\
 --------------------------------------------------------------------------------
-TOTALS                                                         -     -    -   18
+TOTALS                                                         -     -    -   18        -
 """
 TOTALS_ZERO = """\
 --------------------------------------------------------------------------------
-TOTALS                                                         0%    0    0    0
+TOTALS                                                         0%    0    0    0        -
 """
 TOTALS_ZERO_NO_RUN = """\
 --------------------------------------------------------------------------------
-TOTALS                                                         -     -    -    0
+TOTALS                                                         -     -    -    0        -
 """
 TOTALS_ZERO_PERCENT = """\
 --------------------------------------------------------------------------------
-TOTALS                                                         0%    5    5   10
+TOTALS                                                         0%    5    5   10        -
 """
 TOTALS_ZERO_PERCENT_NO_RUN = """\
 --------------------------------------------------------------------------------
-TOTALS                                                         -     -    -   10
+TOTALS                                                         -     -    -   10        -
 """
 TOTALS_ALL_PASSING = """\
 --------------------------------------------------------------------------------
-TOTALS                                                       100%    0    0   10
+TOTALS                                                       100%    0    0   10        -
 """
 TOTALS_ALL_PASSING_NO_RUN = """\
 --------------------------------------------------------------------------------
-TOTALS                                                         -     -    -   10
+TOTALS                                                         -     -    -   10        -
 """
 TOTALS_SUMMARIZE = """\
 --------------------------------------------------------------------------------
-TOTALS                                                        80%    1    1   10
+TOTALS                                                        80%    1    1   10   0.000s
 """
 
 SUMMARIZE = HEADER + BODY + TOTALS_SUMMARIZE
@@ -144,6 +161,7 @@ class Summary(reportersTestCase):
 
     def setUpUp(self):
         self.summarize = _Summarize()
+        self.summarize.clock = stopped
         self.summarize.module = 'assertEqualsTests'
         self.summarize.find_only = False
         self.summarize.stopwords = ()
@@ -227,6 +245,25 @@ class Summary(reportersTestCase):
         actual = self.summarize._Summarize__testcases
         self.assertEqual(expected, actual)
 
+    def testFindTestCasesSkip(self):
+        self.summarize.module = 'assertEqualsTests'
+        self.summarize.skip = ( 'assertEqualsTests.TestCase'
+                              , 'assertEqualsTests.itDoesExist.TestCase'
+                              , 'assertEqualsTests.itDoesExist.TestCase2'
+                               )
+        self.summarize.find_testcases()
+        mod = __import__('assertEqualsTests')
+        expected = [('assertEqualsTests.subpkg.TestCase', mod.subpkg.TestCase)]
+        actual = self.summarize._Summarize__testcases
+        self.assertEqual(expected, actual)
+
+    def testSkipIsKeptAsASet(self):
+        skip = ['assertEqualsTests.TestCase', 'assertEqualsTests.TestCase']
+        self.summarize('assertEqualsTests', skip=skip)
+        expected = set(['assertEqualsTests.TestCase'])
+        actual = self.summarize.skip
+        self.assertEqual(expected, actual)
+
     def testFindTestCasesEmptyStopWordsOk(self):
         self.summarize.module = 'assertEqualsTests'
         self.summarize.stopwords = ('',)
@@ -303,6 +340,23 @@ class Summary(reportersTestCase):
         actual = self.summarize._Summarize__totals
         self.assertEqual(expected, actual)
 
+    def testPrintBodyJobsMatchesSerial(self):
+        self.summarize.module = 'assertEqualsTests'
+        self.summarize.find_testcases()
+        self.summarize.print_body()
+        expected = ( self.summarize.report.getvalue()
+                   , self.summarize._Summarize__totals
+                    )
+
+        self.setUpUp()
+        self.summarize.jobs = 3
+        self.summarize.find_testcases()
+        self.summarize.print_body()
+        actual = ( self.summarize.report.getvalue()
+                 , self.summarize._Summarize__totals
+                  )
+        self.assertEqual(expected, actual)
+
 
 
     # print_footer
@@ -376,3 +430,518 @@ class Summary(reportersTestCase):
         actual = self.summarize.report.getvalue()
         expected = TOTALS_ALL_PASSING_NO_RUN
         self.assertEqual(expected, actual)
+
+
+
+class Cache(reportersTestCase):
+
+    def setUpUp(self):
+        self.path = tempfile.mkdtemp()
+        self.cache = _Cache(self.path, limit=3)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+        reportersTestCase.tearDown(self)
+
+    def run_summarize(self):
+        summarize = _Summarize()
+        summarize.clock = stopped
+        summarize('assertEqualsTests', cache=self.cache)
+        return summarize
+
+
+    # Cache
+    # =====
+
+    def testKeyIgnoresPaths(self):
+        expected = self.cache.key('foo.TestCase', {'/a/foo.py': 'abc'})
+        actual = self.cache.key('foo.TestCase', {'/b/foo.py': 'abc'})
+        self.assertEqual(expected, actual)
+
+    def testKeyDependsOnContents(self):
+        expected = self.cache.key('foo.TestCase', {'/a/foo.py': 'abc'})
+        actual = self.cache.key('foo.TestCase', {'/a/foo.py': 'abd'})
+        self.assertNotEqual(expected, actual)
+
+    def testKeyIsNoneForUnreadableFiles(self):
+        actual = self.cache.key('foo.TestCase', {'/a/foo.py': None})
+        self.assertEqual(None, actual)
+
+    def testGetMissReturnsNone(self):
+        self.assertEqual(None, self.cache.get('deadbeef'))
+
+    def testPutThenGet(self):
+        self.cache.put('deadbeef', (0, 0, 3))
+        expected = (0, 0, 3)
+        actual = self.cache.get('deadbeef')
+        self.assertEqual(expected, actual)
+
+    def testEntriesWithDurationsGetTheCountsOnly(self):
+        self.cache.put('deadbeef', (0, 0, 3, 0.5, 0.25))
+        expected = (0, 0, 3)
+        actual = self.cache.get('deadbeef')
+        self.assertEqual(expected, actual)
+
+    def testPruneRemovesLeastRecentlyUsed(self):
+        for i, key in enumerate(['a', 'b', 'c', 'd', 'e']):
+            self.cache.put(key, (0, 0, 1))
+            then = time.time() - 100 + i
+            os.utime(os.path.join(self.path, key), (then, then))
+        self.cache.get('a')
+        self.cache.prune()
+        expected = ['a', 'd', 'e']
+        actual = sorted(os.listdir(self.path))
+        self.assertEqual(expected, actual)
+
+
+    # summarize
+    # =========
+
+    def testOnlyPassingResultsAreStored(self):
+        self.run_summarize()
+        expected = 3
+        actual = len(os.listdir(self.path))
+        self.assertEqual(expected, actual)
+
+    def testCachedReportMatchesUncached(self):
+        self.cache.limit = 10
+        summarize = _Summarize()
+        summarize.clock = stopped
+        expected = summarize('assertEqualsTests')
+        self.run_summarize()
+        actual = self.run_summarize().report.getvalue()
+        untimed = lambda report: [l[:-8] for l in report.splitlines()]
+        self.assertEqual(untimed(expected), untimed(actual))
+
+    def testCachedResultsHaveNoDuration(self):
+        self.cache.limit = 10
+        self.run_summarize()
+        report = self.run_summarize().report.getvalue()
+        expected = ['0.000s', '-', '-', '-'] # the first one fails
+        actual = [ line.split()[-1] for line in report.splitlines()
+                   if line.startswith('assertEqualsTests.')
+                  ]
+        self.assertEqual(expected, actual)
+
+    def testCachedTestCasesAreNotRun(self):
+        self.cache.limit = 10
+        self.run_summarize()
+        summarize = _Summarize()
+        ran = []
+        def run_testcase(testcase):
+            ran.append(testcase.__name__)
+            return (1, 0, 1, 0.0, 0.0)
+        summarize.run_testcase = run_testcase
+        summarize('assertEqualsTests', cache=self.cache)
+        expected = ['TestCase'] # the one that fails
+        actual = ran
+        self.assertEqual(expected, actual)
+
+
+
+class Watch(reportersTestCase):
+
+    def setUpUp(self):
+        self.watcher = self.make_watcher(self.site_packages)
+        self.watcher.delay = 0.05
+        self.watcher.interval = 0.05
+
+    def tearDown(self):
+        self.watcher.close()
+        reportersTestCase.tearDown(self)
+
+    def make_watcher(self, path):
+        return Watcher(path)
+
+    def path(self, *parts):
+        return os.path.join(self.site_packages, 'assertEqualsTests', *parts)
+
+    def touch(self, filename, text="\n# changed\n"):
+        open(filename, 'a').write(text)
+
+
+    def testFindPath(self):
+        expected = os.path.abspath(self.path())
+        actual = find_path('assertEqualsTests.subpkg')
+        self.assertEqual(expected, actual)
+
+    def testNoChanges(self):
+        expected = []
+        actual = self.watcher.wait(0.2)
+        self.assertEqual(expected, actual)
+
+    def testChangeIsReported(self):
+        self.touch(self.path('itDoesExist.py'))
+        expected = [self.path('itDoesExist.py')]
+        actual = self.watcher.wait(5)
+        self.assertEqual(expected, actual)
+
+    def testChangesInSubdirectoriesAreReported(self):
+        self.touch(self.path('subpkg', '__init__.py'))
+        expected = [self.path('subpkg', '__init__.py')]
+        actual = self.watcher.wait(5)
+        self.assertEqual(expected, actual)
+
+    def testBurstIsReportedOnce(self):
+        for i in range(5):
+            self.touch(self.path('itDoesExist.py'))
+            self.touch(self.path('__init__.py'))
+        expected = [self.path('__init__.py'), self.path('itDoesExist.py')]
+        actual = self.watcher.wait(5)
+        self.assertEqual(expected, actual)
+        self.assertEqual([], self.watcher.wait(0.2))
+
+    def testOtherFilesAreIgnored(self):
+        self.touch(self.path('notes.txt'))
+        expected = []
+        actual = self.watcher.wait(0.2)
+        self.assertEqual(expected, actual)
+
+
+class WatchByPolling(Watch):
+
+    def make_watcher(self, path):
+        watcher = PollingWatcher(path)
+        assert watcher.fileno() is None
+        return watcher
+
+
+class PollingWatcher(Watcher):
+    def start_inotify(self):
+        raise OSError("no inotify for you")
+
+
+class WatchWhenOutOfWatches(Watch):
+
+    def make_watcher(self, path):
+        watcher = OutOfWatchesWatcher(path)
+        assert watcher.fileno() is None
+        return watcher
+
+    def testInotifyIsClosed(self):
+        fd = self.watcher.inotify
+        if fd is not None: # we're on Linux
+            self.assertRaises(OSError, os.fstat, fd)
+
+
+class OutOfWatchesWatcher(Watcher):
+    inotify = None
+    def add_watch(self, path):
+        self.inotify = self.fd
+        raise OSError(errno.ENOSPC, "inotify_add_watch failed")
+
+
+class WatchBadModule(reportersTestCase):
+
+    def raised(self, argv):
+        """Given an argument list, return where main() raises ImportError.
+        """
+        try:
+            main(argv)
+        except ImportError:
+            return traceback.extract_tb(sys.exc_info()[2])[-1][2]
+
+    def testBadModuleIsReportedAsWithoutWatch(self):
+        argv = ['assertEquals', '--scripted', '--no-cache', 'noSuchModule']
+        expected = self.raised(argv)
+        actual = self.raised(argv[:1] + ['--watch'] + argv[1:])
+        self.assertEqual('load', expected)
+        self.assertEqual(expected, actual)
+
+
+
+STATIC_INIT = """\
+import unittest as ut
+
+from assertEqualsTests import bases
+from assertEqualsTests.bases import Base as Aliased
+
+class Inherits(bases.Base):
+    def test_own(self):
+        pass
+
+class NoTests(ut.TestCase):
+    helper = None
+
+class NotATestCase(object):
+    def test_nothing(self):
+        pass
+
+"""
+
+STATIC_BASES = """\
+from unittest import TestCase
+
+class Base(TestCase):
+    def test_one(self):
+        pass
+    def test_two(self):
+        pass
+
+"""
+
+STATIC_DYNAMIC = """\
+import unittest
+
+Base = type('Base', (unittest.TestCase,), {'test_made': lambda self: None})
+
+class Dynamic(Base):
+    pass
+
+"""
+
+class Finder(reportersTestCase):
+
+    pkg = [  'assertEqualsTests'
+          , ('assertEqualsTests/__init__.py', STATIC_INIT)
+          , ('assertEqualsTests/bases.py', STATIC_BASES)
+          , ('assertEqualsTests/dynamic.py', STATIC_DYNAMIC)
+          , ('assertEqualsTests/unimported.py', STATIC_BASES)
+           ]
+
+    def setUpUp(self):
+        self.finder = _Finder()
+
+    def testTestCases(self):
+        expected = [ ('assertEqualsTests.Base', 2)
+                   , ('assertEqualsTests.Inherits', 3)
+                    ]
+        actual = self.finder.testcases('assertEqualsTests')
+        self.assertEqual(expected, actual)
+
+    def testUnresolvedBaseRaisesUnresolved(self):
+        self.assertRaises( Unresolved
+                         , self.finder.testcases
+                         , 'assertEqualsTests.dynamic'
+                          )
+
+    def testSyntaxErrorRaisesUnresolved(self):
+        path = os.path.join(self.site_packages, 'assertEqualsTests', 'bases.py')
+        open(path, 'w').write("wheeee!")
+        self.assertRaises( Unresolved
+                         , self.finder.testcases
+                         , 'assertEqualsTests.bases'
+                          )
+
+    def testFindOnlyDoesNotImport(self):
+        summarize = _Summarize()
+        summarize('assertEqualsTests', find_only=True, stopwords=('dynamic',))
+        self.assert_('assertEqualsTests' not in sys.modules)
+
+    def testFindOnlyMatchesImporting(self):
+        summarize = _Summarize()
+        summarize.module = 'assertEqualsTests'
+        summarize.stopwords = ()
+        summarize.find_only = False
+        summarize.find_testcases()
+        expected = [ (name, summarize.run_testcase(testcase)[2])
+                     for name, testcase in summarize._Summarize__testcases
+                    ]
+        summarize.find_only = True
+        summarize.find_testcases()
+        actual = [ (name, summarize.run_testcase(testcase)[2])
+                   for name, testcase in summarize._Summarize__testcases
+                  ]
+        self.assertEqual(expected, actual)
+
+    def testFindOnlyFallsBackToImporting(self):
+        open(os.path.join( self.site_packages
+                         , 'assertEqualsTests'
+                         , '__init__.py'
+                          ), 'a').write("from assertEqualsTests import dynamic\n")
+        summarize = _Summarize()
+        report = summarize('assertEqualsTests', find_only=True)
+        self.assert_('assertEqualsTests.dynamic.Dynamic' in report)
+        self.assert_('assertEqualsTests.dynamic' in sys.modules)
+
+
+class Discovery(reportersTestCase):
+
+    pkg = reportersTestCase.pkg + [ ('assertEqualsTests/unimported.py', MODULE_2)
+                                  , ('assertEqualsTests/__main__.py', "1/0\n")
+                                   ]
+
+    def setUpUp(self):
+        self.summarize = _Summarize()
+        self.summarize.clock = stopped
+        self.summarize.module = 'assertEqualsTests'
+        self.summarize.find_only = False
+        self.summarize.stopwords = ()
+
+    def testSubmodules(self):
+        expected = [ 'assertEqualsTests'
+                   , 'assertEqualsTests.itDoesExist'
+                   , 'assertEqualsTests.subpkg'
+                   , 'assertEqualsTests.unimported'
+                    ]
+        actual = submodules('assertEqualsTests')
+        self.assertEqual(expected, actual)
+
+    def testSubmodulesStopWords(self):
+        expected = ['assertEqualsTests', 'assertEqualsTests.subpkg']
+        actual = submodules('assertEqualsTests', ('Does', 'imported'))
+        self.assertEqual(expected, actual)
+
+    def testSubmodulesOfAModule(self):
+        expected = ['assertEqualsTests.itDoesExist']
+        actual = submodules('assertEqualsTests.itDoesExist')
+        self.assertEqual(expected, actual)
+
+    def testFindsModulesThatAreNeverImported(self):
+        report = self.summarize('assertEqualsTests')
+        self.assert_('assertEqualsTests.unimported.TestCase2' in report)
+
+    def testParallelDiscoveryDoesNotImport(self):
+        self.summarize.jobs = 2
+        self.summarize.find_testcases()
+        self.assert_('assertEqualsTests.unimported' not in sys.modules)
+
+    def testParallelDiscoveryMatchesSerial(self):
+        self.summarize.find_testcases()
+        expected = self.summarize._Summarize__testcases
+        self.summarize.jobs = 2
+        self.summarize.find_testcases()
+        actual = [ (name, self.summarize.resolve(testcase))
+                   for name, testcase in self.summarize._Summarize__testcases
+                  ]
+        self.assertEqual(expected, actual)
+
+    def testParallelSummaryMatchesSerial(self):
+        expected = self.summarize('assertEqualsTests')
+        actual = self.summarize('assertEqualsTests', jobs=2)
+        self.assertEqual(expected, actual)
+
+
+class BrokenSubmodule(reportersTestCase):
+
+    pkg = reportersTestCase.pkg + [ ( 'assertEqualsTests/optional.py'
+                                    , "import no_such_dep\n"
+                                     )
+                                   ]
+
+    def setUpUp(self):
+        self.summarize = _Summarize()
+        self.summarize.clock = stopped
+        self.stderr = sys.stderr
+        sys.stderr = StringIO()
+
+    def tearDown(self):
+        sys.stderr = self.stderr
+        reportersTestCase.tearDown(self)
+
+    def testReportGoesOnWithoutIt(self):
+        report = self.summarize('assertEqualsTests')
+        self.assert_('assertEqualsTests.itDoesExist.TestCase ' in report)
+        self.assert_('assertEqualsTests.subpkg.TestCase ' in report)
+
+    def testItIsNotedOnStderr(self):
+        self.summarize('assertEqualsTests')
+        expected = ( "assertEquals: skipping assertEqualsTests.optional: "
+                   + "ImportError: No module named no_such_dep\n"
+                    )
+        actual = sys.stderr.getvalue()
+        self.assertEqual(expected, actual)
+
+    def testParallelMatchesSerial(self):
+        expected = self.summarize('assertEqualsTests')
+        actual = self.summarize('assertEqualsTests', jobs=2)
+        self.assertEqual(expected, actual)
+        self.assertEqual(2, sys.stderr.getvalue().count('skipping'))
+
+    def testTheModuleAskedForMustImport(self):
+        self.assertRaises( ImportError
+                         , self.summarize
+                         , 'assertEqualsTests.optional'
+                          )
+
+
+ALIAS_INIT = """\
+from assertEqualsTests.defined import Defined
+"""
+
+ALIAS_DEFINED = """\
+import unittest
+
+class Defined(unittest.TestCase):
+    def test_one(self):
+        pass
+    def test_two(self):
+        self.assert_(0)
+
+"""
+
+ALIAS_REEXPORTS = """\
+from assertEqualsTests.defined import Defined
+Again = Defined
+"""
+
+ALIASES = """\
+-------------------------------<| assertEquals |>-------------------------------
+MODULE                                                       PASS FAIL  ERR  ALL DURATION
+--------------------------------------------------------------------------------
+assertEqualsTests.defined.Defined                             50%    1    0    2   0.000s
+--------------------------------------------------------------------------------
+TOTALS                                                        50%    1    0    2   0.000s
+
+ALIASES
+--------------------------------------------------------------------------------
+assertEqualsTests.Defined                                    = assertEqualsTests.defined.Defined
+assertEqualsTests.reexports.Defined                          = assertEqualsTests.defined.Defined
+"""
+
+class Aliases(reportersTestCase):
+
+    pkg = [  'assertEqualsTests'
+          , ('assertEqualsTests/__init__.py', ALIAS_INIT)
+          , ('assertEqualsTests/defined.py', ALIAS_DEFINED)
+          , ('assertEqualsTests/reexports.py', ALIAS_REEXPORTS)
+           ]
+
+    def setUpUp(self):
+        self.summarize = _Summarize()
+        self.summarize.clock = stopped
+        self.summarize.module = 'assertEqualsTests'
+        self.summarize.find_only = False
+        self.summarize.stopwords = ()
+
+    def find(self, **kw):
+        for name, value in kw.items():
+            setattr(self.summarize, name, value)
+        self.summarize.find_testcases()
+        names = [name for name, t in self.summarize._Summarize__testcases]
+        return names, self.summarize.aliases
+
+    def testRunsOnceUnderTheDefiningName(self):
+        expected = ( ['assertEqualsTests.defined.Defined']
+                   , { 'assertEqualsTests.defined.Defined':
+                        [ 'assertEqualsTests.Defined'
+                        , 'assertEqualsTests.reexports.Defined'
+                         ]
+                      }
+                    )
+        actual = self.find()
+        self.assertEqual(expected, actual)
+
+    def testFirstNameWhenTheDefiningModuleIsStopped(self):
+        expected = ( ['assertEqualsTests.Defined']
+                   , { 'assertEqualsTests.Defined':
+                        ['assertEqualsTests.reexports.Defined']
+                      }
+                    )
+        actual = self.find(stopwords=('defined',))
+        self.assertEqual(expected, actual)
+
+    def testParallelDiscoveryMatchesSerial(self):
+        expected = self.find()
+        actual = self.find(jobs=2)
+        self.assertEqual(expected, actual)
+
+    def testFindOnlyMatchesImporting(self):
+        expected = self.find()
+        actual = self.find(find_only=True)
+        self.assertEqual(expected, actual)
+
+    def testReportListsAliases(self):
+        expected = ALIASES
+        actual = self.summarize('assertEqualsTests')
+        self.assertEqual(expected, actual)
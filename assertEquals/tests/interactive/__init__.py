@@ -1 +1 @@
-from assertEquals.tests.interactive import marshallers, scrollarea
+from assertEquals.tests.interactive import base, marshallers, records, runner, scrollarea, search, worker
@@ -0,0 +1,67 @@
+import unittest
+
+from assertEquals.interactive.screens.base import BaseScreen
+
+
+class Window:
+    """Stand in for a curses window whose size we set.
+    """
+
+    def __init__(self, sizes):
+        self.sizes = sizes # a list of (H, W), 1-indexed, one per getmaxyx
+
+    def getmaxyx(self):
+        if len(self.sizes) > 1:
+            return self.sizes.pop(0)
+        return self.sizes[0]
+
+    def clear(self):
+        pass
+
+    def refresh(self):
+        pass
+
+    def addstr(self, *a):
+        pass
+
+
+class Screen(BaseScreen):
+    """A screen that is woken by a resize, and then by a key press.
+    """
+
+    ui_chars = [ord('x')]
+
+    def __init__(self, sizes):
+        self.win = Window(sizes)
+        self.woken = [None, [ord('x')]]
+        self.resized = []
+
+    def wait(self, timeout):
+        return self.woken.pop(0)
+
+    def resize(self):
+        self.resized.append((self.H, self.W))
+
+    def react(self, c):
+        return 'next'
+
+
+class TooSmall(unittest.TestCase):
+
+    def testGrowingPastTooSmallRedraws(self):
+        screen = Screen([(5, 20), (25, 81)])
+        expected = 'next'
+        actual = screen.go()
+        self.assertEqual(expected, actual)
+
+        expected = [(24, 80)]
+        actual = screen.resized
+        self.assertEqual(expected, actual)
+
+    def testKeysWhileTooSmallAreIgnored(self):
+        screen = Screen([(5, 20), (5, 20), (25, 81)])
+        screen.woken = [[ord('x')], None, [ord('x')]]
+        expected = 'next'
+        actual = screen.go()
+        self.assertEqual(expected, actual)
+        self.assertEqual([], screen.woken)
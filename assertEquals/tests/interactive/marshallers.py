@@ -6,53 +6,19 @@ from assertEquals.interactive.summary import Summary as _Summary
 from assertEquals.tests.utils import reportersTestCase
 
 
-RAW = """\
-Hey there!
--------------------------------<| assertEquals |>-------------------------------
-.EF..
-======================================================================
-ERROR: test_errs (assertEqualsTests.TestCase)
-----------------------------------------------------------------------
-Traceback (most recent call last):"""; RAW2= """
-  File "/tmp/assertEqualsTests/__init__.py", line 21, in test_errs
-    raise StandardError(\'heck\')
-StandardError: heck
-
-======================================================================
-FAIL: test_fails (assertEqualsTests.TestCase)
-----------------------------------------------------------------------
-Traceback (most recent call last):
-  File "/tmp/assertEqualsTests/__init__.py", line 18, in test_fails
-    self.assert_(0)
-AssertionError
-
-----------------------------------------------------------------------
-Ran 5 tests in 0.002s
-
-FAILED (failures=1, errors=1)
-"""
-_RAW = RAW+RAW2
-
-RAW_ONE = """\
-Hey there!
--------------------------------<| assertEquals |>-------------------------------
-.E..
-======================================================================
-ERROR: test_errs (assertEqualsTests.TestCase)
-----------------------------------------------------------------------
-Traceback (most recent call last):
-  File "/tmp/assertEqualsTests/__init__.py", line 21, in test_errs
-    raise StandardError(\'heck\')
-StandardError: heck
+TOTALS = ('60%', '1', '1', '5')
+TOTALS_ONE = ('0%', '0', '1', '1')
 
-----------------------------------------------------------------------
-Ran 1 test in 0.002s
 
-FAILED (errors=1)
-"""
+def dump_rows(rows):
+    """Given Rows of Row, return a {name: [stats, fresh]} dict, for comparing.
+    """
+    return dict([(row.name, [row.stats(), rows.fresh(row)]) for row in rows])
 
-TOTALS = ('60%', '1', '1', '5')
-TOTALS_ONE = ('0%', '0', '1', '1')
+def dump_tests(rows):
+    """Given Rows of Test, return a {name: [flop, traceback]} dict.
+    """
+    return dict([(test.name, [test.flop, test.traceback]) for test in rows])
 
 
 # cross-platform hack
@@ -71,6 +37,12 @@ Traceback (most recent call last):
     self.assert_(0)
 AssertionError""" % hack]
         }
+RECORDS = [ {'kind': 'test', 'name': 'test_errs', 'flop': 'error'
+            , 'traceback': DATA['test_errs'][1]}
+          , {'kind': 'test', 'name': 'test_fails', 'flop': 'failure'
+            , 'traceback': DATA['test_fails'][1]}
+          , {'kind': 'totals', 'fail': 1, 'err': 1, 'all': 5}
+           ]
 DATA_ONE = {
 'test_errs' : ['error', """\
 Traceback (most recent call last):
@@ -78,6 +50,10 @@ Traceback (most recent call last):
     raise StandardError(\'heck\')
 StandardError: heck""" % hack]
         }
+RECORDS_ONE = [ {'kind': 'test', 'name': 'test_errs', 'flop': 'error'
+                , 'traceback': DATA['test_errs'][1]}
+              , {'kind': 'totals', 'fail': 0, 'err': 1, 'all': 1}
+               ]
 
 
 class Detail(reportersTestCase):
@@ -90,9 +66,22 @@ class Detail(reportersTestCase):
             self.detail._call()
         except RefreshError, err:
             raise StandardError(err.traceback)
-        expected = RAW
-        actual = self.detail._Detail__raw[:len(RAW)]
+        expected = [ ('test', 'test_errs', 'error')
+                   , ('test', 'test_fails', 'failure')
+                   , ('totals', None, None)
+                    ]
+        actual = [ (r['kind'], r.get('name'), r.get('flop'))
+                   for r in self.detail._Detail__records
+                  ]
+        self.assertEqual(expected, actual)
+        expected = RECORDS[-1]
+        actual = dict(self.detail._Detail__records[-1])
+        for key in ('wall', 'cpu'): # timings vary from run to run
+            self.assert_(isinstance(actual.pop(key), float))
         self.assertEqual(expected, actual)
+        expected = 'Traceback (most recent call last):'
+        actual = self.detail._Detail__records[0]['traceback']
+        self.assertEqual(expected, actual[:len(expected)])
 
     def testCallCatchesErrorsInChildProcess(self):
         path = os.path.join( self.site_packages
@@ -116,10 +105,10 @@ class Detail(reportersTestCase):
     # =========
 
     def testSetData(self):
-        self.detail._Detail__raw = _RAW
+        self.detail._Detail__records = RECORDS
         self.detail._set_data()
         expected = DATA
-        actual = self.detail.data
+        actual = dump_tests(self.detail.data)
         self.assertEqual(expected, actual)
 
         expected = TOTALS
@@ -127,10 +116,10 @@ class Detail(reportersTestCase):
         self.assertEqual(expected, actual)
 
     def testSetDataWorksForOneTest(self):
-        self.detail._Detail__raw = RAW_ONE
+        self.detail._Detail__records = RECORDS_ONE
         self.detail._set_data()
         expected = DATA_ONE
-        actual = self.detail.data
+        actual = dump_tests(self.detail.data)
         self.assertEqual(expected, actual)
 
         expected = TOTALS_ONE
@@ -139,69 +128,57 @@ class Detail(reportersTestCase):
 
 
 
-RAW2 = """\
-Hey there!
--------------------------------<| assertEquals |>-------------------------------
-MODULE                                                       PASS FAIL  ERR  ALL
---------------------------------------------------------------------------------
-assertEqualsTests.TestCase                                       60%    1    1    5
-assertEqualsTests.itDoesExist.TestCase                          100%    0    0    2
-assertEqualsTests.itDoesExist.TestCase2                         100%    0    0    1
-assertEqualsTests.subpkg.TestCase                               100%    0    0    2
---------------------------------------------------------------------------------
-TOTALS                                                        80%    1    1   10
-"""
-LINES = [ 'Hey there!'
-, '-------------------------------<| assertEquals |>-------------------------------'
-, 'MODULE                                                       PASS FAIL  ERR  ALL'
-, '--------------------------------------------------------------------------------'
-, 'assertEqualsTests.TestCase                                       60%    1    1    5'
-, 'assertEqualsTests.itDoesExist.TestCase                          100%    0    0    2'
-, 'assertEqualsTests.itDoesExist.TestCase2                         100%    0    0    1'
-, 'assertEqualsTests.subpkg.TestCase                               100%    0    0    2'
-, '--------------------------------------------------------------------------------'
-]
-
-
-RAW_ALL_PASSING = """\
-Hey there!
--------------------------------<| assertEquals |>-------------------------------
-MODULE                                                       PASS FAIL  ERR  ALL
---------------------------------------------------------------------------------
-assertEqualsTests                                                60%    0    0    5
-assertEqualsTests.itDoesExist                                   100%    0    0    2
---------------------------------------------------------------------------------
-TOTALS                                                       100%    0    0    7
-"""
-LINES_ALL_PASSING = [ 'Hey there!'
-, '-------------------------------<| assertEquals |>-------------------------------'
-, 'MODULE                                                       PASS FAIL  ERR  ALL'
-, '--------------------------------------------------------------------------------'
-, 'assertEqualsTests                                                60%    0    0    5'
-, 'assertEqualsTests.itDoesExist                                   100%    0    0    2'
-, '--------------------------------------------------------------------------------'
-]
-
-
-RAW_DOTTED = """\
-Hey there!
--------------------------------<| assertEquals |>-------------------------------
-MODULE                                                       PASS FAIL  ERR  ALL
---------------------------------------------------------------------------------
-assertEqualsTests.itDoesExist                                   100%    0    0    2
---------------------------------------------------------------------------------
-TOTALS                                                        71%    1    1    7
-"""
-LINES_DOTTED = [ 'Hey there!'
-, '-------------------------------<| assertEquals |>-------------------------------'
-, 'MODULE                                                       PASS FAIL  ERR  ALL'
-, '--------------------------------------------------------------------------------'
-, 'assertEqualsTests.itDoesExist                                   100%    0    0    2'
-, '--------------------------------------------------------------------------------'
-]
+RECORDS2 = [
+    {'kind': 'testcase', 'name': 'assertEqualsTests.TestCase'
+   , 'fail': 1, 'err': 1, 'all': 5}
+  , {'kind': 'testcase', 'name': 'assertEqualsTests.itDoesExist.TestCase'
+   , 'fail': 0, 'err': 0, 'all': 2}
+  , {'kind': 'testcase', 'name': 'assertEqualsTests.itDoesExist.TestCase2'
+   , 'fail': 0, 'err': 0, 'all': 1}
+  , {'kind': 'testcase', 'name': 'assertEqualsTests.subpkg.TestCase'
+   , 'fail': 0, 'err': 0, 'all': 2}
+  , {'kind': 'totals', 'fail': 1, 'err': 1, 'all': 10}
+   ]
+DATA2 = {
+    'assertEqualsTests': [None, None]
+  , 'assertEqualsTests.TestCase': [('60%', '1', '1', '5'), True]
+  , 'assertEqualsTests.itDoesExist': [None, None]
+  , 'assertEqualsTests.itDoesExist.TestCase': [('100%', '0', '0', '2'), True]
+  , 'assertEqualsTests.itDoesExist.TestCase2': [('100%', '0', '0', '1'), True]
+  , 'assertEqualsTests.subpkg': [None, None]
+  , 'assertEqualsTests.subpkg.TestCase': [('100%', '0', '0', '2'), True]
+   }
+
+
+RECORDS_FIND_ONLY = [
+    {'kind': 'testcase', 'name': 'assertEqualsTests.TestCase'
+   , 'fail': None, 'err': None, 'all': 5}
+  , {'kind': 'totals', 'fail': None, 'err': None, 'all': 5}
+   ]
+DATA_FIND_ONLY = {
+    'assertEqualsTests': [None, None]
+  , 'assertEqualsTests.TestCase': [('-', '-', '-', '5'), None]
+   }
+
+
+RECORDS_ALL_PASSING = [
+    {'kind': 'testcase', 'name': 'assertEqualsTests.TestCase'
+   , 'fail': 0, 'err': 0, 'all': 5}
+  , {'kind': 'testcase', 'name': 'assertEqualsTests.itDoesExist.TestCase'
+   , 'fail': 0, 'err': 0, 'all': 2}
+  , {'kind': 'totals', 'fail': 0, 'err': 0, 'all': 7}
+   ]
+
+
+RECORDS_DOTTED = [
+    {'kind': 'testcase', 'name': 'assertEqualsTests.itDoesExist.TestCase'
+   , 'fail': 0, 'err': 0, 'all': 2}
+  , {'kind': 'totals', 'fail': 1, 'err': 1, 'all': 7}
+   ]
 DATA_DOTTED = {
     'assertEqualsTests': [None, None]
-  , 'assertEqualsTests.itDoesExist': [('100%', '0', '0', '2'), True]
+  , 'assertEqualsTests.itDoesExist': [None, None]
+  , 'assertEqualsTests.itDoesExist.TestCase': [('100%', '0', '0', '2'), True]
    }
 
 
@@ -233,6 +210,10 @@ class Summary(reportersTestCase):
     def setUpUp(self):
         self.summary = _Summary()
 
+    def feed(self, records):
+        for record in records:
+            self.summary.pending.put(record)
+
 
     # _call
     # =====
@@ -244,8 +225,36 @@ class Summary(reportersTestCase):
             self.summary._call()
         except RefreshError, err:
             raise StandardError(err.traceback)
-        expected = RAW2
-        actual = self.summary._Summary__raw
+        expected = RECORDS2
+        actual = []
+        while not self.summary.pending.empty():
+            record = self.summary.pending.get()
+            record.pop('deps', None)
+            record.pop('wall', None) # timings vary from run to run
+            record.pop('cpu', None)
+            actual.append(record)
+        self.assertEqual(expected, actual)
+
+    def testCallSendsDeps(self):
+        self.summary.module = 'assertEqualsTests'
+        self.summary.find_only = False
+        self.summary._call()
+        deps = {}
+        while not self.summary.pending.empty():
+            record = self.summary.pending.get()
+            deps[record.get('name')] = record.get('deps')
+
+        pkg = os.path.join(self.site_packages, 'assertEqualsTests')
+        expected = [ os.path.join(pkg, '__init__.py')
+                   , os.path.join(pkg, 'itDoesExist.py')
+                    ]
+        actual = sorted(deps['assertEqualsTests.itDoesExist.TestCase'])
+        self.assertEqual(expected, actual)
+
+        expected = [ os.path.join(pkg, '__init__.py')
+                   , os.path.join(pkg, 'subpkg', '__init__.py')
+                    ]
+        actual = sorted(deps['assertEqualsTests.subpkg.TestCase'])
         self.assertEqual(expected, actual)
 
     def testCallCatchesErrorsInChildProcess(self):
@@ -254,7 +263,7 @@ class Summary(reportersTestCase):
                            , '__init__.py'
                             )
         open(path, 'w+').write("wheeee!")
-        self.summary.base = 'assertEqualsTests'
+        self.summary.module = 'assertEqualsTests'
         self.summary.find_only = False
         self.assertRaises( RefreshError
                          , self.summary._call
@@ -267,39 +276,49 @@ class Summary(reportersTestCase):
             self.assertEqual(expected, actual[:len(expected)])
 
 
-    # _set_totals
-    # ===========
+    # _set_data
+    # =========
 
-    def testSetTotals(self):
-        self.summary._Summary__raw = RAW2
-        self.summary._set_totals()
+    def testSetData(self):
+        self.summary.module = 'assertEqualsTests'
+        self.feed(RECORDS2)
+        self.summary._set_data()
 
-        expected = LINES
-        actual = self.summary._Summary__lines
+        expected = DATA2
+        actual = dump_rows(self.summary.data)
         self.assertEqual(expected, actual)
 
         expected = ('80%', '1', '1', '10')
         actual = self.summary.totals
         self.assertEqual(expected, actual)
 
-    def testSetTotalsAllPassing(self):
-        self.summary._Summary__raw = RAW_ALL_PASSING
-        self.summary._set_totals()
+    def testSetDataFindOnly(self):
+        self.summary.module = 'assertEqualsTests'
+        self.feed(RECORDS_FIND_ONLY)
+        self.summary._set_data()
 
-        expected = LINES_ALL_PASSING
-        actual = self.summary._Summary__lines
+        expected = DATA_FIND_ONLY
+        actual = dump_rows(self.summary.data)
         self.assertEqual(expected, actual)
 
-        expected = ('100%', '0', '0', '7')
+        expected = ('-', '-', '-', '5')
         actual = self.summary.totals
         self.assertEqual(expected, actual)
 
-    def testSetTotalsDotted(self):
-        self.summary._Summary__raw = RAW_DOTTED
-        self.summary._set_totals()
+    def testSetDataAllPassing(self):
+        self.summary.module = 'assertEqualsTests'
+        self.feed(RECORDS_ALL_PASSING)
+        self.summary._set_data()
 
-        expected = LINES_DOTTED
-        actual = self.summary._Summary__lines
+        expected = ('100%', '0', '0', '7')
+        actual = self.summary.totals
+        self.assertEqual(expected, actual)
+
+    def testSetDataDotted(self):
+        self.feed(RECORDS_DOTTED)
+        self.summary._set_data()
+        expected = DATA_DOTTED
+        actual = dump_rows(self.summary.data)
         self.assertEqual(expected, actual)
 
         expected = ('71%', '1', '1', '7')
@@ -307,25 +326,585 @@ class Summary(reportersTestCase):
         self.assertEqual(expected, actual)
 
 
+    def testSetDataRollsUpToModules(self):
+        self.summary.module = 'assertEqualsTests'
+        self.feed(RECORDS2)
+        self.summary._set_data()
 
-    # _set_data
-    # =========
+        expected = { 'assertEqualsTests': ('80%', '1', '1', '10')
+                   , 'assertEqualsTests.itDoesExist': ('100%', '0', '0', '3')
+                   , 'assertEqualsTests.subpkg': ('100%', '0', '0', '2')
+                    }
+        actual = dict([ (row.name, row.rollup()) for row in self.summary.data
+                                                 if row.all is None
+                       ])
+        self.assertEqual(expected, actual)
 
-    def testSetData(self):
-        self.summary._Summary__raw = RAW2
-        self.summary._set_totals()
+    def testSetDataDoesNotRollUpAliases(self):
+        self.summary.module = 'assertEqualsTests'
+        record = dict(RECORDS2[1], aliases=['assertEqualsTests.Alias'])
+        self.feed([record])
+        self.summary._set_data()
+
+        expected = ('100%', '0', '0', '2')
+        actual = self.summary.data.get('assertEqualsTests').rollup()
+        self.assertEqual(expected, actual)
+
+    def testUpdateReachesAliases(self):
+        self.summary.module = 'assertEqualsTests'
+        record = dict(RECORDS2[1], aliases=['assertEqualsTests.Alias'])
+        self.feed([record, record])
+        self.summary._set_data()
+        name = 'assertEqualsTests.itDoesExist.TestCase'
+        self.summary.update(name, '50%', '1', '0', '2')
+
+        expected = ['assertEqualsTests.Alias']
+        actual = self.summary._aliases_of(name)
+        self.assertEqual(expected, actual)
+
+        row = self.summary.data.get('assertEqualsTests.Alias')
+        expected = (1, 0, 2)
+        actual = (row.fail, row.err, row.all)
+        self.assertEqual(expected, actual)
 
-        expected = LINES
-        actual = self.summary._Summary__lines
+    def testUpdateRollsUpAndKeepsTotals(self):
+        self.summary.module = 'assertEqualsTests'
+        self.feed(RECORDS2)
+        self.summary._set_data()
+        self.summary.update('assertEqualsTests.TestCase', '60%', '0', '2', '5')
+
+        expected = ('80%', '0', '2', '10')
+        actual = self.summary.data.get('assertEqualsTests').rollup()
+        self.assertEqual(expected, actual)
+        actual = self.summary.totals
+        self.assertEqual(expected, actual)
+        expected = ('100%', '0', '0', '3')
+        actual = self.summary.data.get('assertEqualsTests.itDoesExist').rollup()
+        self.assertEqual(expected, actual)
+
+
+    # incremental refreshes
+    # =====================
+
+    def testRefreshSkipsUnchangedTestCases(self):
+        self.summary.refresh('assertEqualsTests', find_only=False)
+        self.summary.refresh('assertEqualsTests', find_only=False)
+
+        expected = [ 'assertEqualsTests.TestCase'
+                   , 'assertEqualsTests.itDoesExist.TestCase'
+                   , 'assertEqualsTests.itDoesExist.TestCase2'
+                   , 'assertEqualsTests.subpkg.TestCase'
+                    ]
+        actual = self.summary.skip
+        self.assertEqual(expected, actual)
+
+        expected = DATA2
+        actual = dump_rows(self.summary.data)
         self.assertEqual(expected, actual)
 
         expected = ('80%', '1', '1', '10')
         actual = self.summary.totals
         self.assertEqual(expected, actual)
 
-    def testSetDataDotted(self):
-        self.summary._Summary__lines = LINES_DOTTED
+    def testRefreshRerunsTestCasesWhoseSourcesChanged(self):
+        self.summary.refresh('assertEqualsTests', find_only=False)
+        path = os.path.join( self.site_packages
+                           , 'assertEqualsTests'
+                           , 'itDoesExist.py'
+                            )
+        open(path, 'a').write("\n# changed\n")
+        self.summary.refresh('assertEqualsTests', find_only=False)
+
+        expected = ['assertEqualsTests.subpkg.TestCase']
+        actual = self.summary.skip
+        self.assertEqual(expected, actual)
+
+        expected = DATA2
+        actual = dump_rows(self.summary.data)
+        self.assertEqual(expected, actual)
+
+        expected = ('80%', '1', '1', '10')
+        actual = self.summary.totals
+        self.assertEqual(expected, actual)
+
+
+    # poll
+    # ====
+
+    def testPollAppliesPartialResults(self):
+        self.summary.module = 'assertEqualsTests'
+        self.feed(RECORDS2[:1])
+        self.assert_(self.summary.poll())
+
+        expected = ['assertEqualsTests', 'assertEqualsTests.TestCase']
+        actual = self.summary.names
+        self.assertEqual(expected, actual)
+
+        expected = ('60%', '1', '1', '5')
+        actual = self.summary.totals
+        self.assertEqual(expected, actual)
+
+    def testPollShowsAliasesWithTheSameResults(self):
+        self.summary.module = 'assertEqualsTests'
+        record = dict(RECORDS2[1], aliases=['assertEqualsTests.Alias'])
+        self.feed([record])
+        self.summary.poll()
+
+        expected = [ 'assertEqualsTests'
+                   , 'assertEqualsTests.Alias'
+                   , 'assertEqualsTests.itDoesExist'
+                   , 'assertEqualsTests.itDoesExist.TestCase'
+                    ]
+        actual = self.summary.names
+        self.assertEqual(expected, actual)
+
+        data = dump_rows(self.summary.data)
+        expected = data['assertEqualsTests.itDoesExist.TestCase']
+        actual = data['assertEqualsTests.Alias']
+        self.assertEqual(expected, actual)
+
+        expected = ('100%', '0', '0', '2')
+        actual = self.summary.totals
+        self.assertEqual(expected, actual)
+
+    # folding
+    # =======
+
+    def testCollapseHidesRowsBelow(self):
+        self.summary.module = 'assertEqualsTests'
+        self.feed(RECORDS2)
         self.summary._set_data()
-        expected = DATA_DOTTED
-        actual = self.summary.data
+        self.summary.collapse('assertEqualsTests.itDoesExist')
+
+        expected = [ 'assertEqualsTests'
+                   , 'assertEqualsTests.TestCase'
+                   , 'assertEqualsTests.itDoesExist'
+                   , 'assertEqualsTests.subpkg'
+                   , 'assertEqualsTests.subpkg.TestCase'
+                    ]
+        actual = self.summary.names
+        self.assertEqual(expected, actual)
+        self.assertEqual(5, len(self.summary))
+        self.assertEqual(DATA2, dump_rows(self.summary.data))
+
+    def testExpandShowsThemAgain(self):
+        self.summary.module = 'assertEqualsTests'
+        self.feed(RECORDS2)
+        self.summary._set_data()
+        self.summary.collapse('assertEqualsTests.itDoesExist')
+        self.summary.expand('assertEqualsTests.itDoesExist')
+
+        expected = sorted(DATA2)
+        actual = self.summary.names
+        self.assertEqual(expected, actual)
+
+    def testExpandKeepsNestedModulesCollapsed(self):
+        self.summary.module = 'assertEqualsTests'
+        self.feed(RECORDS2)
+        self.summary._set_data()
+        self.summary.collapse('assertEqualsTests.subpkg')
+        self.summary.collapse('assertEqualsTests')
+        self.assertEqual(['assertEqualsTests'], self.summary.names)
+        self.summary.expand('assertEqualsTests')
+
+        expected = [ 'assertEqualsTests'
+                   , 'assertEqualsTests.TestCase'
+                   , 'assertEqualsTests.itDoesExist'
+                   , 'assertEqualsTests.itDoesExist.TestCase'
+                   , 'assertEqualsTests.itDoesExist.TestCase2'
+                   , 'assertEqualsTests.subpkg'
+                    ]
+        actual = self.summary.names
+        self.assertEqual(expected, actual)
+
+    def testViewIsDataWhileNothingIsCollapsed(self):
+        self.summary.module = 'assertEqualsTests'
+        self.feed(RECORDS2)
+        self.summary._set_data()
+        self.assert_(self.summary.view is self.summary.data)
+        self.summary.collapse('assertEqualsTests.subpkg')
+        self.summary.collapse('assertEqualsTests.itDoesExist')
+        self.assert_(self.summary.view is not self.summary.data)
+        self.summary.expand('assertEqualsTests.subpkg')
+        self.summary.expand('assertEqualsTests.itDoesExist')
+        self.assert_(self.summary.view is self.summary.data)
+        self.assert_(self.summary.listed is self.summary.data)
+        self.assertEqual(sorted(DATA2), self.summary.names)
+
+    def testNewRowsBelowCollapsedModulesAreHidden(self):
+        self.summary.module = 'assertEqualsTests'
+        self.feed(RECORDS2[:2])
+        self.summary._set_data()
+        self.summary.collapse('assertEqualsTests.itDoesExist')
+        self.feed(RECORDS2[2:])
+        self.summary._set_data()
+
+        expected = [ 'assertEqualsTests'
+                   , 'assertEqualsTests.TestCase'
+                   , 'assertEqualsTests.itDoesExist'
+                   , 'assertEqualsTests.subpkg'
+                   , 'assertEqualsTests.subpkg.TestCase'
+                    ]
+        actual = self.summary.names
+        self.assertEqual(expected, actual)
+        self.assertEqual(DATA2, dump_rows(self.summary.data))
+
+    def testPollReturnsFalseWhenNothingIsPending(self):
+        self.assert_(not self.summary.poll())
+
+    def testPollThenSetDataMatchesSetData(self):
+        self.summary.module = 'assertEqualsTests'
+        self.feed(RECORDS2[:2])
+        self.summary.poll()
+        self.feed(RECORDS2[2:])
+        self.summary._set_data()
+
+        expected = DATA2
+        actual = dump_rows(self.summary.data)
+        self.assertEqual(expected, actual)
+
+        expected = ('80%', '1', '1', '10')
+        actual = self.summary.totals
+        self.assertEqual(expected, actual)
+
+
+    # searching
+    # =========
+
+    def testSearchListsOnlyMatches(self):
+        self.summary.module = 'assertEqualsTests'
+        self.feed(RECORDS2)
+        self.summary._set_data()
+        self.summary.search('DoesExist.TestCase')
+
+        expected = [ 'assertEqualsTests.itDoesExist.TestCase'
+                   , 'assertEqualsTests.itDoesExist.TestCase2'
+                    ]
+        actual = self.summary.names
+        self.assertEqual(expected, actual)
+        self.assertEqual(2, len(self.summary))
+        self.assertEqual(expected[1], self.summary[1].name)
+
+    def testSearchIgnoresCase(self):
+        self.summary.module = 'assertEqualsTests'
+        self.feed(RECORDS2)
+        self.summary._set_data()
+        self.summary.search('SUBPKG')
+
+        expected = [ 'assertEqualsTests.subpkg'
+                   , 'assertEqualsTests.subpkg.TestCase'
+                    ]
+        actual = self.summary.names
+        self.assertEqual(expected, actual)
+
+    def testSearchingForNothingListsEverythingAgain(self):
+        self.summary.module = 'assertEqualsTests'
+        self.feed(RECORDS2)
+        self.summary._set_data()
+        self.summary.search('subpkg')
+        self.summary.search('')
+
+        expected = sorted(DATA2)
+        actual = self.summary.names
+        self.assertEqual(expected, actual)
+
+    def testSearchFindsHiddenRows(self):
+        self.summary.module = 'assertEqualsTests'
+        self.feed(RECORDS2)
+        self.summary._set_data()
+        self.summary.collapse('assertEqualsTests.itDoesExist')
+        self.summary.search('TestCase2')
+
+        expected = ['assertEqualsTests.itDoesExist.TestCase2']
+        actual = self.summary.names
+        self.assertEqual(expected, actual)
+
+    def testIndexIsOnlyBuiltWhenWeSearch(self):
+        self.summary.module = 'assertEqualsTests'
+        self.feed(RECORDS2)
+        self.summary._set_data()
+        self.assertEqual(None, self.summary.index)
+        self.summary.search('Exist')
+        self.assertNotEqual(None, self.summary.index)
+        self.assertEqual(3, len(self.summary))
+
+    def testSearchTakesInNewRows(self):
+        self.summary.module = 'assertEqualsTests'
+        self.feed(RECORDS2[:2])
+        self.summary._set_data()
+        self.summary.search('subpkg')
+        self.assertEqual([], self.summary.names)
+        self.feed(RECORDS2[2:])
+        self.summary._set_data()
+
+        expected = [ 'assertEqualsTests.subpkg'
+                   , 'assertEqualsTests.subpkg.TestCase'
+                    ]
+        actual = self.summary.names
+        self.assertEqual(expected, actual)
+
+    def testNarrowingASearch(self):
+        self.summary.module = 'assertEqualsTests'
+        self.feed(RECORDS2)
+        self.summary._set_data()
+        self.summary.search('Test')
+        self.summary.search('TestCase')
+        self.summary.search('TestCase2')
+
+        expected = ['assertEqualsTests.itDoesExist.TestCase2']
+        actual = self.summary.names
+        self.assertEqual(expected, actual)
+
+    # failures only
+    # =============
+
+    def testListFailingListsFailingTestCasesAndTheirModules(self):
+        self.summary.module = 'assertEqualsTests'
+        self.feed(RECORDS2)
+        self.summary._set_data()
+        self.summary.list_failing(True)
+
+        expected = ['assertEqualsTests', 'assertEqualsTests.TestCase']
+        actual = self.summary.names
+        self.assertEqual(expected, actual)
+        self.assertEqual(expected[1], self.summary[1].name)
+
+    def testListFailingKeepsUpAsResultsComeIn(self):
+        self.summary.module = 'assertEqualsTests'
+        self.summary.list_failing(True)
+        self.feed(RECORDS2[1:3])
+        self.summary._set_data()
+        self.assertEqual([], self.summary.names)
+        self.feed(RECORDS2[:1])
+        self.summary._set_data()
+
+        expected = ['assertEqualsTests', 'assertEqualsTests.TestCase']
+        actual = self.summary.names
+        self.assertEqual(expected, actual)
+
+    def testListFailingDropsRowsThatComeToPass(self):
+        self.summary.module = 'assertEqualsTests'
+        self.feed(RECORDS2)
+        self.summary._set_data()
+        self.summary.list_failing(True)
+        self.summary.update('assertEqualsTests.TestCase', '100%', '0', '0', '5')
+
+        expected = []
+        actual = self.summary.names
+        self.assertEqual(expected, actual)
+
+    def testListFailingKeepsModulesWithOtherFailures(self):
+        self.summary.module = 'assertEqualsTests'
+        self.feed(RECORDS2)
+        self.summary._set_data()
+        self.summary.list_failing(True)
+        name = 'assertEqualsTests.subpkg.TestCase'
+        self.summary.update(name, '50%', '1', '0', '2')
+        self.summary.update('assertEqualsTests.TestCase', '100%', '0', '0', '5')
+
+        expected = [ 'assertEqualsTests'
+                   , 'assertEqualsTests.subpkg'
+                   , 'assertEqualsTests.subpkg.TestCase'
+                    ]
+        actual = self.summary.names
+        self.assertEqual(expected, actual)
+
+    def testListFailingFalseListsEverythingAgain(self):
+        self.summary.module = 'assertEqualsTests'
+        self.feed(RECORDS2)
+        self.summary._set_data()
+        self.summary.list_failing(True)
+        self.summary.list_failing(False)
+
+        expected = sorted(DATA2)
+        actual = self.summary.names
+        self.assertEqual(expected, actual)
+
+    def testSearchingWhileListingFailing(self):
+        self.summary.module = 'assertEqualsTests'
+        self.feed(RECORDS2)
+        self.summary._set_data()
+        self.summary.search('TestCase')
+        self.summary.list_failing(True)
+
+        expected = ['assertEqualsTests.TestCase']
+        actual = self.summary.names
+        self.assertEqual(expected, actual)
+
+        self.summary.list_failing(False)
+        expected = [ 'assertEqualsTests.TestCase'
+                   , 'assertEqualsTests.itDoesExist.TestCase'
+                   , 'assertEqualsTests.itDoesExist.TestCase2'
+                   , 'assertEqualsTests.subpkg.TestCase'
+                    ]
+        actual = self.summary.names
+        self.assertEqual(expected, actual)
+
+    # sorting
+    # =======
+
+    def timed(self, *walls):
+        """Given a wall time for each TestCase in RECORDS2, return records.
+        """
+        records = [dict(r) for r in RECORDS2]
+        for record, wall in zip(records, walls):
+            record['wall'] = wall
+        return records
+
+    def testSortListsOnlyTestCasesInOrder(self):
+        self.summary.module = 'assertEqualsTests'
+        self.feed(self.timed(0.1, 0.3, 0.2, 0.4))
+        self.summary._set_data()
+        self.summary.sort('duration')
+
+        expected = [ 'assertEqualsTests.subpkg.TestCase'
+                   , 'assertEqualsTests.itDoesExist.TestCase'
+                   , 'assertEqualsTests.itDoesExist.TestCase2'
+                   , 'assertEqualsTests.TestCase'
+                    ]
+        actual = self.summary.names
+        self.assertEqual(expected, actual)
+        self.assertEqual(expected[1], self.summary[1].name)
+
+    def testSortByPassRateThenName(self):
+        self.summary.module = 'assertEqualsTests'
+        self.feed(RECORDS2)
+        self.summary._set_data()
+        self.summary.sort('pass rate')
+
+        expected = [ 'assertEqualsTests.TestCase'
+                   , 'assertEqualsTests.itDoesExist.TestCase'
+                   , 'assertEqualsTests.itDoesExist.TestCase2'
+                   , 'assertEqualsTests.subpkg.TestCase'
+                    ]
+        actual = self.summary.names
+        self.assertEqual(expected, actual)
+
+    def testSortKeepsUpAsResultsComeIn(self):
+        self.summary.module = 'assertEqualsTests'
+        self.summary.sort('failures')
+        self.feed(RECORDS_FIND_ONLY)
+        self.summary._set_data()
+        self.assertEqual(['assertEqualsTests.TestCase'], self.summary.names)
+        ranked = self.summary.ranked
+
+        self.summary.start('assertEqualsTests', find_only=False)
+        self.feed(RECORDS2[1:])
+        self.summary._set_data()
+        self.feed(RECORDS2[:1])
+        self.summary._set_data()
+        self.assert_(self.summary.ranked is ranked) # not sorted again
+        expected = [ 'assertEqualsTests.TestCase'
+                   , 'assertEqualsTests.itDoesExist.TestCase'
+                   , 'assertEqualsTests.itDoesExist.TestCase2'
+                   , 'assertEqualsTests.subpkg.TestCase'
+                    ]
+        actual = self.summary.names
+        self.assertEqual(expected, actual)
+
+        name = 'assertEqualsTests.subpkg.TestCase'
+        self.summary.update(name, '0%', '2', '0', '2')
+        self.assertEqual(name, self.summary.names[0])
+
+    def testSortWhileSearchingAndListingFailing(self):
+        self.summary.module = 'assertEqualsTests'
+        self.feed(RECORDS2)
+        self.summary._set_data()
+        self.summary.search('DoesExist')
+        self.summary.sort('errors')
+        expected = [ 'assertEqualsTests.itDoesExist.TestCase'
+                   , 'assertEqualsTests.itDoesExist.TestCase2'
+                    ]
+        actual = self.summary.names
+        self.assertEqual(expected, actual)
+
+        self.summary.list_failing(True)
+        self.assertEqual([], self.summary.names)
+        name = 'assertEqualsTests.itDoesExist.TestCase2'
+        self.summary.update(name, '0%', '0', '1', '1')
+        self.assertEqual([name], self.summary.names)
+
+    def testSortByNameListsTheTreeAgain(self):
+        self.summary.module = 'assertEqualsTests'
+        self.feed(RECORDS2)
+        self.summary._set_data()
+        self.summary.sort('duration')
+        self.summary.sort('name')
+
+        expected = sorted(DATA2)
+        actual = self.summary.names
+        self.assertEqual(expected, actual)
+        self.assertEqual(None, self.summary.ranked)
+
+    def testSlowestIsOnlyRankedWhenAskedFor(self):
+        self.summary.module = 'assertEqualsTests'
+        self.feed(self.timed(0.1, 0.3, 0.2, 0.4))
+        self.summary._set_data()
+        self.assertEqual(None, self.summary.timed)
+
+        expected = ['assertEqualsTests.subpkg.TestCase']
+        actual = [row.name for row in self.summary.slowest(1)]
+        self.assertEqual(expected, actual)
+
+        name = 'assertEqualsTests.TestCase'
+        self.summary.update(name, '100%', '0', '0', '5', 0.5, 0.3)
+        expected = [name, 'assertEqualsTests.subpkg.TestCase']
+        actual = [row.name for row in self.summary.slowest(2)]
+        self.assertEqual(expected, actual)
+
+    def testSlowest(self):
+        self.summary.module = 'assertEqualsTests'
+        self.assertEqual([], self.summary.slowest(3))
+        self.feed(self.timed(0.1, 0.3, None, 0.4))
+        self.summary._set_data()
+
+        expected = [ 'assertEqualsTests.subpkg.TestCase'
+                   , 'assertEqualsTests.itDoesExist.TestCase'
+                    ]
+        actual = [row.name for row in self.summary.slowest(2)]
+        self.assertEqual(expected, actual)
+
+        name = 'assertEqualsTests.TestCase'
+        self.summary.update(name, '100%', '0', '0', '5', 0.35, 0.3)
+        expected = [ 'assertEqualsTests.subpkg.TestCase'
+                   , 'assertEqualsTests.TestCase'
+                   , 'assertEqualsTests.itDoesExist.TestCase'
+                    ]
+        actual = [row.name for row in self.summary.slowest(5)]
+        self.assertEqual(expected, actual)
+
+
+
+NOISY = """\
+import unittest
+
+from assertEquals.cli.utils import BANNER, BORDER
+
+class TestCase(unittest.TestCase):
+    def test_looks_like_a_report(self):
+        print BANNER
+        print BORDER
+        print 'TOTALS 0% 9 9 9'
+        self.assert_(0)
+
+"""
+
+class NoisyOutput(reportersTestCase):
+
+    pkg = [  'assertEqualsTests'
+          , ('assertEqualsTests/__init__.py', NOISY)
+           ]
+
+    def testSummaryIsNotConfusedByProgramOutput(self):
+        summary = _Summary()
+        summary.refresh('assertEqualsTests', find_only=False)
+        expected = ('0%', '1', '0', '1')
+        actual = summary.totals
+        self.assertEqual(expected, actual)
+
+    def testDetailIsNotConfusedByProgramOutput(self):
+        detail = _Detail('assertEqualsTests.TestCase')
+        detail.refresh()
+        expected = ['test_looks_like_a_report']
+        actual = detail.names
         self.assertEqual(expected, actual)
@@ -0,0 +1,282 @@
+import random
+import unittest
+
+from assertEquals.interactive.records import Ranking as _Ranking
+from assertEquals.interactive.records import Row as _Row
+from assertEquals.interactive.records import Rows as _Rows
+from assertEquals.interactive.records import Test as _Test
+from assertEquals.interactive.records import by_duration, by_pass_rate
+
+
+class Rows(unittest.TestCase):
+
+    def setUp(self):
+        self.rows = _Rows()
+        self.rows.add([ _Row('a.c', 0, 0, 2, 0)
+                      , _Row('a')
+                      , _Row('a.b', 1, 0, 3)
+                       ])
+
+    def testAddSorts(self):
+        expected = ['a', 'a.b', 'a.c']
+        actual = self.rows.names
+        self.assertEqual(expected, actual)
+
+    def testAddMerges(self):
+        names = self.rows.names
+        self.rows.add([_Row('a.bb'), _Row('0'), _Row('z')])
+        expected = ['0', 'a', 'a.b', 'a.bb', 'a.c', 'z']
+        actual = [row.name for row in self.rows]
+        self.assertEqual(expected, actual)
+        self.assert_(self.rows.names is names) # updated in place
+        self.assertEqual(expected, names)
+
+    def testGet(self):
+        expected = (1, 0, 3)
+        row = self.rows.get('a.b')
+        actual = (row.fail, row.err, row.all)
+        self.assertEqual(expected, actual)
+
+    def testGetMissing(self):
+        self.assertEqual(None, self.rows.get('a.bb'))
+        self.assertEqual(None, self.rows.get('zzz'))
+
+    def testContains(self):
+        self.assert_('a.c' in self.rows)
+        self.assert_('a.d' not in self.rows)
+
+    def testIndexingGivesTheRowItself(self):
+        self.assert_(self.rows[1] is self.rows[1])
+        self.assert_(self.rows[1] is self.rows.get('a.b'))
+
+    def testIndex(self):
+        expected = [0, 1, 2, None]
+        actual = [self.rows.index(n) for n in ('a', 'a.b', 'a.c', 'a.bb')]
+        self.assertEqual(expected, actual)
+
+    def testUnder(self):
+        self.rows.add([_Row('a.b.x'), _Row('a.bb'), _Row('b')])
+        expected = ['a.b', 'a.b.x', 'a.bb', 'a.c']
+        actual = [row.name for row in self.rows.under('a')]
+        self.assertEqual(expected, actual)
+        expected = ['a.b.x']
+        actual = [row.name for row in self.rows.under('a.b')]
+        self.assertEqual(expected, actual)
+        expected = []
+        actual = [row.name for row in self.rows.under('a.bb')]
+        self.assertEqual(expected, actual)
+
+    def testNegativeIndex(self):
+        self.assertEqual('a.c', self.rows[-1].name)
+        self.assertRaises(IndexError, self.rows.__getitem__, 3)
+
+    def testRemove(self):
+        self.rows.remove('a.b')
+        expected = ['a', 'a.c']
+        actual = self.rows.names
+        self.assertEqual(expected, actual)
+        self.assertEqual('a.c', self.rows[1].name)
+        self.assertRaises(KeyError, self.rows.remove, 'a.b')
+
+    def testManyInsertsAndRemoves(self):
+        rows = _Rows()
+        names = ['%05d' % i for i in range(2000)]
+        random.shuffle(names)
+        rows.add([_Row(name) for name in names])
+        for name in names[:500]:
+            rows.remove(name)
+        expected = sorted(names[500:])
+        actual = [rows[i].name for i in range(len(rows))]
+        self.assertEqual(expected, actual)
+        actual = [rows.index(name) for name in expected]
+        self.assertEqual(range(len(expected)), actual)
+
+    def testBatchesMergeWithRowsInsertedOneAtATime(self):
+        rows = _Rows()
+        names = ['%05d' % i for i in range(3000)]
+        random.shuffle(names)
+        for size in (1000, 10, 1, 1500, 5, 484): # merged, inserted, ...
+            batch, names = names[:size], names[size:]
+            rows.add([_Row(name) for name in batch])
+        for name in list(rows.names)[::3]:
+            rows.remove(name)
+        rows.add([_Row('%05d' % i) for i in range(0, 3000, 3)])
+        expected = ['%05d' % i for i in range(3000)]
+        actual = [rows[i].name for i in range(len(rows))]
+        self.assertEqual(expected, actual)
+        actual = [rows.index(name) for name in expected]
+        self.assertEqual(range(3000), actual)
+        self.assertEqual(expected, [row.name for row in rows])
+
+    def testStaleBumpsTheGeneration(self):
+        row = self.rows.get('a.c')
+        self.assertEqual(True, self.rows.fresh(row))
+        self.rows.stale()
+        self.assertEqual(False, self.rows.fresh(row))
+        self.assertEqual(None, self.rows.fresh(self.rows.get('a.b')))
+
+    def testClear(self):
+        names = self.rows.names
+        self.rows.clear()
+        self.assertEqual(0, len(self.rows))
+        self.assertEqual([], names)
+
+
+class Ranking(unittest.TestCase):
+
+    def setUp(self):
+        self.rows = _Ranking(by_duration)
+        self.rows.add([ _Row('a.A', 0, 0, 2, wall=0.5)
+                      , _Row('a.B', 0, 0, 1, wall=2.0)
+                      , _Row('a.C', None, None, 3)
+                      , _Row('a.D', 1, 0, 1, wall=0.5)
+                       ])
+
+    def testAddSortsByKeyThenName(self):
+        expected = ['a.B', 'a.A', 'a.D', 'a.C']
+        actual = self.rows.names
+        self.assertEqual(expected, actual)
+
+    def testIndexAndGetByName(self):
+        expected = [1, 3, None]
+        actual = [self.rows.index(n) for n in ('a.A', 'a.C', 'a.E')]
+        self.assertEqual(expected, actual)
+        self.assertEqual(2.0, self.rows.get('a.B').wall)
+        self.assert_('a.D' in self.rows)
+        self.assert_('a.E' not in self.rows)
+
+    def testRefileMovesARowWhoseResultsChanged(self):
+        row = self.rows.get('a.C')
+        row.fail, row.err, row.wall = 0, 0, 1.0
+        self.rows.refile(row)
+        expected = ['a.B', 'a.C', 'a.A', 'a.D']
+        actual = self.rows.names
+        self.assertEqual(expected, actual)
+        self.assertEqual(1, self.rows.index('a.C'))
+
+    def testRefileAddsARowWeDontHave(self):
+        self.rows.refile(_Row('a.E', 0, 0, 1, wall=3.0))
+        expected = ['a.E', 'a.B', 'a.A', 'a.D', 'a.C']
+        actual = self.rows.names
+        self.assertEqual(expected, actual)
+
+    def testRemoveAndDiscard(self):
+        self.rows.remove('a.A')
+        self.assertRaises(KeyError, self.rows.remove, 'a.A')
+        self.rows.discard('a.A')
+        self.rows.discard('a.D')
+        expected = ['a.B', 'a.C']
+        actual = self.rows.names
+        self.assertEqual(expected, actual)
+
+    def testFillMatchesAdd(self):
+        rows = []
+        for i in range(500):
+            fail = random.choice([None, 0, 1])
+            rows.append(_Row('%05d' % i, fail, 0, random.randint(1, 3)))
+        added = _Ranking(by_pass_rate)
+        added.add(rows)
+        filled = _Ranking(by_pass_rate)
+        filled.fill(rows)
+        self.assertEqual(list(added.names), list(filled.names))
+        actual = [filled.index(row.name) for row in filled]
+        self.assertEqual(range(500), actual)
+        row = _Row('00999', 1, 1, 2)
+        added.refile(row)
+        filled.refile(row) # inserts still work after
+        self.assertEqual(list(added.names), list(filled.names))
+        self.assertEqual(added.index('00999'), filled.index('00999'))
+
+
+class Row(unittest.TestCase):
+
+    def testStats(self):
+        expected = ('67%', '1', '0', '3')
+        actual = _Row('a.b', 1, 0, 3).stats()
+        self.assertEqual(expected, actual)
+
+    def testStatsNotRun(self):
+        expected = ('-', '-', '-', '3')
+        actual = _Row('a.b', None, None, 3).stats()
+        self.assertEqual(expected, actual)
+
+    def testStatsModule(self):
+        self.assertEqual(None, _Row('a').stats())
+
+    def testRollup(self):
+        a, ab = _Row('a'), _Row('a.b')
+        tc1, tc2 = _Row('a.TestCase'), _Row('a.b.TestCase')
+        a.adopt(ab)
+        a.adopt(tc1)
+        ab.adopt(tc2)
+        self.assertEqual(('-', '-', '-', '0'), a.rollup())
+
+        before = tc1.counts()
+        tc1.all = 3
+        tc1.roll(before)
+        before = tc2.counts()
+        tc2.fail, tc2.err, tc2.all = 1, 0, 2
+        tc2.roll(before)
+
+        expected = [1, 0, 2, 5, 0.0, 0.0]
+        actual = a.sums
+        self.assertEqual(expected, actual)
+        expected = ('50%', '1', '0', '5')
+        actual = a.rollup()
+        self.assertEqual(expected, actual)
+        expected = ('50%', '1', '0', '2')
+        actual = ab.rollup()
+        self.assertEqual(expected, actual)
+
+        before = tc2.counts()
+        tc2.fail = 0
+        tc2.roll(before)
+        expected = ('100%', '0', '0', '5')
+        actual = a.rollup()
+        self.assertEqual(expected, actual)
+
+    def testRollupDurations(self):
+        a, ab = _Row('a'), _Row('a.b')
+        tc1, tc2 = _Row('a.TestCase'), _Row('a.b.TestCase')
+        a.adopt(ab)
+        a.adopt(tc1)
+        ab.adopt(tc2)
+        self.assertEqual('-', a.duration())
+
+        before = tc1.counts()
+        tc1.fail, tc1.err, tc1.all, tc1.wall, tc1.cpu = 0, 0, 3, 1.5, 1.0
+        tc1.roll(before)
+        before = tc2.counts()
+        tc2.fail, tc2.err, tc2.all, tc2.wall, tc2.cpu = 0, 0, 2, 0.25, 0.25
+        tc2.roll(before)
+
+        expected = ('1.750s', '0.250s', '1.500s')
+        actual = (a.duration(), ab.duration(), tc1.duration())
+        self.assertEqual(expected, actual)
+        self.assertEqual([0, 0, 5, 5, 1.75, 1.25], a.sums)
+
+        before = tc1.counts()
+        tc1.fail = tc1.err = tc1.wall = tc1.cpu = None # find-only refresh
+        tc1.roll(before)
+        expected = ('0.250s', '-')
+        actual = (a.duration(), tc1.duration())
+        self.assertEqual(expected, actual)
+
+    def testRollupTestCase(self):
+        self.assertEqual(None, _Row('a.b', 1, 0, 3).rollup())
+
+    def testShortAndDepth(self):
+        row = _Row('a.b.TestCase')
+        expected = ('TestCase', 2)
+        actual = (row.short, row.depth)
+        self.assertEqual(expected, actual)
+
+    def testNamesAreInterned(self):
+        name = ''.join(['a.b.', 'TestCase']) # not a literal, so not interned
+        self.assert_(_Row(name).name is intern('a.b.TestCase'))
+        self.assert_(_Row(name).short is _Row('x.TestCase').short)
+
+    def testSlots(self):
+        self.assertRaises(AttributeError, setattr, _Row('a'), 'foo', 1)
+        test = _Test('a', 'b', 'c')
+        self.assertRaises(AttributeError, setattr, test, 'foo', 1)
@@ -0,0 +1,113 @@
+import select
+import threading
+import unittest
+
+from assertEquals.interactive.utils import Runner as _Runner
+
+
+class Runner(unittest.TestCase):
+
+    def setUp(self):
+        self.runner = _Runner()
+        self.log = []
+
+    def tearDown(self):
+        self.runner.stop()
+
+    def wait(self):
+        """Block until a job finishes, then call back.
+        """
+        ready = select.select([self.runner.fd], [], [], 5)[0]
+        self.assert_(ready, "timed out")
+        return self.runner.finish()
+
+    def job(self, name, call=None):
+        """Return a (start, callback) tuple that logs what happens.
+        """
+        if call is None:
+            call = lambda: name
+        def start():
+            self.log.append(('start', name))
+            return call
+        def callback(result, error):
+            self.log.append(('done', result, error))
+        return start, callback
+
+
+    def testJobRunsOnAnotherThreadAndCallsBack(self):
+        def call():
+            return threading.currentThread()
+        thread = []
+        self.runner.put(lambda: call, lambda r, e: thread.append(r))
+        self.wait()
+        self.assertNotEqual(threading.currentThread(), thread[0])
+
+    def testCallbackGetsTheResult(self):
+        self.runner.put(*self.job('foo'))
+        self.wait()
+        expected = [('start', 'foo'), ('done', 'foo', None)]
+        actual = self.log
+        self.assertEqual(expected, actual)
+
+    def testCallbackGetsErrorsWithTracebacks(self):
+        def call():
+            raise ValueError('heck')
+        self.runner.put(*self.job('foo', call))
+        self.wait()
+        result, error = self.log[-1][1:]
+        self.assertEqual(None, result)
+        self.assert_(isinstance(error, ValueError))
+        self.assert_('heck' in error.traceback)
+
+    def testNextJobWaitsForTheCallback(self):
+        self.runner.put(*self.job('foo'))
+        self.runner.put(*self.job('bar'))
+        select.select([self.runner.fd], [], [], 5)
+        expected = [('start', 'foo')]
+        actual = self.log
+        self.assertEqual(expected, actual)
+        self.runner.finish()
+        expected = [('start', 'foo'), ('done', 'foo', None), ('start', 'bar')]
+        actual = self.log
+        self.assertEqual(expected, actual)
+
+    def testJobsRunInOrder(self):
+        for name in ('foo', 'bar', 'baz'):
+            self.runner.put(*self.job(name))
+        while self.runner.busy():
+            self.wait()
+        expected = ['foo', 'bar', 'baz']
+        actual = [e[1] for e in self.log if e[0] == 'done']
+        self.assertEqual(expected, actual)
+
+    def testJobsWithTheSameKeyAreOnlyQueuedOnce(self):
+        self.runner.put(*self.job('foo'))
+        self.runner.put(key='bar', *self.job('bar'))
+        self.runner.put(key='bar', *self.job('bar'))
+        expected = 1
+        actual = len(self.runner.queue)
+        self.assertEqual(expected, actual)
+
+    def testClearDropsWaitingJobs(self):
+        self.runner.put(*self.job('foo'))
+        self.runner.put(*self.job('bar'))
+        self.runner.clear()
+        self.wait()
+        self.assertEqual(False, self.runner.busy())
+        expected = [('start', 'foo'), ('done', 'foo', None)]
+        actual = self.log
+        self.assertEqual(expected, actual)
+
+    def testFinishReturnsWhatTheCallbackDoes(self):
+        self.runner.put(lambda: (lambda: None), lambda r, e: 'screen')
+        expected = 'screen'
+        actual = self.wait()
+        self.assertEqual(expected, actual)
+
+    def testCallbackThatRaisesDropsWaitingJobs(self):
+        def callback(result, error):
+            raise ValueError('heck')
+        self.runner.put(self.job('foo')[0], callback)
+        self.runner.put(*self.job('bar'))
+        self.assertRaises(ValueError, self.wait)
+        self.assertEqual(False, self.runner.busy())
@@ -504,3 +504,77 @@ class PageDownMultiplePages(unittest.TestCase):
         expected = (20, 0, 50, 49, 50, 49, range(19,20))
         actual = self.area.stat()
         self.assertEqual(expected, actual)
+
+
+class Jump(unittest.TestCase):
+
+    def setUp(self):
+        self.area = ScrollArea(20, 50, 3)
+        self.area.refuse = refuse_raise
+
+    def testJumpWithinViewport(self):
+        self.area.jump(5)
+        expected = (20, 5, 50, 0, 20, 5, range(3,12))
+        actual = self.area.stat()
+        self.assertEqual(expected, actual)
+
+    def testJumpBelowViewport(self):
+        self.area.jump(30)
+        expected = (20, 19, 50, 11, 31, 30, range(7,16))
+        actual = self.area.stat()
+        self.assertEqual(expected, actual)
+
+    def testJumpAboveViewport(self):
+        self.area.end()
+        self.area.jump(10)
+        expected = (20, 0, 50, 10, 30, 10, range(7,16))
+        actual = self.area.stat()
+        self.assertEqual(expected, actual)
+
+    def testJumpToLast(self):
+        self.area.jump(49)
+        self.area.refuse = refuse_pass
+        self.area.end()
+        expected = (20, 19, 50, 30, 50, 49, range(15,23))
+        actual = self.area.stat()
+        self.assertEqual(expected, actual)
+
+    def testJumpOutOfRange(self):
+        self.assertRaises(DoneScrolling, self.area.jump, 50)
+        self.assertRaises(DoneScrolling, self.area.jump, -1)
+        expected = (20, 0, 50, 0, 20, 0, range(3,12))
+        actual = self.area.stat()
+        self.assertEqual(expected, actual)
+
+
+class MillionsOfItems(unittest.TestCase):
+
+    def setUp(self):
+        self.area = ScrollArea(20, 5000000, 3)
+        self.area.refuse = refuse_raise
+
+    def testScrollFar(self):
+        self.area.scroll(3000000)
+        expected = (20, 19, 5000000, 2999981, 3000001, 3000000, range(14,15))
+        actual = self.area.stat()
+        self.assertEqual(expected, actual)
+
+    def testScrollBackUp(self):
+        self.area.scroll(3000000)
+        self.area.scroll(-2999990)
+        expected = (20, 0, 5000000, 10, 30, 10, range(3,4))
+        actual = self.area.stat()
+        self.assertEqual(expected, actual)
+
+    def testScrollPastTheEnd(self):
+        self.assertRaises(DoneScrolling, self.area.scroll, 6000000)
+        expected = (20, 19, 5000000, 4999980, 5000000, 4999999, range(22,23))
+        actual = self.area.stat()
+        self.assertEqual(expected, actual)
+
+    def testIterateOnlyTheViewport(self):
+        self.area.jump(4000000)
+        expected = [(3999981+i, 3+i) for i in range(20)]
+        actual = list(self.area)
+        self.assertEqual(expected, actual)
+        self.assertEqual(20, len(self.area))
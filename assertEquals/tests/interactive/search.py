@@ -0,0 +1,128 @@
+import unittest
+
+from assertEquals.interactive.records import Row as _Row
+from assertEquals.interactive.records import Rows as _Rows
+from assertEquals.interactive.search import Index as _Index
+from assertEquals.interactive.search import Matches as _Matches
+
+
+NAMES = [ 'pkg.Parser'
+        , 'pkg.models.TestAuth'
+        , 'pkg.models.TestBilling'
+        , 'pkg.models.sub.TestAuthBackend'
+        , 'pkg.views.TestPages'
+         ]
+
+
+def make_rows(names):
+    """Given a list of TestCase names, return a Rows with them and their
+    modules below pkg, linked up as Summary does it.
+    """
+    rows = {}
+    for name in names:
+        parts = name.split('.')
+        for i in range(1, len(parts)+1):
+            _name = '.'.join(parts[:i])
+            if _name not in rows:
+                rows[_name] = _Row(_name, all=(i == len(parts)) and 1 or None)
+                if i > 1:
+                    rows['.'.join(parts[:i-1])].adopt(rows[_name])
+    out = _Rows()
+    out.add(rows.values())
+    return out
+
+
+class Index(unittest.TestCase):
+
+    def setUp(self):
+        self.rows = make_rows(NAMES)
+        self.index = _Index(self.rows)
+        self.index.add(self.rows)
+
+    def brute(self, query):
+        """Given a query, return the names that contain it, the slow way.
+        """
+        return [n for n in self.rows.names if query.lower() in n.lower()]
+
+    def search(self, query, within=None):
+        return self.index.search(query, within).names
+
+
+    def testSearchFindsTestCases(self):
+        expected = ['pkg.models.TestBilling']
+        actual = self.search('Billing')
+        self.assertEqual(expected, actual)
+
+    def testSearchFindsModulesAndTheRowsBelowThem(self):
+        expected = [ 'pkg.models.sub'
+                   , 'pkg.models.sub.TestAuthBackend'
+                    ]
+        actual = self.search('sub')
+        self.assertEqual(expected, actual)
+
+    def testSearchIgnoresCase(self):
+        expected = self.search('Auth')
+        actual = self.search('aUTH')
+        self.assertEqual(expected, actual)
+
+    def testSearchSpansDots(self):
+        expected = ['pkg.models.TestAuth']
+        actual = self.search('models.TestA')
+        self.assertEqual(expected, actual)
+
+    def testShortQueriesWork(self):
+        for query in ('', 'p', 'Te', 's.', 'g', 'k.m', 'z', 'ls.', 'S.T'):
+            self.assertEqual(self.brute(query), self.search(query))
+
+    def testSearchMatchesBruteForce(self):
+        for query in ( 'auth', 'test', 'kg.m', 'ls.sub.t', 'pages', 'parser'
+                     , 'pkg.models', 'zzz', 'backend', 'dels.Test'
+                      ):
+            self.assertEqual(self.brute(query), self.search(query))
+
+    def testSearchWithinNarrows(self):
+        within = self.index.search('test')
+        expected = self.brute('testauth')
+        actual = self.search('testauth', within)
+        self.assertEqual(expected, actual)
+
+    def testAddedRowsAreFound(self):
+        rows = make_rows(['pkg.models.TestZebra', 'other.TestZebra'])
+        new = [row for row in rows if row.name not in self.rows]
+        for row in new:
+            parent = self.rows.get(row.name.rsplit('.', 1)[0])
+            if parent is not None:
+                parent.adopt(row)
+        self.rows.add(new)
+        self.index.add(new)
+        expected = ['other.TestZebra', 'pkg.models.TestZebra']
+        actual = self.search('zebra')
+        self.assertEqual(expected, actual)
+
+
+class Matches(unittest.TestCase):
+
+    def setUp(self):
+        self.rows = make_rows(NAMES)
+        self.matches = _Matches(['pkg.Parser', 'pkg.views'], self.rows)
+
+    def testIndexingGivesRows(self):
+        self.assert_(self.matches[1] is self.rows.get('pkg.views'))
+
+    def testLen(self):
+        self.assertEqual(2, len(self.matches))
+
+    def testIter(self):
+        expected = ['pkg.Parser', 'pkg.views']
+        actual = [row.name for row in self.matches]
+        self.assertEqual(expected, actual)
+
+    def testIndex(self):
+        expected = [0, 1, None]
+        names = ('pkg.Parser', 'pkg.views', 'pkg')
+        actual = [self.matches.index(n) for n in names]
+        self.assertEqual(expected, actual)
+
+    def testContains(self):
+        self.assert_('pkg.views' in self.matches)
+        self.assert_('pkg.models' not in self.matches)
@@ -0,0 +1,310 @@
+import os
+import select
+import signal
+import sys
+import time
+import unittest
+
+from assertEquals.interactive.summary import Summary
+from assertEquals.interactive.utils import Cancelled, CommunicationProblem
+from assertEquals.interactive.utils import Process as _Process, run_scripted
+from assertEquals.interactive.utils import Runner
+from assertEquals.interactive.utils import Worker as _Worker
+from assertEquals.tests.utils import reportersTestCase
+
+
+ARGS = ['--scripted', '--no-cache', 'assertEqualsTests']
+
+
+def untimed((output, records)):
+    """Given output and records from a child, drop the timings from records.
+    """
+    for record in records:
+        record.pop('wall', None)
+        record.pop('cpu', None)
+    return output, records
+
+
+class Worker(reportersTestCase):
+
+    def setUpUp(self):
+        self.worker = _Worker()
+
+    def tearDown(self):
+        self.worker.stop()
+        reportersTestCase.tearDown(self)
+
+    def testOutputMatchesOneOffChild(self):
+        expected = untimed(run_scripted(ARGS))
+        actual = untimed(self.worker(ARGS))
+        self.assertEqual(expected, actual)
+
+    def testProgramOutputStaysOnStdout(self):
+        expected = 'Hey there!\n'
+        actual = self.worker(ARGS)[0]
+        self.assertEqual(expected, actual)
+
+    def testProcessIsReused(self):
+        self.worker(ARGS)
+        expected = self.worker.proc.pid
+        self.worker(ARGS)
+        actual = self.worker.proc.pid
+        self.assertEqual(expected, actual)
+
+    def testProcessIsRestartedWhenSourceChanges(self):
+        self.worker(ARGS)
+        pid = self.worker.proc.pid
+        path = os.path.join( self.site_packages
+                           , 'assertEqualsTests'
+                           , 'itDoesExist.py'
+                            )
+        open(path, 'a').write("\nclass TestCase3(TestCase2):\n    pass\n")
+        output, records = self.worker(ARGS)
+        self.assertNotEqual(pid, self.worker.proc.pid)
+        names = [r.get('name') for r in records]
+        self.assert_('assertEqualsTests.itDoesExist.TestCase3' in names)
+
+    def testProcessIsRestartedAfterCrash(self):
+        self.worker(ARGS)
+        pid = self.worker.proc.pid
+        os.kill(pid, signal.SIGKILL)
+        self.worker.proc.wait()
+        output, records = self.worker(ARGS)
+        self.assertNotEqual(pid, self.worker.proc.pid)
+        self.assertEqual('totals', records[-1]['kind'])
+
+    def testSummaryRefreshesOnARunner(self):
+        expected = Summary(worker=self.worker)
+        expected.refresh('assertEqualsTests', find_only=False)
+        summary = Summary(worker=self.worker)
+        runner = Runner()
+        try:
+            def start():
+                summary.start('assertEqualsTests', find_only=False)
+                return summary.fetch
+            runner.put(start, lambda result, error: summary.poll())
+            select.select([runner.fd], [], [], 10)
+            runner.finish()
+        finally:
+            runner.stop()
+        self.assertEqual(expected.names, summary.names)
+        self.assertEqual(expected.totals, summary.totals)
+
+    def testErrorsAreReportedAndProcessSurvives(self):
+        path = os.path.join( self.site_packages
+                           , 'assertEqualsTests'
+                           , '__init__.py'
+                            )
+        open(path, 'w+').write("wheeee!")
+        output, records = self.worker(ARGS)
+        expected = 'Traceback (most recent call last):'
+        self.assertEqual(expected, output[:len(expected)])
+        self.assertEqual([], records)
+        self.assertEqual(None, self.worker.proc.poll())
+
+
+STATEFUL = """\
+import unittest
+
+runs = []
+
+class TestCase(unittest.TestCase):
+    def test_runs_once(self):
+        runs.append(1)
+        self.assertEqual(runs, [1])
+
+"""
+
+SLEEPY = """\
+import time
+time.sleep(1)
+"""
+
+BROKEN = """\
+import no_such_dep
+"""
+
+class Zygote(reportersTestCase):
+
+    pkg = [  'assertEqualsTests'
+          , ('assertEqualsTests/__init__.py', STATEFUL)
+           ]
+
+    def setUpUp(self):
+        self.worker = _Worker()
+
+    def tearDown(self):
+        self.worker.stop()
+        reportersTestCase.tearDown(self)
+
+    def testModuleStateDoesNotLeakBetweenRequests(self):
+        self.worker(ARGS)
+        output, records = untimed(self.worker(ARGS))
+        expected = {'kind': 'totals', 'fail': 0, 'err': 0, 'all': 1}
+        self.assertEqual(expected, records[-1])
+        args = ['--scripted', '--testcase=TestCase'] + ARGS[1:]
+        output, records = untimed(self.worker(args))
+        self.assertEqual(expected, records[-1])
+
+
+class WarmSubmodules(reportersTestCase):
+
+    pkg = reportersTestCase.pkg + [ ('assertEqualsTests/sleepy.py', SLEEPY)
+                                  , ('assertEqualsTests/broken.py', BROKEN)
+                                   ]
+
+    def setUpUp(self):
+        self.worker = _Worker()
+
+    def tearDown(self):
+        self.worker.stop()
+        reportersTestCase.tearDown(self)
+
+    def testSecondSummaryDoesntImportAgain(self):
+        self.worker(ARGS)
+        start = time.time()
+        output, records = self.worker(ARGS)
+        self.assert_(time.time() - start < 0.5)
+        self.assertEqual('totals', records[-1]['kind'])
+
+    def testBrokenSubmodulesAreStillReported(self):
+        expected = untimed(run_scripted(ARGS))
+        self.worker(ARGS)
+        actual = untimed(self.worker(ARGS))
+        self.assertEqual(expected, actual)
+
+
+SLOW = """\
+import time
+import unittest
+
+class Fast(unittest.TestCase):
+    def test_fast(self):
+        pass
+
+class Slow(unittest.TestCase):
+    def test_slow(self):
+        time.sleep(30)
+
+class Slower(unittest.TestCase):
+    def test_slower(self):
+        time.sleep(60)
+
+"""
+
+class Cancel(reportersTestCase):
+
+    pkg = [  'assertEqualsTests'
+          , ('assertEqualsTests/__init__.py', SLOW)
+           ]
+
+    def setUpUp(self):
+        self.worker = _Worker()
+
+    def tearDown(self):
+        self.worker.stop()
+        reportersTestCase.tearDown(self)
+
+    def cancel_after_first(self, record):
+        self.worker.cancel()
+
+    def testCancelRaisesPromptly(self):
+        start = time.time()
+        self.assertRaises( Cancelled
+                         , self.worker
+                         , ['--jobs=2'] + ARGS
+                         , self.cancel_after_first
+                          )
+        self.assert_(time.time() - start < 10)
+
+    def testCancelKillsTheWholeProcessGroup(self):
+        self.worker(ARGS[:1] + ['--find-only'] + ARGS[1:])
+        pgid = self.worker.proc.pid
+        try:
+            self.worker(['--jobs=2'] + ARGS, self.cancel_after_first)
+        except Cancelled:
+            pass
+        deadline = time.time() + 5 # orphans take a moment to be reaped
+        while time.time() < deadline:
+            try:
+                os.killpg(pgid, 0)
+            except OSError:
+                break
+            time.sleep(0.01)
+        self.assertRaises(OSError, os.killpg, pgid, 0)
+
+    def testWorkerIsUsableAfterCancel(self):
+        try:
+            self.worker(['--jobs=2'] + ARGS, self.cancel_after_first)
+        except Cancelled:
+            pass
+        output, records = self.worker(['--find-only'] + ARGS)
+        self.assertEqual('totals', records[-1]['kind'])
+
+    def testSummaryKeepsPartialResults(self):
+        worker = CancellingWorker()
+        try:
+            summary = Summary(jobs=2, worker=worker)
+            summary.refresh('assertEqualsTests', find_only=False)
+        finally:
+            worker.stop()
+        expected = ['assertEqualsTests', 'assertEqualsTests.Fast']
+        actual = summary.names
+        self.assertEqual(expected, actual)
+
+
+class CancellingWorker(_Worker):
+    """A Worker that cancels itself once the first result comes in.
+    """
+
+    def __call__(self, args, listener=None):
+        def cancel(record):
+            listener(record)
+            self.cancel()
+        return _Worker.__call__(self, args, cancel)
+
+
+class Process(unittest.TestCase):
+
+    def run_child(self, script, terminator=None):
+        proc = _Process(args=[sys.executable, '-u', '-c', script])
+        proc.terminator = terminator
+        return proc
+
+    def testLotsOfOutput(self):
+        proc = self.run_child("import sys; sys.stdout.write('x' * 5000000)")
+        expected = 5000000
+        actual = len(proc.communicate())
+        self.assertEqual(expected, actual)
+        self.assert_(proc.finished())
+
+    def testPromptSplitAcrossWrites(self):
+        script = ( "import sys, time\n"
+                   "sys.stdout.write('hi\\n(Pd'); time.sleep(0.2)\n"
+                   "sys.stdout.write('b) '); sys.stdin.readline()\n"
+                   "sys.stdout.write('bye')\n"
+                  )
+        proc = self.run_child(script)
+        try:
+            proc.communicate()
+        except CommunicationProblem, err:
+            self.assertEqual('hi\n(Pdb) ', err.proc.intro)
+        else:
+            self.fail("no CommunicationProblem")
+        expected = 'bye'
+        actual = proc.communicate('c')
+        self.assertEqual(expected, actual)
+        self.assert_(proc.finished())
+
+    def testTerminatorSplitAcrossWrites(self):
+        script = ( "import sys, time\n"
+                   "sys.stdout.write('report<<do'); time.sleep(0.2)\n"
+                   "sys.stdout.write('ne>>'); sys.stdin.readline()\n"
+                  )
+        proc = self.run_child(script, terminator='<<done>>')
+        expected = 'report'
+        actual = proc.communicate()
+        self.assertEqual(expected, actual)
+        self.assert_(proc.finished())
+        proc.stdin.close()
+        proc.wait()
@@ -22,7 +22,7 @@ class TestCase2(unittest.TestCase):
 MODULE_2 = """\
 import unittest
 
-# This module is never imported, and therefore never shows up in our reports.
+# Nothing imports this module; we find it by walking the package directory.
 
 class TestCase(unittest.TestCase):
     def test_foo(self):
@@ -90,10 +90,12 @@ class reportersTestCase(unittest.TestCase):
 
     def setUp(self):
         self.tmp = tempfile.gettempdir()
-        self.site_packages = os.path.join(self.tmp, 'site-packages')
+        # per-process, so that TestCases can run in parallel (-j)
+        dirname = 'site-packages-%d' % os.getpid()
+        self.site_packages = os.path.join(self.tmp, dirname)
         sys.path.insert(0, self.site_packages)
 
-        # [re]build a temporary package tree in /tmp/site-packages/
+        # [re]build a temporary package tree in /tmp/site-packages-<pid>/
         self.removeTestPkg()
         self.buildTestPkg()
 